@@ -0,0 +1 @@
+# Local analyzers (no LLM calls)
@@ -0,0 +1,479 @@
+import colorsys
+import math
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.data.css_colors import CSS_NAMED_COLORS
+from app.analyzers.static_rules import make_issue, parse_qml
+from app.services.chunker import file_family
+
+# Colors are (r, g, b, alpha) with channels 0-255 and alpha 0-1
+RGBA = Tuple[float, float, float, float]
+
+HEX_COLOR = re.compile(r"^#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})$")
+COLOR_FUNCTION = re.compile(r"^(rgba?|hsla?)\((.*)\)$")
+QT_COLOR_FUNCTION = re.compile(r"^qt\.(rgba|hsla|hsva)\((.*)\)$")
+COLOR_TOKEN = re.compile(r"#[0-9a-fA-F]{3,8}\b|(?:rgba?|hsla?)\([^)]*\)|\b[a-zA-Z]+\b")
+CSS_VAR = re.compile(r"var\(\s*(--[\w-]+)\s*(?:,\s*([^()]*(?:\([^()]*\))?[^()]*))?\)")
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_RULE = re.compile(r"([^{}]*)\{([^{}]*)\}")
+CSS_DECLARATION = re.compile(r"([\w-]+)\s*:\s*([^;]+)")
+CUSTOM_PROPERTY = re.compile(r"(--[\w-]+)\s*:\s*([^;{}]+)")
+
+# Selectors whose rules style the page itself
+PAGE_SELECTOR = re.compile(r"^\s*(?:html|body|:root)\s*$")
+
+# Selectors of user interface components, whose boundaries need 3:1 (1.4.11)
+COMPONENT_SELECTOR = re.compile(
+    r"input|button|select|textarea|:focus|\[role|checkbox|radio|toggle|switch|slider|\.btn", re.IGNORECASE
+)
+
+QML_TEXT_TYPES = {"Text", "Label", "TextField", "TextInput", "TextArea", "TextEdit"}
+QML_BACKGROUND_TYPES = {"Rectangle", "Window", "ApplicationWindow"}
+
+# Minimum ratios: (normal text, large text) per level, and for non-text contrast
+TEXT_THRESHOLDS = {"AA": (4.5, 3.0), "AAA": (7.0, 4.5)}
+NON_TEXT_THRESHOLD = 3.0
+
+# sRGB coefficients of relative luminance
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+
+def _channel(value: str, scale: float = 255.0) -> float:
+    value = value.strip()
+    if value.endswith("%"):
+        return float(value[:-1]) / 100 * scale
+    return float(value)
+
+
+def _alpha(value: Optional[str]) -> float:
+    if value is None:
+        return 1.0
+    return min(max(_channel(value, 1.0), 0.0), 1.0)
+
+
+def _hue(value: str) -> float:
+    """Hue in turns (0-1) from deg, rad, grad, turn or a bare number of degrees."""
+    value = value.strip().lower()
+    for unit, turns in (("deg", 1 / 360), ("grad", 1 / 400), ("rad", 1 / (2 * math.pi)), ("turn", 1.0)):
+        if value.endswith(unit):
+            return float(value[:-len(unit)]) * turns % 1.0
+    return float(value) / 360 % 1.0
+
+
+def _function_args(args: str) -> Tuple[List[str], Optional[str]]:
+    """Split "1, 2, 3, .5" or "1 2 3 / 50%" into channels and alpha."""
+    alpha = None
+    if "/" in args:
+        args, alpha = args.split("/", 1)
+    parts = [part for part in re.split(r"[\s,]+", args.strip()) if part]
+    if alpha is None and len(parts) == 4:
+        alpha = parts.pop()
+    return parts, alpha
+
+
+@lru_cache(maxsize=4096)
+def parse_color(value: str, qml: bool = False) -> Optional[RGBA]:
+    """Resolve a CSS or QML color value; None if it is not a literal color.
+
+    Handles named colors, #rgb/#rgba/#rrggbb/#rrggbbaa (#aarrggbb in QML),
+    rgb()/rgba()/hsl()/hsla() in comma and space syntax, and Qt.rgba()/
+    Qt.hsla()/Qt.hsva().
+    """
+    value = value.strip().strip("\"'").strip().lower()
+    value = value.replace("!important", "").strip()
+    if value == "transparent":
+        return (0.0, 0.0, 0.0, 0.0)
+    if value in CSS_NAMED_COLORS:
+        return (*map(float, CSS_NAMED_COLORS[value]), 1.0)
+
+    match = HEX_COLOR.match(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) <= 4:
+            digits = "".join(digit * 2 for digit in digits)
+        if len(digits) == 8 and qml:
+            # Qt puts the alpha first
+            digits = digits[2:] + digits[:2]
+        channels = [int(digits[index:index + 2], 16) for index in range(0, len(digits), 2)]
+        alpha = channels[3] / 255 if len(channels) == 4 else 1.0
+        return (float(channels[0]), float(channels[1]), float(channels[2]), alpha)
+
+    try:
+        match = COLOR_FUNCTION.match(value)
+        if match:
+            parts, alpha = _function_args(match.group(2))
+            if len(parts) != 3:
+                return None
+            if match.group(1).startswith("rgb"):
+                red, green, blue = (min(max(_channel(part), 0.0), 255.0) for part in parts)
+            else:
+                saturation, lightness = (_channel(part, 1.0) if part.endswith("%") else float(part) / 100 for part in parts[1:])
+                red, green, blue = (
+                    channel * 255 for channel in colorsys.hls_to_rgb(_hue(parts[0]), lightness, saturation)
+                )
+            return (red, green, blue, _alpha(alpha))
+
+        match = QT_COLOR_FUNCTION.match(value)
+        if match:
+            parts = [float(part) for part in match.group(2).split(",")]
+            alpha = parts[3] if len(parts) == 4 else 1.0
+            if match.group(1) == "rgba":
+                rgb = parts[:3]
+            elif match.group(1) == "hsla":
+                rgb = colorsys.hls_to_rgb(parts[0], parts[2], parts[1])
+            else:
+                rgb = colorsys.hsv_to_rgb(parts[0], parts[1], parts[2])
+            return (*(min(max(channel, 0.0), 1.0) * 255 for channel in rgb), min(max(alpha, 0.0), 1.0))
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+def relative_luminance(rgb: np.ndarray) -> np.ndarray:
+    """WCAG relative luminance of an (N, 3) array of 0-255 sRGB colors."""
+    srgb = rgb / 255.0
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    return linear @ LUMINANCE_WEIGHTS
+
+
+def contrast_ratios(foreground: np.ndarray, background: np.ndarray) -> np.ndarray:
+    """Contrast ratios of (N, 4) RGBA foreground/background arrays.
+
+    Translucent backgrounds are composited over white (the page default)
+    and translucent foregrounds over their background.
+    """
+    background_rgb = background[:, :3] * background[:, 3:] + 255.0 * (1 - background[:, 3:])
+    foreground_rgb = foreground[:, :3] * foreground[:, 3:] + background_rgb * (1 - foreground[:, 3:])
+    lighter = relative_luminance(foreground_rgb)
+    darker = relative_luminance(background_rgb)
+    lighter, darker = np.maximum(lighter, darker), np.minimum(lighter, darker)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def suggest_colors(
+    foregrounds: np.ndarray,
+    backgrounds: np.ndarray,
+    thresholds: np.ndarray
+) -> List[Optional[Tuple[str, float]]]:
+    """For each pair, the closest darker or lighter foreground meeting its threshold, as (hex, ratio).
+
+    All candidates of all pairs are rated in one vectorized pass.
+    """
+    count = len(foregrounds)
+    if not count:
+        return []
+    steps = np.linspace(0.0, 1.0, 101)
+    base = foregrounds[:, None, :3]
+    # (pairs, candidates, 3): mixes toward black, then toward white
+    candidates = np.round(np.concatenate([
+        base * (1 - steps[None, :, None]),
+        base + (255.0 - base) * steps[None, :, None]
+    ], axis=1))
+    per_pair = candidates.shape[1]
+    ratios = contrast_ratios(
+        np.concatenate([candidates.reshape(-1, 3), np.ones((count * per_pair, 1))], axis=1),
+        np.repeat(backgrounds, per_pair, axis=0)
+    ).reshape(count, per_pair)
+    # Smallest change first, whichever direction it goes
+    change = np.concatenate([steps, steps])
+    cost = np.where(ratios >= thresholds[:, None], change[None, :], np.inf)
+    best = cost.argmin(axis=1)
+
+    suggestions = []
+    for index, candidate in enumerate(best):
+        if not np.isfinite(cost[index, candidate]):
+            suggestions.append(None)
+            continue
+        red, green, blue = (int(channel) for channel in candidates[index, candidate])
+        suggestions.append((f"#{red:02x}{green:02x}{blue:02x}", float(ratios[index, candidate])))
+    return suggestions
+
+
+class ColorPair:
+    """A foreground/background color pair found in a file.
+
+    ``kind`` is "text" or "non-text" (component boundaries, focus
+    indicators); large text has lower thresholds.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        foreground: RGBA,
+        background: RGBA,
+        foreground_text: str,
+        background_text: str,
+        line_number: int,
+        large: bool = False
+    ):
+        self.kind = kind
+        self.foreground = foreground
+        self.background = background
+        self.foreground_text = foreground_text
+        self.background_text = background_text
+        self.line_number = line_number
+        self.large = large
+
+
+def is_large_text(font_size: Optional[str], font_weight: Optional[str]) -> bool:
+    """WCAG large text: at least 18pt, or 14pt bold (24px / 18.66px)."""
+    if not font_size:
+        return False
+    match = re.match(r"^\s*([\d.]+)\s*(px|pt|rem|em)?\s*$", font_size)
+    if not match:
+        return False
+    size = float(match.group(1))
+    unit = match.group(2) or "px"
+    pixels = size * {"px": 1.0, "pt": 4 / 3, "rem": 16.0, "em": 16.0}[unit]
+    weight = (font_weight or "").strip().lower()
+    bold = weight in ("bold", "bolder") or (weight.isdigit() and int(weight) >= 700)
+    return pixels >= 24 or (bold and pixels >= 18.66)
+
+
+def shorthand_color(value: str) -> Optional[Tuple[RGBA, str]]:
+    """The color of a shorthand such as ``background`` or ``border``; None for images."""
+    if "url(" in value or "gradient(" in value:
+        return None
+    for token in COLOR_TOKEN.findall(value):
+        color = parse_color(token)
+        if color is not None:
+            return color, token
+    return None
+
+
+class _StyleRule:
+    """The color-related declarations of one CSS rule or inline style."""
+
+    def __init__(self, selector: str, declarations: Dict[str, Tuple[str, int]]):
+        self.selector = selector
+        self.declarations = declarations
+
+    def value(self, *names: str) -> Optional[Tuple[str, int]]:
+        for name in names:
+            if name in self.declarations:
+                return self.declarations[name]
+        return None
+
+    def color(self, *names: str) -> Optional[Tuple[RGBA, str, int]]:
+        for name in names:
+            declared = self.declarations.get(name)
+            if declared is None:
+                continue
+            found = shorthand_color(declared[0])
+            if found is not None:
+                return found[0], found[1], declared[1]
+            if name.startswith("background"):
+                # An image background: no known color
+                return None
+        return None
+
+
+def _declarations(body: str, base_line: int, line_of, variables: Dict[str, str]) -> Dict[str, Tuple[str, int]]:
+    declarations = {}
+    for match in CSS_DECLARATION.finditer(body):
+        name = match.group(1).lower()
+        value = match.group(2).strip()
+        for _ in range(5):
+            resolved = CSS_VAR.sub(lambda var: variables.get(var.group(1), var.group(2) or ""), value)
+            if resolved == value:
+                break
+            value = resolved
+        declarations[name] = (value, base_line + line_of(match.start()))
+    return declarations
+
+
+def _css_rules(css: str, line_offset: int = 0) -> List[_StyleRule]:
+    # Comments are blanked keeping their line breaks, so positions map to lines
+    text = CSS_COMMENT.sub(lambda match: "\n" * match.group(0).count("\n"), css)
+    line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+    def line_of(position: int) -> int:
+        return bisect_right(line_starts, position)
+
+    variables = {match.group(1): match.group(2).strip() for match in CUSTOM_PROPERTY.finditer(text)}
+    rules = []
+    for match in CSS_RULE.finditer(text):
+        selector = match.group(1).strip().split(";")[-1].strip()
+        if selector.startswith("@"):
+            continue
+        declarations = _declarations(match.group(2), line_offset, lambda position: line_of(match.start(2) + position), variables)
+        rules.append(_StyleRule(selector, declarations))
+    return rules
+
+
+def _rule_pairs(
+    rules: List[_StyleRule],
+    page_foreground: Optional[Tuple[RGBA, str, int]],
+    page_background: Optional[Tuple[RGBA, str, int]]
+) -> List[ColorPair]:
+    pairs = []
+    for rule in rules:
+        own_foreground = rule.color("color")
+        own_background = rule.color("background-color", "background")
+        # Text over an image or gradient cannot be checked from the stylesheet
+        image_background = own_background is None and "background" in rule.declarations
+        if (own_foreground or own_background) is not None and not image_background:
+            foreground = own_foreground or page_foreground
+            background = own_background or page_background
+            if foreground is not None and background is not None:
+                font_size = rule.value("font-size")
+                font_weight = rule.value("font-weight")
+                pairs.append(ColorPair(
+                    "text", foreground[0], background[0], foreground[1], background[1],
+                    (own_foreground or own_background)[2],
+                    is_large_text(font_size[0] if font_size else None, font_weight[0] if font_weight else None)
+                ))
+        if COMPONENT_SELECTOR.search(rule.selector):
+            boundary = rule.color("border-color", "border", "outline-color", "outline")
+            if boundary is not None and page_background is not None:
+                pairs.append(ColorPair(
+                    "non-text", boundary[0], page_background[0], boundary[1], page_background[1], boundary[2]
+                ))
+    return pairs
+
+
+def _page_colors(rules: List[_StyleRule]):
+    foreground = background = None
+    for rule in rules:
+        if all(PAGE_SELECTOR.match(part) for part in rule.selector.split(",")):
+            foreground = rule.color("color") or foreground
+            background = rule.color("background-color", "background") or background
+    return foreground, background
+
+
+def css_pairs(css: str, line_offset: int = 0) -> List[ColorPair]:
+    """Color pairs declared in a stylesheet.
+
+    A rule's text color is paired with its own background, or with the
+    page (html/body/:root) background; backgrounds set alone are paired
+    with the page text color. Borders and outlines of component selectors
+    are checked against the page background.
+    """
+    rules = _css_rules(css, line_offset)
+    page_foreground, page_background = _page_colors(rules)
+    return _rule_pairs(rules, page_foreground, page_background)
+
+
+def _qml_pairs(content: str) -> List[ColorPair]:
+    pairs = []
+    for obj in parse_qml(content):
+        if obj.type_name not in QML_TEXT_TYPES or "color" not in obj.properties:
+            continue
+        foreground = parse_color(obj.properties["color"], qml=True)
+        if foreground is None:
+            continue
+        for ancestor in obj.ancestors():
+            if ancestor.type_name in QML_BACKGROUND_TYPES and "color" in ancestor.properties:
+                background = parse_color(ancestor.properties["color"], qml=True)
+                if background is None:
+                    break
+                pixel_size = obj.properties.get("font.pixelSize")
+                point_size = obj.properties.get("font.pointSize")
+                size = f"{pixel_size}px" if pixel_size else f"{point_size}pt" if point_size else None
+                bold = obj.properties.get("font.bold") == "true" or obj.properties.get("font.weight", "").endswith("Bold")
+                pairs.append(ColorPair(
+                    "text", foreground, background, obj.properties["color"], ancestor.properties["color"],
+                    obj.line, is_large_text(size, "bold" if bold else None)
+                ))
+                break
+    return pairs
+
+
+def extract_pairs(content: str, file_type: str) -> Optional[List[ColorPair]]:
+    """Every checkable color pair of a file; None for unsupported file types."""
+    family = file_family(file_type)
+    if family == "css":
+        return css_pairs(content)
+    if family == "qml":
+        return _qml_pairs(content)
+    return None
+
+
+def supports(file_type: str) -> bool:
+    # Markup is checked on computed styles by css_cascade
+    return file_family(file_type) in ("css", "qml")
+
+
+def covered_criteria(content: str, file_type: str) -> Tuple[str, ...]:
+    # Colors set by scripts, themes or other files are out of reach
+    return ()
+
+
+def pair_issues(pairs: List[ColorPair], lines: List[str]) -> List[Dict[str, Any]]:
+    """Check all pairs in one vectorized pass and describe the failures."""
+    if not pairs:
+        return []
+    ratios = contrast_ratios(
+        np.array([pair.foreground for pair in pairs]),
+        np.array([pair.background for pair in pairs])
+    )
+    level = settings.contrast_level.upper()
+    normal, large = TEXT_THRESHOLDS["AA"]
+    enhanced_normal, enhanced_large = TEXT_THRESHOLDS["AAA"]
+    is_text = np.array([pair.kind == "text" for pair in pairs])
+    is_large = np.array([pair.large for pair in pairs])
+    minimum = np.where(is_text, np.where(is_large, large, normal), NON_TEXT_THRESHOLD)
+    enhanced = np.where(is_large, enhanced_large, enhanced_normal)
+    failing = ratios < minimum
+    if level == "AAA":
+        failing |= is_text & (ratios < enhanced)
+
+    # The same failing pair repeated across rules is one issue
+    groups: Dict[Tuple, List[int]] = {}
+    for index in np.flatnonzero(failing):
+        pair = pairs[index]
+        if pair.kind == "non-text":
+            criterion, threshold = "1.4.11", NON_TEXT_THRESHOLD
+        elif ratios[index] < minimum[index]:
+            criterion, threshold = "1.4.3", float(minimum[index])
+        else:
+            criterion, threshold = "1.4.6", float(enhanced[index])
+        key = (criterion, threshold, pair.kind, pair.large, pair.foreground, pair.background)
+        groups.setdefault(key, []).append(index)
+
+    firsts = [indexes[0] for indexes in groups.values()]
+    suggestions = suggest_colors(
+        np.array([pairs[index].foreground for index in firsts]).reshape(-1, 4),
+        np.array([pairs[index].background for index in firsts]).reshape(-1, 4),
+        np.array([key[1] for key in groups])
+    )
+
+    issues = []
+    for (criterion, threshold, kind, large, _, _), indexes, suggestion in zip(groups, groups.values(), suggestions):
+        pair = pairs[indexes[0]]
+        ratio = float(ratios[indexes[0]])
+        if criterion == "1.4.11":
+            severity, subject = "medium", "Component boundary"
+        else:
+            severity = "low" if criterion == "1.4.6" else "high" if ratio < 3.0 else "medium"
+            subject = "Large text" if large else "Text"
+        description = (
+            f"{subject} color {pair.foreground_text} on background {pair.background_text} has a contrast ratio of "
+            f"{ratio:.2f}:1; WCAG {criterion} requires at least {threshold:g}:1."
+        )
+        others = sorted({pairs[index].line_number for index in indexes[1:]} - {pair.line_number})
+        if others:
+            listed = ", ".join(str(number) for number in others[:10])
+            description += f" The same colors are used on {len(others)} more lines ({listed}{', ...' if len(others) > 10 else ''})."
+        line = lines[pair.line_number - 1].strip() if 0 < pair.line_number <= len(lines) else pair.foreground_text
+        issues.append(make_issue(
+            criterion, severity,
+            f"Insufficient contrast ({ratio:.2f}:1)",
+            description,
+            pair.line_number, line,
+            f"Use {suggestion[0]} ({suggestion[1]:.2f}:1) or another color with at least {threshold:g}:1 against the background."
+            if suggestion else f"Change the colors to reach at least {threshold:g}:1."
+        ))
+    return issues
+
+
+def check_file(content: str, file_type: str) -> Optional[List[Dict[str, Any]]]:
+    """Contrast issues of a file; None if its type is not supported."""
+    pairs = extract_pairs(content, file_type)
+    if pairs is None:
+        return None
+    return pair_issues(pairs, content.split("\n"))
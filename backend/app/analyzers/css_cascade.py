@@ -0,0 +1,715 @@
+import posixpath
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Sequence
+import numpy as np
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+from app.config import settings
+from app.analyzers.contrast import (
+    CSS_COMMENT, CSS_DECLARATION, CSS_VAR, RGBA, ColorPair, contrast_ratios, is_large_text, pair_issues,
+    parse_color, shorthand_color
+)
+from app.analyzers.static_rules import TEXT_TYPES, make_issue
+from app.services.chunker import file_family
+
+# (inline, ids, classes/attributes/pseudo-classes, types/pseudo-elements)
+Specificity = Tuple[int, int, int, int]
+INLINE_SPECIFICITY = (1, 0, 0, 0)
+
+ATTRIBUTE_SELECTOR = re.compile(r"\[[^\]]*\]")
+WHERE_SELECTOR = re.compile(r":where\([^()]*\)")
+LOGICAL_PSEUDO = re.compile(r":(?:not|is|matches|has)\(")
+PSEUDO_ARGUMENTS = re.compile(r"(:[\w-]+)\([^()]*\)")
+ID_SELECTOR = re.compile(r"#([\w-]+)")
+CLASS_SELECTOR = re.compile(r"\.([\w-]+)|(?<!:):[\w-]+")
+TYPE_SELECTOR = re.compile(r"(?:^|[\s>+~(])([a-zA-Z][\w-]*)|::[\w-]+")
+COMBINATOR = re.compile(r"\s*[\s>+~]\s*")
+# Compounds like div, .a.b or button#ok.primary, matched without soupsieve
+SIMPLE_COMPOUND = re.compile(r"^([a-zA-Z][\w-]*|\*)?((?:[#.][\w-]+)*)$")
+DESCENDANT_OR_CHILD = re.compile(r"\s*([\s>])\s*")
+FOCUS_PSEUDO = re.compile(r":focus(?:-visible)?(?![\w-])")
+# States and pseudo-elements that cannot be evaluated statically
+DYNAMIC_PSEUDO = re.compile(
+    r"::|:(?:hover|active|visited|target|focus-within|before|after|first-line|first-letter)(?![\w-])"
+)
+# At-rules whose blocks do not style the screen rendering of elements
+SKIPPED_AT_RULE = re.compile(
+    r"^@(?:media\s+(?:only\s+)?print\b|(?:-\w+-)?keyframes|font-face|page|counter-style|property|font-feature-values)",
+    re.IGNORECASE
+)
+LENGTH = re.compile(r"^(-?[\d.]+)(px|pt|rem|em|%)?$")
+BRACE = re.compile(r"[{}]")
+
+DEFAULT_FONT_SIZE = 16.0
+FONT_SIZE_KEYWORDS = {
+    "xx-small": 9.0, "x-small": 10.0, "small": 13.0, "medium": 16.0,
+    "large": 18.0, "x-large": 24.0, "xx-large": 32.0, "xxx-large": 48.0
+}
+# User agent defaults that matter for large text
+HEADING_SIZES = {"h1": 2.0, "h2": 1.5, "h3": 1.17, "h4": 1.0, "h5": 0.83, "h6": 0.67}
+BOLD_TAGS = {"b", "strong", "th", *HEADING_SIZES}
+# Width and height do not apply to these unless their display changes
+INLINE_TAGS = {"a", "span", "label", "abbr", "b", "strong", "em", "i", "small", "code", "u", "s", "sub", "sup"}
+NOT_RENDERED_TAGS = {"head", "script", "style", "noscript", "title", "meta", "link"}
+FORM_CONTROLS = {"input", "select", "textarea"}
+
+# Declarations of a :focus rule that make focus visible without the outline
+FOCUS_INDICATORS = re.compile(r"^(?:outline|box-shadow|border|background|text-decoration|color)")
+NO_CHANGE = {"none", "inherit", "initial", "unset", "transparent", "0"}
+MIN_TARGET_SIZE = 24.0
+
+
+def specificity(selector: str) -> Specificity:
+    """Specificity of one complex selector (:where() counts nothing, :not()/:is() their arguments)."""
+    selector = WHERE_SELECTOR.sub("", selector)
+    attributes = len(ATTRIBUTE_SELECTOR.findall(selector))
+    selector = ATTRIBUTE_SELECTOR.sub(" ", selector)
+    selector = LOGICAL_PSEUDO.sub(" (", selector)
+    selector = PSEUDO_ARGUMENTS.sub(r"\1", selector)
+    ids = len(ID_SELECTOR.findall(selector))
+    selector = ID_SELECTOR.sub(" ", selector)
+    classes = len(CLASS_SELECTOR.findall(selector))
+    types = len(TYPE_SELECTOR.findall(CLASS_SELECTOR.sub("", selector)))
+    return (0, ids, classes + attributes, types)
+
+
+def _rule_key(selector: str) -> Optional[Tuple[str, str]]:
+    """The id, class or tag the matched element must have, from the rightmost compound.
+
+    Rules are only tried on elements carrying their key, as browsers do
+    with their rule hash tables.
+    """
+    plain = PSEUDO_ARGUMENTS.sub(r"\1", ATTRIBUTE_SELECTOR.sub("", selector))
+    if "(" in plain:
+        return None
+    compound = COMBINATOR.split(plain.strip())[-1]
+    match = ID_SELECTOR.search(compound)
+    if match:
+        return ("id", match.group(1))
+    match = re.search(r"\.([\w-]+)", compound)
+    if match:
+        return ("class", match.group(1))
+    match = re.match(r"[a-zA-Z][\w-]*", compound)
+    if match:
+        return ("tag", match.group(0).lower())
+    return None
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    """Split a selector list on its top-level commas."""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:index].strip())
+            start = index + 1
+    selectors.append(prelude[start:].strip())
+    return [selector for selector in selectors if selector]
+
+
+def _parse_declarations(body: str, line_of) -> List[Tuple[str, str, bool, int]]:
+    declarations = []
+    for match in CSS_DECLARATION.finditer(body):
+        value = match.group(2).strip()
+        important = value.lower().endswith("!important")
+        if important:
+            value = value[:-len("!important")].strip()
+        declarations.append((match.group(1).lower(), value, important, line_of(match.start())))
+    return declarations
+
+
+class _SimpleSelector:
+    """Compounds of tag, id and classes joined by descendant or child combinators.
+
+    Most stylesheet selectors look like this; matching them directly
+    against precomputed class sets avoids soupsieve's per-call overhead.
+    """
+
+    def __init__(self, compounds: List[Tuple[Optional[str], Optional[str], frozenset]], combinators: List[str]):
+        self.compounds = compounds
+        self.combinators = combinators
+        # Every tag, id and class the selector needs somewhere in the document
+        self.keys = {
+            key
+            for tag, element_id, class_names in compounds
+            for key in [("tag", tag), ("id", element_id), *(("class", name) for name in class_names)]
+            if key[1] is not None
+        }
+
+    def match(self, element: Tag, classes: Dict[int, frozenset]) -> bool:
+        return self._match_from(element, len(self.compounds) - 1, classes)
+
+    def _match_from(self, element: Tag, index: int, classes: Dict[int, frozenset]) -> bool:
+        tag, element_id, class_names = self.compounds[index]
+        if tag is not None and element.name != tag:
+            return False
+        if element_id is not None and element.get("id") != element_id:
+            return False
+        if class_names and not class_names <= classes.get(id(element), frozenset()):
+            return False
+        if index == 0:
+            return True
+        parent = element.parent
+        if self.combinators[index - 1] == ">":
+            return _is_element(parent) and self._match_from(parent, index - 1, classes)
+        while _is_element(parent):
+            if self._match_from(parent, index - 1, classes):
+                return True
+            parent = parent.parent
+        return False
+
+
+class _CompiledSelector:
+    """Any other selector, matched by soupsieve."""
+
+    def __init__(self, compiled: soupsieve.SoupSieve):
+        self.compiled = compiled
+
+    def match(self, element: Tag, classes: Dict[int, frozenset]) -> bool:
+        return self.compiled.match(element)
+
+
+def _is_element(node) -> bool:
+    return isinstance(node, Tag) and not isinstance(node, BeautifulSoup)
+
+
+@lru_cache(maxsize=8192)
+def _matcher(selector: str):
+    """A matcher for a selector, shared by every rule and stylesheet using it; None if unsupported."""
+    parts = DESCENDANT_OR_CHILD.split(selector.strip())
+    compounds = []
+    for part in parts[::2]:
+        match = SIMPLE_COMPOUND.match(part)
+        if match is None or not part:
+            break
+        tag = match.group(1) if match.group(1) not in (None, "*") else None
+        qualifiers = re.findall(r"([#.])([\w-]+)", match.group(2))
+        ids = [name for kind, name in qualifiers if kind == "#"]
+        if len(ids) > 1:
+            break
+        class_names = frozenset(name for kind, name in qualifiers if kind == ".")
+        compounds.append((tag.lower() if tag else None, ids[0] if ids else None, class_names))
+    else:
+        return _SimpleSelector(compounds, parts[1::2])
+    try:
+        return _CompiledSelector(soupsieve.compile(selector))
+    except Exception:
+        # Unsupported or invalid selectors (vendor pseudo-classes, nesting)
+        return None
+
+
+class StyleRule:
+    """One selector of a stylesheet rule, with its cascade data precomputed."""
+
+    def __init__(
+        self,
+        selector: str,
+        declarations: List[Tuple[str, str, bool, int]],
+        source: str,
+        order: int
+    ):
+        self.specificity = specificity(selector)
+        # Focus rules are matched without their :focus and apply in the focused state only
+        self.focus = bool(FOCUS_PSEUDO.search(selector))
+        self.selector = FOCUS_PSEUDO.sub("", selector).strip() or "*"
+        if self.selector[-1] in " >+~":
+            self.selector += "*"
+        self.key = _rule_key(self.selector)
+        self.matcher = _matcher(self.selector)
+        self.declarations = declarations
+        self.source = source
+        self.order = order
+
+
+@lru_cache(maxsize=32)
+def parse_stylesheet(css: str, source: str, line_offset: int = 0) -> Tuple[StyleRule, ...]:
+    """The style rules of a stylesheet, one per selector, in source order.
+
+    Cached per worker, so a session's stylesheets are parsed once for all
+    of its markup files. Rules inside print media, keyframes and font
+    faces are skipped; other conditional rules are assumed to apply.
+    """
+    text = CSS_COMMENT.sub(lambda match: "\n" * match.group(0).count("\n"), css)
+    line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+    rules: List[StyleRule] = []
+    skipped_depth = 0
+    at_rules: List[bool] = []
+    position = 0
+    start = 0
+    while True:
+        match = BRACE.search(text, position)
+        if match is None:
+            break
+        if match.group() == "}":
+            if at_rules and at_rules.pop():
+                skipped_depth -= 1
+            position = start = match.end()
+            continue
+        prelude = text[start:match.start()].split(";")[-1].strip()
+        if prelude.startswith("@"):
+            skipped = bool(SKIPPED_AT_RULE.match(prelude))
+            at_rules.append(skipped)
+            skipped_depth += skipped
+            position = start = match.end()
+            continue
+        end = text.find("}", match.end())
+        if end < 0:
+            end = len(text)
+        if not skipped_depth:
+            body_start = match.end()
+            declarations = _parse_declarations(
+                text[body_start:end],
+                lambda offset: line_offset + bisect_right(line_starts, body_start + offset)
+            )
+            if declarations:
+                for selector in _split_selectors(prelude):
+                    if not DYNAMIC_PSEUDO.search(selector):
+                        rules.append(StyleRule(selector, declarations, source, len(rules)))
+        position = start = end + 1
+    return tuple(rules)
+
+
+def _length(value: Optional[str], font_size: float, root_font_size: float, percent_of: Optional[float] = None) -> Optional[float]:
+    """A length in CSS pixels; None if it depends on layout (auto, vw, calc(), % of a box)."""
+    if not value:
+        return None
+    match = LENGTH.match(value.strip().lower())
+    if not match:
+        return None
+    try:
+        number = float(match.group(1))
+    except ValueError:
+        return None
+    unit = match.group(2) or ("px" if number == 0 else None)
+    if unit == "%":
+        return None if percent_of is None else number / 100 * percent_of
+    scale = {"px": 1.0, "pt": 4 / 3, "em": font_size, "rem": root_font_size}.get(unit)
+    return None if scale is None else number * scale
+
+
+def _hex(color: RGBA) -> str:
+    red, green, blue = (int(round(channel)) for channel in color[:3])
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+class ComputedStyle:
+    """The resolved styles of one element that the checks and the prompt need.
+
+    Colors are None when they cannot be determined statically (images,
+    gradients, unresolved variables); the background is the effective one
+    behind the element, translucent layers composited.
+    """
+
+    def __init__(self, element: Optional[Tag]):
+        self.element = element
+        self.line_number = element.sourceline if element is not None else None
+        self.variables: Dict[str, str] = {}
+        self.color: Optional[RGBA] = (0.0, 0.0, 0.0, 1.0)
+        self.color_text = "black"
+        self.background: Optional[RGBA] = (255.0, 255.0, 255.0, 1.0)
+        self.background_text = "white"
+        self.colors_declared = False
+        self.font_size = DEFAULT_FONT_SIZE
+        self.bold = False
+        self.hidden = False
+        self.invisible = False
+        self.width: Optional[float] = None
+        self.height: Optional[float] = None
+        # Border of a form control against the background around it (1.4.11)
+        self.boundary: Optional[ColorPair] = None
+        self.declared = False
+        # (value, where) of the declaration removing the focus outline, if not replaced
+        self.focus_outline_removed: Optional[Tuple[str, str]] = None
+
+
+def _focusable(element: Tag) -> bool:
+    if element.name == "a":
+        return element.has_attr("href") or element.has_attr(":href") or element.has_attr("v-bind:href")
+    if element.name == "input":
+        return (element.get("type") or "").lower() != "hidden"
+    if element.name in ("button", "select", "textarea", "summary"):
+        return True
+    tabindex = element.get("tabindex")
+    return (tabindex is not None and tabindex.strip() != "-1") or element.has_attr("contenteditable")
+
+
+def _has_text(element: Tag) -> bool:
+    return any(type(child) in TEXT_TYPES and child.strip() for child in element.children)
+
+
+def _linked_stylesheets(soup: BeautifulSoup, stylesheets: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """The session stylesheets a document links, or all of them if it links none (components)."""
+    hrefs = [
+        posixpath.basename((link.get("href") or "").split("?")[0])
+        for link in soup.find_all("link")
+        if "stylesheet" in (link.get("rel") or [])
+    ]
+    if not hrefs:
+        return list(stylesheets)
+    by_name = {posixpath.basename(name.replace("\\", "/")): (name, css) for name, css in stylesheets}
+    return [by_name[href] for href in hrefs if href in by_name]
+
+
+def _winners(
+    rules: List[Tuple[Tuple, StyleRule]],
+    inline: List[Tuple[str, str, bool, int]],
+    focused: bool
+) -> Dict[str, Tuple[Tuple, str, str]]:
+    """The winning (rank, value, where) of each property after the cascade."""
+    winners: Dict[str, Tuple[Tuple, str, str]] = {}
+    for rank, rule in rules:
+        if rule.focus and not focused:
+            continue
+        for name, value, important, line in rule.declarations:
+            declared_rank = (important, *rank)
+            if name not in winners or declared_rank >= winners[name][0]:
+                winners[name] = (declared_rank, value, f"{rule.source} line {line}")
+    for name, value, important, line in inline:
+        declared_rank = (important, INLINE_SPECIFICITY)
+        if name not in winners or declared_rank >= winners[name][0]:
+            winners[name] = (declared_rank, value, f"style attribute on line {line}")
+    return winners
+
+
+def _pick(winners: Dict[str, Tuple[Tuple, str, str]], *names: str) -> Optional[Tuple[str, str]]:
+    """The (value, where) of the highest-ranked of several properties (a shorthand and its longhand)."""
+    found = [winners[name] for name in names if name in winners]
+    if not found:
+        return None
+    _, value, where = max(found, key=lambda winner: winner[0])
+    return value, where
+
+
+def _resolve_variables(value: str, variables: Dict[str, str]) -> str:
+    for _ in range(5):
+        resolved = CSS_VAR.sub(lambda var: variables.get(var.group(1), var.group(2) or ""), value)
+        if resolved == value:
+            break
+        value = resolved
+    return value.strip()
+
+
+def _outline_removed(value: str) -> bool:
+    """Whether an outline value hides it: none, hidden or a zero width."""
+    for token in value.lower().split():
+        if token in ("none", "hidden"):
+            return True
+        match = LENGTH.match(token)
+        if match and match.group(1).strip("0.") == "":
+            return True
+    return False
+
+
+def _padding_sides(value: str) -> Dict[str, str]:
+    """The four sides of a padding shorthand (1 to 4 values)."""
+    values = value.split()
+    if not values or len(values) > 4:
+        return {}
+    top = values[0]
+    right = values[1] if len(values) > 1 else top
+    bottom = values[2] if len(values) > 2 else top
+    left = values[3] if len(values) > 3 else right
+    return {"top": top, "right": right, "bottom": bottom, "left": left}
+
+
+def _compute(
+    element: Tag,
+    parent: ComputedStyle,
+    rules: List[Tuple[Tuple, StyleRule]],
+    root_font_size: float
+) -> ComputedStyle:
+    inline = []
+    if element.get("style"):
+        inline = _parse_declarations(element["style"], lambda offset: element.sourceline or 1)
+    winners = _winners(rules, inline, focused=False)
+    style = ComputedStyle(element)
+    style.declared = bool(winners)
+
+    own_variables = {name: value for name, (_, value, _) in winners.items() if name.startswith("--")}
+    style.variables = {**parent.variables, **own_variables} if own_variables else parent.variables
+
+    def value_of(*names: str) -> Optional[Tuple[str, str]]:
+        picked = _pick(winners, *names)
+        if picked is None:
+            return None
+        return _resolve_variables(picked[0], style.variables).lower(), picked[1]
+
+    font_size = value_of("font-size")
+    style.font_size = parent.font_size * HEADING_SIZES.get(element.name, 1.0)
+    if font_size is not None:
+        keyword = font_size[0]
+        if keyword in FONT_SIZE_KEYWORDS:
+            style.font_size = FONT_SIZE_KEYWORDS[keyword]
+        elif keyword in ("smaller", "larger"):
+            style.font_size = parent.font_size * (1 / 1.2 if keyword == "smaller" else 1.2)
+        else:
+            style.font_size = _length(keyword, parent.font_size, root_font_size, parent.font_size) or style.font_size
+
+    weight = value_of("font-weight")
+    style.bold = parent.bold or element.name in BOLD_TAGS
+    if weight is not None:
+        if weight[0] in ("bold", "bolder") or (weight[0].isdigit() and int(weight[0]) >= 700):
+            style.bold = True
+        elif weight[0] in ("normal", "lighter") or weight[0].isdigit():
+            style.bold = False
+
+    style.color, style.color_text = parent.color, parent.color_text
+    style.colors_declared = parent.colors_declared
+    color = value_of("color")
+    if color is not None and color[0] not in ("inherit", "currentcolor", "unset"):
+        style.color = (0.0, 0.0, 0.0, 1.0) if color[0] == "initial" else parse_color(color[0])
+        style.color_text = color[0]
+        style.colors_declared = True
+
+    style.background, style.background_text = parent.background, parent.background_text
+    background = value_of("background-color", "background")
+    if background is not None and background[0] not in ("inherit", "none", "initial", "unset"):
+        style.colors_declared = True
+        found = shorthand_color(background[0])
+        if found is None:
+            # An image, gradient or unresolved value hides what is behind
+            style.background, style.background_text = None, background[0]
+        elif found[0][3] >= 1.0:
+            style.background, style.background_text = found[0], found[1]
+        elif found[0][3] > 0.0 and parent.background is not None:
+            alpha = found[0][3]
+            style.background = tuple(
+                own * alpha + behind * (1 - alpha) for own, behind in zip(found[0][:3], parent.background[:3])
+            ) + (1.0,)
+            style.background_text = f"{found[1]} over {parent.background_text}"
+
+    display = value_of("display")
+    visibility = value_of("visibility")
+    style.invisible = parent.invisible
+    if visibility is not None:
+        style.invisible = visibility[0] in ("hidden", "collapse")
+    style.hidden = (
+        parent.hidden or element.name in NOT_RENDERED_TAGS or element.has_attr("hidden")
+        or (display is not None and display[0] == "none")
+    )
+
+    inline_box = display[0] == "inline" if display is not None else element.name in INLINE_TAGS
+    if not inline_box:
+        border_box = (value_of("box-sizing") or ("", ""))[0] == "border-box"
+        padding = _padding_sides((value_of("padding") or ("", ""))[0])
+        for axis, minimum, sides in (("width", "min-width", ("left", "right")), ("height", "min-height", ("top", "bottom"))):
+            lengths = [
+                _length((value_of(name) or ("", ""))[0], style.font_size, root_font_size)
+                for name in (axis, minimum)
+            ]
+            lengths = [length for length in lengths if length is not None]
+            if not lengths:
+                continue
+            size = max(lengths)
+            if not border_box:
+                for side in sides:
+                    side_value = (value_of(f"padding-{side}") or (padding.get(side, ""), ""))[0]
+                    size += _length(side_value, style.font_size, root_font_size) or 0.0
+            setattr(style, axis, size)
+
+    if element.name in FORM_CONTROLS and parent.background is not None:
+        border = value_of("border-color", "border")
+        found = shorthand_color(border[0]) if border is not None else None
+        if found is not None and found[0][3] > 0.0:
+            style.boundary = ColorPair(
+                "non-text", found[0], parent.background, found[1], parent.background_text, element.sourceline or 0
+            )
+
+    if _focusable(element):
+        focused = _winners(rules, inline, focused=True)
+        outline = _pick(focused, "outline", "outline-style", "outline-width")
+        if outline is not None and _outline_removed(_resolve_variables(outline[0], style.variables)):
+            replaced = any(
+                FOCUS_INDICATORS.match(name) and value.lower() not in NO_CHANGE
+                and not (name.startswith("outline") and _outline_removed(value))
+                for _, rule in rules if rule.focus
+                for name, value, _, _ in rule.declarations
+            )
+            if not replaced:
+                style.focus_outline_removed = outline
+    return style
+
+
+def resolve_styles(content: str, stylesheets: Sequence[Tuple[str, str]] = ()) -> List[ComputedStyle]:
+    """Computed styles of every element of an HTML/Vue/Svelte file, in document order.
+
+    ``stylesheets`` are (filename, css) of the session's stylesheets; those
+    the document links (all of them if it links none) cascade before its
+    own <style> blocks and style attributes. Each rule is only matched
+    against the elements carrying its rightmost id, class or tag, rules
+    naming classes or ids absent from the document are skipped, and each
+    distinct selector is matched only once.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    sheets = [(name, css, 0) for name, css in _linked_stylesheets(soup, stylesheets)]
+    sheets.extend(
+        ("this file", style.get_text(), (style.sourceline or 1) - 1) for style in soup.find_all("style")
+    )
+
+    elements = soup.find_all(True)
+    candidates_by_key: Dict[Tuple[str, str], List[Tag]] = {}
+    classes: Dict[int, frozenset] = {}
+    for element in elements:
+        candidates_by_key.setdefault(("tag", element.name), []).append(element)
+        if isinstance(element.get("id"), str):
+            candidates_by_key.setdefault(("id", element["id"]), []).append(element)
+        if element.get("class"):
+            classes[id(element)] = frozenset(element["class"])
+            for class_name in classes[id(element)]:
+                candidates_by_key.setdefault(("class", class_name), []).append(element)
+
+    matched_by_selector: Dict[str, List[Tag]] = {}
+    matched_rules: Dict[int, List[Tuple[Tuple, StyleRule]]] = {}
+    for sheet_index, (source, css, line_offset) in enumerate(sheets):
+        for rule in parse_stylesheet(css, source, line_offset):
+            candidates = elements if rule.key is None else candidates_by_key.get(rule.key)
+            if not candidates:
+                continue
+            if isinstance(rule.matcher, _SimpleSelector) and not all(key in candidates_by_key for key in rule.matcher.keys):
+                continue
+            if rule.selector not in matched_by_selector:
+                matched_by_selector[rule.selector] = (
+                    [] if rule.matcher is None
+                    else [element for element in candidates if rule.matcher.match(element, classes)]
+                )
+            rank = (rule.specificity, sheet_index, rule.order)
+            for element in matched_by_selector[rule.selector]:
+                matched_rules.setdefault(id(element), []).append((rank, rule))
+
+    root = ComputedStyle(None)
+    root_font_size = DEFAULT_FONT_SIZE
+    computed: Dict[int, ComputedStyle] = {}
+    styles = []
+    for element in elements:
+        parent = computed.get(id(element.parent), root)
+        style = _compute(element, parent, matched_rules.get(id(element), []), root_font_size)
+        if element.name == "html":
+            root_font_size = style.font_size
+        computed[id(element)] = style
+        styles.append(style)
+    return styles
+
+
+def _describe(element: Tag) -> str:
+    name = element.name
+    if isinstance(element.get("id"), str):
+        name += f"#{element['id']}"
+    for class_name in (element.get("class") or [])[:2]:
+        name += f".{class_name}"
+    return f"<{name}>"
+
+
+def style_issues(styles: List[ComputedStyle], lines: List[str]) -> List[Dict[str, Any]]:
+    """Contrast (1.4.3, 1.4.11), focus visible (2.4.7) and target size (2.5.8) issues."""
+    pairs = []
+    for style in styles:
+        element = style.element
+        if style.hidden or style.invisible or not element.sourceline:
+            continue
+        if style.colors_declared and style.color is not None and style.background is not None and _has_text(element):
+            pairs.append(ColorPair(
+                "text", style.color, style.background, style.color_text, style.background_text,
+                element.sourceline, is_large_text(f"{style.font_size}px", "bold" if style.bold else None)
+            ))
+        if style.boundary is not None:
+            pairs.append(style.boundary)
+    issues = pair_issues(pairs, lines)
+
+    def snippet(style: ComputedStyle) -> str:
+        return lines[style.line_number - 1].strip() if style.line_number <= len(lines) else str(style.element)
+
+    def others(group: List[ComputedStyle]) -> str:
+        numbers = sorted({style.line_number for style in group[1:]} - {group[0].line_number})
+        if not numbers:
+            return ""
+        listed = ", ".join(str(number) for number in numbers[:10])
+        return f" The same applies on {len(numbers)} more lines ({listed}{', ...' if len(numbers) > 10 else ''})."
+
+    focus_groups: Dict[Tuple[str, str], List[ComputedStyle]] = {}
+    target_groups: Dict[Tuple[float, float], List[ComputedStyle]] = {}
+    for style in styles:
+        if style.hidden or style.invisible or not style.line_number or not _focusable(style.element):
+            continue
+        if style.focus_outline_removed is not None:
+            focus_groups.setdefault(style.focus_outline_removed, []).append(style)
+        if style.width is not None and style.height is not None and min(style.width, style.height) < MIN_TARGET_SIZE:
+            target_groups.setdefault((round(style.width, 1), round(style.height, 1)), []).append(style)
+
+    for (value, where), group in focus_groups.items():
+        first = group[0]
+        issues.append(make_issue(
+            "2.4.7", "high",
+            "Focus indicator removed",
+            f"The outline of this {_describe(first.element)} is removed on focus (`{value}`, {where}) and no focus "
+            f"style replaces it, so keyboard users cannot see where focus is.{others(group)}",
+            first.line_number, snippet(first),
+            "Keep the default outline or add a visible :focus-visible style (outline, box-shadow or border)."
+        ))
+    for (width, height), group in target_groups.items():
+        first = group[0]
+        issues.append(make_issue(
+            "2.5.8", "medium",
+            f"Target smaller than 24×24 px ({width:g}×{height:g})",
+            f"This {_describe(first.element)} is {width:g}×{height:g} CSS pixels once the stylesheets are applied; "
+            f"WCAG 2.5.8 requires targets of at least 24×24 unless they are spaced 24px apart.{others(group)}",
+            first.line_number, snippet(first),
+            "Give the target a min-width/min-height (or padding) of at least 24px, or space it from other targets."
+        ))
+    return issues
+
+
+def style_summary(styles: List[ComputedStyle]) -> List[Tuple[int, str]]:
+    """(line, text) summaries of the computed styles of styled text and focusable elements."""
+    limit = settings.cascade_summary_elements
+    if limit <= 0 or not any(style.declared for style in styles):
+        return []
+    selected = [
+        style for style in styles
+        if style.line_number and not style.hidden and not style.invisible
+        and (_focusable(style.element) or (style.colors_declared and _has_text(style.element)))
+    ][:limit]
+    known = [style for style in selected if style.color is not None and style.background is not None]
+    ratios = {}
+    if known:
+        values = contrast_ratios(np.array([style.color for style in known]), np.array([style.background for style in known]))
+        ratios = {id(style): float(ratio) for style, ratio in zip(known, values)}
+
+    summary = []
+    for style in selected:
+        foreground = _hex(style.color) if style.color is not None else style.color_text
+        background = _hex(style.background) if style.background is not None else style.background_text
+        parts = [f"{foreground} on {background}" + (f" ({ratios[id(style)]:.1f}:1)" if id(style) in ratios else "")]
+        parts.append(f"{style.font_size:g}px{' bold' if style.bold else ''}")
+        if style.width is not None and style.height is not None:
+            parts.append(f"{style.width:g}×{style.height:g}px")
+        if style.focus_outline_removed is not None:
+            parts.append("focus outline removed")
+        summary.append((style.line_number, f"{_describe(style.element)} {', '.join(parts)}"))
+    return summary
+
+
+def supports(file_type: str) -> bool:
+    # XML layouts and SVG are not styled by the session's stylesheets
+    return file_family(file_type) == "markup" and not file_type.lower().endswith(("xml", "svg"))
+
+
+def is_stylesheet(file_type: str) -> bool:
+    """Plain CSS; SCSS and Less need compiling (nesting, mixins) before they cascade."""
+    return file_family(file_type) == "css" and not file_type.lower().endswith(("scss", "less"))
+
+
+def check_file(
+    content: str,
+    file_type: str,
+    stylesheets: Sequence[Tuple[str, str]] = ()
+) -> Optional[Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]]:
+    """Issues and the computed-style summary of a markup file; None for other file types."""
+    if not supports(file_type):
+        return None
+    styles = resolve_styles(content, stylesheets)
+    return style_issues(styles, content.split("\n")), style_summary(styles)
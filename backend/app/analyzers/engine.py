@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Union
+from app.config import settings
+from app.analyzers import contrast, css_cascade, image_contrast, static_rules
+from app.services.chunker import Chunk
+
+logger = logging.getLogger(__name__)
+
+# llm_model value of issues found by the local rules
+STATIC_MODEL = "static-rules"
+
+MODES = ("off", "augment", "narrow", "only")
+
+# Local analyzers of single files; each has supports(), check_file() and covered_criteria()
+ANALYZERS = (static_rules, contrast)
+
+# (line, text) computed-style summaries of a markup file, for its prompt
+StyleSummary = List[Tuple[int, str]]
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def static_mode() -> str:
+    mode = settings.static_rules_mode.lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown static rules mode: {settings.static_rules_mode}")
+    return mode
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Worker pool for the rules; None runs them in the default thread pool."""
+    global _executor
+    if _executor is None and settings.static_rules_workers > 0:
+        _executor = ProcessPoolExecutor(max_workers=settings.static_rules_workers)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def supports(file_type: str) -> bool:
+    return css_cascade.supports(file_type) or any(analyzer.supports(file_type) for analyzer in ANALYZERS)
+
+
+def covered_criteria(content: str, file_type: str) -> List[str]:
+    return [criterion for analyzer in ANALYZERS for criterion in analyzer.covered_criteria(content, file_type)]
+
+
+def session_stylesheets(files: Sequence[Tuple[str, str, str]]) -> List[Tuple[str, str]]:
+    """The (filename, css) of a session's stylesheets from its (filename, content, file_type) files."""
+    return [(filename, content) for filename, content, file_type in files if css_cascade.is_stylesheet(file_type)]
+
+
+def check_file(
+    content: str,
+    file_type: str,
+    stylesheets: Sequence[Tuple[str, str]] = ()
+) -> Optional[Tuple[List[Dict[str, Any]], StyleSummary]]:
+    """Run every analyzer that supports a file type; None if none does.
+
+    Markup files also get their computed styles resolved against the
+    session's ``stylesheets`` (filename, css). Runs in a worker process,
+    so it takes and returns plain data.
+    """
+    results = [
+        analyzer.check_file(content, file_type) for analyzer in ANALYZERS if analyzer.supports(file_type)
+    ]
+    summary: StyleSummary = []
+    cascade = css_cascade.check_file(content, file_type, stylesheets)
+    if cascade is not None:
+        results.append(cascade[0])
+        summary = cascade[1]
+    if not results:
+        return None
+    return [issue for issues in results for issue in issues or []], summary
+
+
+async def run_static_rules(
+    content: str,
+    file_type: str,
+    stylesheets: Sequence[Tuple[str, str]] = ()
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[StyleSummary]]:
+    """Check a file with the local analyzers in the worker pool.
+
+    Returns issues shaped like parsed LLM issues and the file's computed
+    style summary, or (None, None) if the rules are off, do not support the
+    file type or failed on this file. ``stylesheets`` are the session's
+    CSS files, which apply to its markup files.
+    """
+    if static_mode() == "off" or not supports(file_type):
+        return None, None
+    loop = asyncio.get_running_loop()
+    if not css_cascade.supports(file_type):
+        stylesheets = ()
+    try:
+        result = await loop.run_in_executor(_get_executor(), check_file, content, file_type, tuple(stylesheets))
+    except Exception as e:
+        logger.error(f"💥 [STATIC RULES] Failed on a {file_type} file: {e}")
+        return None, None
+    if result is None:
+        return None, None
+    return result
+
+
+async def run_image_rules(source: Union[str, bytes], file_type: str) -> Optional[List[Dict[str, Any]]]:
+    """Find low-contrast regions of an uploaded image in the worker pool.
+
+    ``source`` is the image's path, read in the worker so the image never
+    crosses the process boundary, or its bytes. None if the rules are off,
+    the file type is not a supported raster format or the image could not
+    be read.
+    """
+    if static_mode() == "off" or not image_contrast.supports(file_type):
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), image_contrast.check_file, source, file_type)
+    except Exception as e:
+        logger.error(f"💥 [STATIC RULES] Failed on a {file_type} image: {e}")
+        return None
+
+
+def replaces_llm(static_issues: Optional[List[Dict[str, Any]]], file_type: str = "") -> bool:
+    """Whether a file checked by the rules needs no LLM call.
+
+    True in "only" mode, and for raster images the image rules checked
+    whenever the rules are on: the LLM would only see their name and size.
+    ``static_issues`` is None if the file was not checked.
+    """
+    if static_issues is None:
+        return False
+    mode = static_mode()
+    return mode == "only" or (mode != "off" and image_contrast.supports(file_type))
+
+
+def prompt_note(
+    file_type: str,
+    static_issues: Optional[List[Dict[str, Any]]],
+    chunk: Optional[Chunk] = None,
+    style_summary: Optional[StyleSummary] = None,
+    content: str = ""
+) -> str:
+    """Prompt text with what the local analyzers found.
+
+    The computed styles of the file's elements are listed unless the
+    rules are off; in "narrow" mode the LLM is also told which criteria
+    and issues the rules already covered. Which criteria are covered
+    depends on the whole original ``content`` (none without it). With
+    ``chunk`` only the entries on its lines are listed, numbered as the
+    LLM sees them.
+    """
+    mode = static_mode()
+    if mode == "off":
+        return ""
+    local_lines = chunk.local_lines() if chunk is not None else None
+    lines = []
+    # Elements styled alike share one entry
+    styles: Dict[str, List[int]] = {}
+    for line_number, text in style_summary or []:
+        if local_lines is not None:
+            if line_number not in local_lines:
+                continue
+            line_number = local_lines[line_number]
+        styles.setdefault(text, []).append(line_number)
+    if styles:
+        lines.append("Computed styles of elements in this file, with the session's stylesheets applied:")
+        for text, numbers in styles.items():
+            label = "line" if len(numbers) == 1 else "lines"
+            lines.append(f"- {label} {', '.join(str(number) for number in numbers)}: {text}")
+    if static_issues is None or mode != "narrow":
+        return "\n".join(lines)
+
+    covered = covered_criteria(content, file_type)
+    if covered:
+        lines.append(
+            f"WCAG {', '.join(covered)} have already been checked in this file by a static analyzer; "
+            f"do not report issues for these criteria."
+        )
+    found = []
+    for issue in sorted(static_issues, key=lambda issue: issue.get("line_number") or 0):
+        criterion = issue["wcag_guideline"].split(" ", 1)[0]
+        if criterion in covered:
+            continue
+        line_number = issue.get("line_number")
+        if local_lines is not None:
+            if line_number not in local_lines:
+                continue
+            line_number = local_lines[line_number]
+        found.append(f"- line {line_number}: {criterion} {issue['title']}")
+    if found:
+        lines.append("These issues in this file have already been reported by a static analyzer; do not report them again:")
+        lines.extend(found)
+    return "\n".join(lines)
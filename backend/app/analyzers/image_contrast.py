@@ -0,0 +1,310 @@
+import base64
+import binascii
+import io
+import math
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+from app.config import settings
+from app.analyzers.contrast import LUMINANCE_WEIGHTS, NON_TEXT_THRESHOLD, TEXT_THRESHOLDS, contrast_ratios, suggest_colors
+from app.analyzers.static_rules import make_issue
+
+# Raster formats Pillow decodes; icons and vector images are left to the LLM
+IMAGE_TYPES = ("png", "jpg", "jpeg", "bmp", "gif", "webp")
+
+# Tile edge in pixels of the downsampled image; contrast is measured per tile
+TILE = 16
+
+# Neighbouring pixels whose luminance ratio exceeds this are an edge
+EDGE_RATIO = 1.2
+# Share of edge pixels in a tile: below MIN it is flat, within TEXT_DENSITY
+# it looks like glyphs, in between like outlines and component boundaries
+MIN_EDGE_DENSITY = 0.03
+TEXT_EDGE_DENSITY = (0.08, 0.5)
+# Glyphs have both horizontal and vertical edges; straight lines only one
+MIN_TEXT_AXIS_DENSITY = 0.02
+
+# Bins of the per-tile log-luminance histograms
+HISTOGRAM_BINS = 48
+LOG_RANGE = (math.log(0.05), math.log(1.05))
+# A background covers this share of its tile (its bin and both neighbours)
+# and varies by less than this mean log-luminance deviation; photos and
+# gradients are skipped
+MIN_BACKGROUND_SHARE = 0.45
+MAX_BACKGROUND_NOISE = 0.02
+# Fewer pixels than this share of a tile are anti-aliasing, not a foreground
+MIN_FOREGROUND_SHARE = 0.03
+# Foreground and background bins this close are the same color
+MIN_BIN_DISTANCE = 2
+# Share of a tile's pixels at its two levels (or a bin off); anti-aliasing
+# stays under the rest, photos and icons with many colors do not
+MIN_TWO_LEVEL_SHARE = 0.85
+
+# Smaller regions of adjacent tiles are noise
+MIN_REGION_TILES = 2
+# Regions whose colors are within this many levels per channel are one issue
+COLOR_TOLERANCE = 8
+
+# Relative luminance contribution of each 0-255 sRGB channel value
+_SRGB = np.arange(256) / 255.0
+_LINEAR = np.where(_SRGB <= 0.04045, _SRGB / 12.92, ((_SRGB + 0.055) / 1.055) ** 2.4)
+CHANNEL_LUMINANCE = (_LINEAR[None, :] * LUMINANCE_WEIGHTS[:, None]).astype(np.float32)
+
+
+def supports(file_type: str) -> bool:
+    return (file_type or "").lower().rsplit("/", 1)[-1].lstrip(".") in IMAGE_TYPES
+
+
+def data_url_bytes(content: str) -> Optional[bytes]:
+    """The bytes of a base64 ``data:`` URL (how the frontend sends images); None for anything else."""
+    header, _, data = (content or "").partition(",")
+    if not header.startswith("data:") or not header.endswith(";base64"):
+        return None
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def load_image(source: Union[str, bytes], max_side: int) -> Tuple[np.ndarray, float]:
+    """An image as an (H, W, 3) uint8 array no larger than ``max_side``, and its scale to the original.
+
+    ``source`` is the image's path or its bytes. JPEGs are downscaled while decoding; transparency is composited over white.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        original_width = image.size[0]
+        image.draft("RGB", (max_side, max_side))
+        transparent = "A" in image.getbands() or "transparency" in image.info
+        mode = "RGBA" if transparent else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+        factor = math.ceil(max(image.size) / max_side)
+        if factor > 1:
+            image = image.reduce(factor)
+        if transparent:
+            image = Image.alpha_composite(Image.new("RGBA", image.size, (255, 255, 255, 255)), image)
+        return np.asarray(image.convert("RGB")), original_width / image.size[0]
+
+
+def _tiles(array: np.ndarray, rows: int, columns: int) -> np.ndarray:
+    """(rows * columns, TILE * TILE, ...) view of an (H, W, ...) array, tile by tile."""
+    tail = array.shape[2:]
+    tiled = array[:rows * TILE, :columns * TILE].reshape(rows, TILE, columns, TILE, *tail)
+    return tiled.swapaxes(1, 2).reshape(rows * columns, TILE * TILE, *tail)
+
+
+class TileContrast:
+    """Foreground/background contrast of the tiles of an image that have edges."""
+
+    def __init__(self, rgb: np.ndarray):
+        self.rows, self.columns = rgb.shape[0] // TILE, rgb.shape[1] // TILE
+        luminance = (
+            CHANNEL_LUMINANCE[0][rgb[..., 0]] + CHANNEL_LUMINANCE[1][rgb[..., 1]] + CHANNEL_LUMINANCE[2][rgb[..., 2]]
+        )
+        log_luminance = np.log(luminance + np.float32(0.05))
+
+        # Edges are where the contrast ratio between neighbours jumps
+        threshold = math.log(EDGE_RATIO)
+        vertical = np.zeros(log_luminance.shape, dtype=bool)
+        horizontal = np.zeros(log_luminance.shape, dtype=bool)
+        vertical[:, 1:] = np.abs(np.diff(log_luminance, axis=1)) > threshold
+        horizontal[1:, :] = np.abs(np.diff(log_luminance, axis=0)) > threshold
+        density = _tiles(vertical | horizontal, self.rows, self.columns).mean(axis=1)
+        self.indexes = np.flatnonzero(density >= MIN_EDGE_DENSITY)
+        self.density = density[self.indexes]
+        self.axis_density = np.minimum(
+            _tiles(vertical, self.rows, self.columns)[self.indexes].mean(axis=1),
+            _tiles(horizontal, self.rows, self.columns)[self.indexes].mean(axis=1)
+        )
+
+        # Histograms of all edge tiles in one bincount
+        count = len(self.indexes)
+        pixels = TILE * TILE
+        low, high = LOG_RANGE
+        tile_luminance = _tiles(log_luminance, self.rows, self.columns)[self.indexes]
+        bins = np.clip(((tile_luminance - low) / (high - low) * HISTOGRAM_BINS).astype(np.int32), 0, HISTOGRAM_BINS - 1)
+        offsets = np.arange(count, dtype=np.int32)[:, None] * HISTOGRAM_BINS
+        histograms = np.bincount((bins + offsets).ravel(), minlength=count * HISTOGRAM_BINS)
+        histograms = histograms.reshape(count, HISTOGRAM_BINS)
+
+        # The background is the most common level; the foreground is the
+        # darkest or lightest MIN_FOREGROUND_SHARE of the pixels, whichever
+        # is farther from it, so anti-aliased edges do not dilute it
+        background = histograms.argmax(axis=1)
+        minimum = MIN_FOREGROUND_SHARE * pixels
+        darkest = (histograms.cumsum(axis=1) >= minimum).argmax(axis=1)
+        lightest = HISTOGRAM_BINS - 1 - (histograms[:, ::-1].cumsum(axis=1) >= minimum).argmax(axis=1)
+        self.dark = dark = background - darkest >= lightest - background
+        foreground = np.where(dark, darkest, lightest)
+        self.separated = np.abs(foreground - background) >= MIN_BIN_DISTANCE
+
+        # Shares of the background level, a bin either way, and of both
+        # levels; how much the background varies
+        on_background = np.abs(bins - background[:, None]) <= 1
+        self.background_share = on_background.mean(axis=1)
+        counts = np.maximum(on_background.sum(axis=1), 1)
+        level = (tile_luminance * on_background).sum(axis=1) / counts
+        self.background_noise = (np.abs(tile_luminance - level[:, None]) * on_background).sum(axis=1) / counts
+        levels = np.arange(HISTOGRAM_BINS)[None, :]
+        near = np.abs(levels - background[:, None]) <= 1
+        near |= np.where(dark[:, None], levels <= foreground[:, None] + 1, levels >= foreground[:, None] - 1)
+        self.two_level_share = (histograms * near).sum(axis=1) / pixels
+
+        # Mean color of each level's pixels
+        colors = _tiles(rgb, self.rows, self.columns)[self.indexes].astype(np.float32)
+        beyond = np.where(dark[:, None], bins <= foreground[:, None], bins >= foreground[:, None])
+        self.foreground = self._mean_color(colors, beyond)
+        self.background = self._mean_color(colors, bins == background[:, None])
+        self.ratios = contrast_ratios(self.foreground, self.background)
+
+    @staticmethod
+    def _mean_color(colors: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """(N, 4) opaque RGBA means of the masked pixels of each tile."""
+        counts = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+        means = np.einsum("tp,tpc->tc", mask.astype(np.float32), colors) / counts
+        return np.concatenate([np.round(means), np.ones((len(means), 1))], axis=1)
+
+    def criteria(self) -> Dict[int, Tuple[str, float]]:
+        """Position -> (criterion, threshold) of the tiles showing text or a boundary on a flat background."""
+        text_low, text_high = TEXT_EDGE_DENSITY
+        candidate = (
+            self.separated & (self.background_share >= MIN_BACKGROUND_SHARE)
+            & (self.background_noise <= MAX_BACKGROUND_NOISE) & (self.two_level_share >= MIN_TWO_LEVEL_SHARE)
+        )
+        glyphs = (self.density >= text_low) & (self.density <= text_high) & (self.axis_density >= MIN_TEXT_AXIS_DENSITY)
+        # Whether text is large cannot be told from pixels; the normal-text minimum applies
+        tiles = {}
+        for position in np.flatnonzero(candidate & glyphs):
+            tiles[int(position)] = ("1.4.3", TEXT_THRESHOLDS["AA"][0])
+        for position in np.flatnonzero(candidate & ~glyphs & (self.density <= text_high)):
+            tiles[int(position)] = ("1.4.11", NON_TEXT_THRESHOLD)
+        return tiles
+
+    def similar(self, position: int, other: int) -> bool:
+        """Whether two tiles show the same kind of foreground on the same background."""
+        return bool(
+            self.dark[position] == self.dark[other]
+            and np.abs(self.background[position] - self.background[other]).max() <= COLOR_TOLERANCE
+        )
+
+
+def _regions(contrast: TileContrast, criteria: Dict[int, Tuple[str, float]]) -> List[List[int]]:
+    """Positions of adjacent tiles with the same background, grouped into regions."""
+    by_tile = {int(contrast.indexes[position]): position for position in criteria}
+    regions = []
+    seen = set()
+    for start in by_tile:
+        if start in seen:
+            continue
+        region = []
+        queue = deque([start])
+        seen.add(start)
+        while queue:
+            tile = queue.popleft()
+            position = by_tile[tile]
+            region.append(position)
+            row, column = divmod(tile, contrast.columns)
+            for neighbour_row in range(max(row - 1, 0), min(row + 2, contrast.rows)):
+                for neighbour_column in range(max(column - 1, 0), min(column + 2, contrast.columns)):
+                    neighbour = neighbour_row * contrast.columns + neighbour_column
+                    if neighbour in seen or neighbour not in by_tile:
+                        continue
+                    if contrast.similar(position, by_tile[neighbour]):
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+        if len(region) >= MIN_REGION_TILES:
+            regions.append(region)
+    return regions
+
+
+def _hex(color: np.ndarray) -> str:
+    red, green, blue = (int(channel) for channel in color[:3])
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def region_issues(contrast: TileContrast, scale: float) -> List[Dict[str, Any]]:
+    """Low-contrast regions as issues, the lowest contrast first; regions of the same colors are one issue."""
+    criteria = contrast.criteria()
+    # Anti-aliasing only lowers a tile's contrast, so a region is as good as
+    # its highest contrast tile, which also has the truest text color
+    groups: List[Tuple[str, np.ndarray, List[Tuple[int, List[int]]]]] = []
+    for region in _regions(contrast, criteria):
+        # Single strokes of glyphs pass for boundaries and rounded corners for
+        # glyphs; the majority decides
+        text = [member for member in region if criteria[member][0] == "1.4.3"]
+        members = text if len(text) * 2 >= len(region) else [member for member in region if member not in text]
+        position = max(members, key=lambda member: contrast.ratios[member])
+        criterion, threshold = criteria[position]
+        if contrast.ratios[position] >= threshold:
+            continue
+        colors = np.concatenate([contrast.foreground[position][:3], contrast.background[position][:3]])
+        for group_criterion, group_colors, members in groups:
+            if group_criterion == criterion and np.abs(group_colors - colors).max() <= COLOR_TOLERANCE:
+                members.append((position, region))
+                break
+        else:
+            groups.append((criterion, colors, [(position, region)]))
+    ordered = sorted(
+        (members for _, _, members in groups),
+        key=lambda members: min(contrast.ratios[position] for position, _ in members)
+    )
+    ordered = ordered[:settings.image_max_issues]
+    firsts = [min(group, key=lambda entry: contrast.ratios[entry[0]])[0] for group in ordered]
+    suggestions = suggest_colors(
+        contrast.foreground[firsts].reshape(-1, 4),
+        contrast.background[firsts].reshape(-1, 4),
+        np.array([criteria[position][1] for position in firsts])
+    )
+
+    issues = []
+    for group, position, suggestion in zip(ordered, firsts, suggestions):
+        criterion, threshold = criteria[position]
+        ratio = float(contrast.ratios[position])
+        boxes = []
+        for _, region in sorted(group, key=lambda entry: contrast.ratios[entry[0]]):
+            tiles = [int(contrast.indexes[member]) for member in region]
+            rows = [tile // contrast.columns for tile in tiles]
+            columns = [tile % contrast.columns for tile in tiles]
+            x, y = round(min(columns) * TILE * scale), round(min(rows) * TILE * scale)
+            width = round((max(columns) + 1) * TILE * scale) - x
+            height = round((max(rows) + 1) * TILE * scale) - y
+            boxes.append(f"x={x}, y={y} ({width}x{height} px)")
+        foreground, background = _hex(contrast.foreground[position]), _hex(contrast.background[position])
+        subject = "Text-like content" if criterion == "1.4.3" else "A boundary or graphic"
+        description = (
+            f"{subject} at {boxes[0]} appears as {foreground} on {background}, a contrast ratio of about "
+            f"{ratio:.2f}:1; WCAG {criterion} requires at least {threshold:g}:1. Measured from the image's "
+            f"pixels, so check the colors in the source."
+        )
+        if criterion == "1.4.3":
+            description += " Large text (18pt, or 14pt bold) only needs 3:1."
+        if len(boxes) > 1:
+            listed = "; ".join(boxes[1:6])
+            description += f" The same colors appear in {len(boxes) - 1} more regions ({listed}{'; ...' if len(boxes) > 6 else ''})."
+        issue = make_issue(
+            criterion,
+            "high" if ratio < 3.0 else "medium",
+            f"Possible insufficient contrast ({ratio:.2f}:1)",
+            description,
+            None,
+            f"{boxes[0]}: {foreground} on {background}",
+            f"Use {suggestion[0]} ({suggestion[1]:.2f}:1) or another color with at least {threshold:g}:1 against the background."
+            if suggestion else f"Change the colors to reach at least {threshold:g}:1."
+        )
+        # Pixel heuristics: candidates for review, not findings
+        issue["confidence_score"] = 0.6
+        issues.append(issue)
+    return issues
+
+
+def check_file(source: Union[str, bytes], file_type: str) -> Optional[List[Dict[str, Any]]]:
+    """Low-contrast regions of a screenshot or other raster image (a path or bytes); None if its type is not supported."""
+    if not supports(file_type):
+        return None
+    rgb, scale = load_image(source, settings.image_max_side)
+    if rgb.shape[0] < TILE or rgb.shape[1] < TILE:
+        return []
+    return region_issues(TileContrast(rgb), scale)
@@ -0,0 +1,403 @@
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable
+from bs4 import BeautifulSoup, Tag
+from bs4.element import NavigableString, TemplateString
+from lxml import etree
+from app.data.wcag22 import WCAG_22_GUIDELINES
+from app.services.chunker import file_family
+from app.services.preprocessor import strip_c_comments
+
+GUIDELINES = {guideline.id: guideline for guideline in WCAG_22_GUIDELINES}
+
+# Criteria the page-level checks cover completely in the documents they run
+# on; the LLM is told to skip them. 2.4.2 is not among them: the rules only
+# see whether a title exists, not whether it describes the page.
+DOCUMENT_CRITERIA = ("3.1.1",)
+
+LANG_CODE = re.compile(r"^[a-zA-Z]{2,3}(?:-[a-zA-Z0-9]{1,8})*$")
+
+# Input types that need no label of their own
+UNLABELED_INPUT_TYPES = {"hidden", "submit", "reset", "button", "image"}
+
+# Roles whose elements need an accessible name
+NAMED_ROLES = {
+    "button", "link", "checkbox", "switch", "tab", "menuitem", "menuitemcheckbox",
+    "menuitemradio", "option", "radio", "slider", "spinbutton", "textbox", "combobox"
+}
+
+# Text inside <template> (Vue/Svelte components) counts as content too
+TEXT_TYPES = (NavigableString, TemplateString)
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+
+
+def make_issue(
+    criterion: str,
+    severity: str,
+    title: str,
+    description: str,
+    line_number: Optional[int],
+    code_snippet: str,
+    suggestion: str
+) -> Dict[str, Any]:
+    """An issue in the shape LLMService.parse_llm_response returns."""
+    guideline = GUIDELINES[criterion]
+    return {
+        "wcag_guideline": f"{criterion} {guideline.title}",
+        "pour_principle": guideline.pour_principle.value,
+        "severity": severity,
+        "title": title,
+        "description": description,
+        "line_number": line_number,
+        "code_snippet": code_snippet[:200],
+        "suggestion": suggestion,
+        "confidence_score": 1.0
+    }
+
+
+# --- HTML / Vue / Svelte -------------------------------------------------------
+
+def _bound(element: Tag, name: str) -> bool:
+    """Whether an attribute is bound to an expression (Vue :name/v-bind:name, Angular [name])."""
+    return any(
+        element.has_attr(key) for key in (f":{name}", f"v-bind:{name}", f"[{name}]", f"[attr.{name}]")
+    )
+
+
+def _attr(element: Tag, name: str) -> Optional[str]:
+    value = element.get(name)
+    if isinstance(value, list):
+        value = " ".join(value)
+    return value
+
+
+def _is_dynamic(element: Tag) -> bool:
+    """Spread attributes or v-html/v-text may supply anything at runtime."""
+    return any(
+        key in ("v-bind", "v-html", "v-text") or key.startswith("{...")
+        for key in element.attrs
+    )
+
+
+def _is_hidden(element: Tag) -> bool:
+    for node in [element, *element.parents]:
+        if isinstance(node, Tag) and (_attr(node, "aria-hidden") == "true" or node.has_attr("hidden")):
+            return True
+    return False
+
+
+def _has_aria_name(element: Tag) -> bool:
+    return any(
+        _bound(element, name) or (_attr(element, name) or "").strip()
+        for name in ("aria-label", "aria-labelledby", "title")
+    )
+
+
+def _accessible_text(element: Tag) -> str:
+    """Text content plus the alt text of images inside, as a screen reader would read it."""
+    parts = [element.get_text(" ", strip=True, types=TEXT_TYPES)]
+    for image in element.find_all("img"):
+        parts.append("image" if _bound(image, "alt") else _attr(image, "alt") or "")
+    for title in element.find_all("title"):
+        parts.append(title.get_text(strip=True, types=TEXT_TYPES))
+    return " ".join(part for part in parts if part).strip()
+
+
+def _snippet(element: Tag, lines: List[str]) -> str:
+    if element.sourceline and element.sourceline <= len(lines):
+        return lines[element.sourceline - 1].strip()
+    return str(element)
+
+
+def _markup_issues(content: str) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(content, "html.parser")
+    lines = content.split("\n")
+    issues = []
+
+    def issue(element, criterion, severity, title, description, suggestion):
+        issues.append(make_issue(
+            criterion, severity, title, description, element.sourceline, _snippet(element, lines), suggestion
+        ))
+
+    # 1.1.1 images without a text alternative
+    for element in soup.find_all(["img", "area", "input"]):
+        if element.name == "input" and (_attr(element, "type") or "").lower() != "image":
+            continue
+        if element.name == "area" and not element.has_attr("href"):
+            continue
+        if _attr(element, "alt") is not None or _bound(element, "alt") or _has_aria_name(element) or _is_dynamic(element):
+            continue
+        if (_attr(element, "role") or "") in ("presentation", "none") or _is_hidden(element):
+            continue
+        issue(
+            element, "1.1.1", "high",
+            f"<{element.name}> has no text alternative",
+            f"The <{element.name}> element has no alt attribute, so screen readers announce the file name or nothing at all.",
+            'Add an alt attribute describing the image, or alt="" if it is purely decorative.'
+        )
+
+    # 1.3.1 form fields without a label
+    labelled_ids = {label.get("for") for label in soup.find_all("label") if label.get("for")}
+    for element in soup.find_all(["input", "select", "textarea"]):
+        if element.name == "input" and (_attr(element, "type") or "text").lower() in UNLABELED_INPUT_TYPES:
+            continue
+        if _has_aria_name(element) or _is_dynamic(element) or _is_hidden(element):
+            continue
+        if element.find_parent("label") is not None or (element.get("id") and element.get("id") in labelled_ids):
+            continue
+        placeholder = " (a placeholder is not a label)" if _attr(element, "placeholder") else ""
+        issue(
+            element, "1.3.1", "high",
+            f"Form field <{element.name}> has no label",
+            f"The <{element.name}> field is not associated with a <label> and has no aria-label or aria-labelledby{placeholder}.",
+            "Associate a <label for=...> with the field's id, wrap the field in a <label>, or add aria-label."
+        )
+
+    # 4.1.2 controls without an accessible name
+    for element in soup.find_all(True):
+        role = (_attr(element, "role") or "").lower()
+        is_control = (
+            element.name == "button"
+            or (element.name == "a" and element.has_attr("href"))
+            or role in NAMED_ROLES
+        )
+        if not is_control or element.name in ("input", "select", "textarea"):
+            continue
+        if _has_aria_name(element) or _is_dynamic(element) or _is_hidden(element):
+            continue
+        if _accessible_text(element) or _attr(element, "value") or _bound(element, "value"):
+            continue
+        kind = role or ("link" if element.name == "a" else "button")
+        issue(
+            element, "4.1.2", "high",
+            f"{kind.capitalize()} has no accessible name",
+            f"The {kind} has no text content, aria-label, aria-labelledby or alt text inside, so assistive technologies cannot tell what it does.",
+            "Add visible text or an aria-label describing the action."
+        )
+
+    # Page-level checks only apply to whole documents, not components
+    html = soup.find("html")
+    if html is not None:
+        title = soup.find("title")
+        if title is None or not title.get_text(strip=True):
+            issue(
+                title or html, "2.4.2", "medium",
+                "Page has no title" if title is None else "Page title is empty",
+                "The document has no non-empty <title>, so users cannot identify the page from the window or tab list.",
+                "Add a <title> in <head> describing the page's topic or purpose."
+            )
+        lang = _attr(html, "lang")
+        if lang is None:
+            lang = _attr(html, "xml:lang")
+        if lang is None or (lang and not LANG_CODE.match(lang.strip())):
+            issue(
+                html, "3.1.1", "medium",
+                "Page language is not set" if lang is None else f'Invalid page language "{lang}"',
+                "The <html> element has no valid lang attribute, so screen readers cannot choose the right pronunciation.",
+                'Set the lang attribute on <html> to the page language, e.g. lang="en".'
+            )
+    return issues
+
+
+# --- Android layout XML ----------------------------------------------------
+
+def _android(element, name: str) -> Optional[str]:
+    return element.get(f"{{{ANDROID_NS}}}{name}")
+
+
+def _layout_issues(root) -> List[Dict[str, Any]]:
+    issues = []
+    labelled = {
+        _android(element, "labelFor").split("/")[-1]
+        for element in root.iter() if isinstance(element.tag, str) and _android(element, "labelFor")
+    }
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        tag = element.tag.rsplit(".", 1)[-1]
+        snippet = etree.tostring(element, encoding="unicode").split("\n", 1)[0]
+        if _android(element, "importantForAccessibility") in ("no", "noHideDescendants"):
+            continue
+        if tag in ("ImageView", "ImageButton", "AppCompatImageView", "AppCompatImageButton", "FloatingActionButton"):
+            if _android(element, "contentDescription") is None:
+                issues.append(make_issue(
+                    "1.1.1", "high" if "Button" in tag else "medium",
+                    f"{tag} has no content description",
+                    f"The {tag} has no android:contentDescription, so TalkBack cannot describe it.",
+                    element.sourceline, snippet,
+                    'Set android:contentDescription, or android:importantForAccessibility="no" if it is decorative.'
+                ))
+        elif tag in ("EditText", "AppCompatEditText", "TextInputEditText", "AutoCompleteTextView"):
+            view_id = (_android(element, "id") or "").split("/")[-1]
+            parent = element.getparent()
+            in_layout = parent is not None and isinstance(parent.tag, str) and parent.tag.endswith("TextInputLayout")
+            if (
+                _android(element, "hint") is None
+                and _android(element, "contentDescription") is None
+                and view_id not in labelled
+                and not in_layout
+            ):
+                issues.append(make_issue(
+                    "1.3.1", "high",
+                    f"{tag} has no label",
+                    f"The {tag} has no android:hint, is not the target of an android:labelFor and is not inside a TextInputLayout.",
+                    element.sourceline, snippet,
+                    "Add android:hint or point a visible label's android:labelFor at the field."
+                ))
+    return issues
+
+
+# --- QML -------------------------------------------------------------------
+
+QML_OBJECT = re.compile(r"([A-Z][\w.]*)\s*\{")
+QML_PROPERTY = re.compile(r"([a-zA-Z_][\w.]*)\s*:")
+QML_STRING = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+
+QML_IMAGES = {"Image", "AnimatedImage", "IconImage", "BorderImage"}
+QML_BUTTONS = {"Button", "RoundButton", "ToolButton", "DelayButton", "AbstractButton", "TabButton", "ItemDelegate"}
+QML_INPUTS = {"TextField", "TextInput", "TextArea", "ComboBox", "SpinBox", "Slider", "Dial"}
+
+
+class QmlObject:
+    """A QML object declaration and the properties (raw value text) set on it."""
+
+    def __init__(self, type_name: str, line: int, parent: Optional["QmlObject"]):
+        self.type_name = type_name
+        self.line = line
+        self.parent = parent
+        self.properties: Dict[str, str] = {}
+
+    def ancestors(self) -> Iterable["QmlObject"]:
+        """Enclosing objects, innermost first, skipping plain JS scopes."""
+        node = self.parent
+        while node is not None:
+            if node.type_name:
+                yield node
+            node = node.parent
+
+
+def parse_qml(content: str) -> List[QmlObject]:
+    """Object declarations with the properties set directly on them."""
+    text = strip_c_comments(content)
+    objects: List[QmlObject] = []
+    stack: List[QmlObject] = []
+    for number, source in enumerate(text.split("\n"), start=1):
+        # Blank out strings (same length) so braces and colons in them are ignored
+        line = QML_STRING.sub(lambda match: '"' + " " * (len(match.group(0)) - 2) + '"', source)
+        position = 0
+        while position < len(line):
+            opening = QML_OBJECT.match(line, position)
+            if opening:
+                obj = QmlObject(opening.group(1).rsplit(".", 1)[-1], number, stack[-1] if stack else None)
+                objects.append(obj)
+                stack.append(obj)
+                position = opening.end()
+                continue
+            if line[position] == "{":
+                # Plain JS block (function body, binding) is tracked as an anonymous scope
+                stack.append(QmlObject("", number, stack[-1] if stack else None))
+            elif line[position] == "}":
+                if stack:
+                    stack.pop()
+            else:
+                prop = QML_PROPERTY.match(line, position)
+                if prop and stack and stack[-1].type_name and (position == 0 or not line[position - 1].isalnum()):
+                    end = min(
+                        (index for index in (line.find(";", prop.end()), line.find("}", prop.end())) if index >= 0),
+                        default=len(line)
+                    )
+                    stack[-1].properties[prop.group(1)] = source[prop.end():end].strip()
+                    position = prop.end()
+                    continue
+            position += 1
+    return objects
+
+
+def _named(obj: QmlObject) -> bool:
+    return bool(obj.properties.keys() & {"Accessible.name", "Accessible.ignored", "Accessible.labelledBy"})
+
+
+def _qml_issues(content: str) -> List[Dict[str, Any]]:
+    lines = content.split("\n")
+    issues = []
+    for obj in parse_qml(content):
+        snippet = lines[obj.line - 1].strip()
+        if obj.type_name in QML_IMAGES and not _named(obj):
+            issues.append(make_issue(
+                "1.1.1", "medium",
+                f"{obj.type_name} has no accessible name",
+                f"The {obj.type_name} sets neither Accessible.name nor Accessible.ignored, so screen readers cannot describe it.",
+                obj.line, snippet,
+                "Set Accessible.name to a description, or Accessible.ignored: true if the image is decorative."
+            ))
+        elif obj.type_name in QML_BUTTONS and not _named(obj) and "text" not in obj.properties:
+            issues.append(make_issue(
+                "4.1.2", "high",
+                f"{obj.type_name} has no accessible name",
+                f"The {obj.type_name} has no text and no Accessible.name (icon-only button), so screen readers announce it without a name.",
+                obj.line, snippet,
+                "Set Accessible.name (or text with display: AbstractButton.IconOnly)."
+            ))
+        elif obj.type_name in QML_INPUTS and not _named(obj):
+            issues.append(make_issue(
+                "1.3.1", "high",
+                f"{obj.type_name} has no accessible label",
+                f"The {obj.type_name} has no Accessible.name or Accessible.labelledBy; placeholder text is not a label.",
+                obj.line, snippet,
+                "Set Accessible.name, or Accessible.labelledBy pointing at the visible label."
+            ))
+        elif obj.type_name in ("MouseArea", "TapHandler") and obj.parent is not None:
+            owner = obj.parent
+            if not (owner.properties.keys() & {"Accessible.role", "Accessible.name"}) and owner.type_name not in QML_BUTTONS:
+                issues.append(make_issue(
+                    "4.1.2", "high",
+                    f"Clickable {owner.type_name or 'item'} is not exposed to assistive technology",
+                    f"A {obj.type_name} makes the {owner.type_name or 'item'} interactive, but it has no Accessible.role or Accessible.name.",
+                    obj.line, snippet,
+                    "Set Accessible.role (e.g. Accessible.Button), Accessible.name and Accessible.onPressAction on the item."
+                ))
+    return issues
+
+
+def _layout_root(content: str, file_type: str):
+    """The root of an XML layout (e.g. Android), or None for (X)HTML and other markup."""
+    if not (file_type or "").lower().lstrip(".").endswith("xml"):
+        return None
+    try:
+        root = etree.fromstring(content.encode("utf-8"), etree.XMLParser(recover=True))
+    except etree.XMLSyntaxError:
+        return None
+    if root is not None and isinstance(root.tag, str) and etree.QName(root).localname != "html":
+        return root
+    return None
+
+
+@lru_cache(maxsize=32)
+def _is_document(content: str, file_type: str) -> bool:
+    """Whether the page-level checks run on a file: markup with an <html> element."""
+    if file_family(file_type) != "markup" or _layout_root(content, file_type) is not None:
+        return False
+    return BeautifulSoup(content, "html.parser").find("html") is not None
+
+
+def covered_criteria(content: str, file_type: str) -> Iterable[str]:
+    """Criteria the rules fully checked in a file; none for fragments, components and layouts."""
+    return DOCUMENT_CRITERIA if _is_document(content, file_type) else ()
+
+
+def supports(file_type: str) -> bool:
+    return file_family(file_type) in ("markup", "qml")
+
+
+def check_file(content: str, file_type: str) -> Optional[List[Dict[str, Any]]]:
+    """Run the rules for a file; None if its type is not supported."""
+    family = file_family(file_type)
+    if family == "qml":
+        return _qml_issues(content)
+    if family != "markup":
+        return None
+    root = _layout_root(content, file_type)
+    if root is not None:
+        return _layout_issues(root)
+    return _markup_issues(content)
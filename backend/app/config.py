@@ -30,7 +30,99 @@ class Settings(BaseSettings):
     # Analysis
     max_concurrent_analyses: int = 5
     analysis_timeout: int = 300
-    
+    result_batch_size: int = 500
+    result_flush_interval: float = 2.0
+    sqlite_wal: bool = True
+    # Files larger than this many (estimated) tokens are analyzed in chunks
+    chunk_max_tokens: int = 12000
+    # Files up to pack_max_file_tokens are packed several to a prompt
+    pack_small_files: bool = True
+    pack_max_file_tokens: int = 1500
+    pack_max_tokens: int = 6000
+    pack_max_files: int = 8
+    # Comments, data URI payloads, source maps and minified lines are
+    # stripped from files before prompting (line numbers are mapped back)
+    preprocess_content: bool = True
+    preprocess_minified_line_chars: int = 1000
+    # What a markup/QML file's prompt carries: "source" (the preprocessed
+    # file) or "tree" (a compact accessibility tree plus the source lines of
+    # its interactive and unnamed nodes)
+    prompt_mode: str = "source"
+    # Local rules for mechanically checkable criteria: "off", "augment" (add
+    # their issues), "narrow" (also tell the LLM what they covered) or "only"
+    # (no LLM calls for the file types they support)
+    static_rules_mode: str = "narrow"
+    static_rules_workers: int = 2
+    # Contrast conformance level checked locally: "AA" or "AAA" (adds 1.4.6)
+    contrast_level: str = "AA"
+    # Elements whose computed styles (session stylesheets applied) are
+    # summarized in a markup file's prompt; 0 = no summary
+    cascade_summary_elements: int = 40
+    # Screenshots are downsampled to this many pixels on their long side
+    # before their contrast is measured; at most image_max_issues
+    # low-contrast issues (regions of the same colors) are reported per image
+    image_max_side: int = 1920
+    image_max_issues: int = 20
+
+    # Spend caps in USD (0 = none); the user cap covers user_budget_period_days
+    session_budget_usd: float = 0.0
+    user_budget_usd: float = 0.0
+    user_budget_period_days: int = 30
+    # Cost/duration estimates: completion tokens per prompt token, per-request
+    # latency and completion throughput
+    estimate_output_ratio: float = 0.3
+    estimate_request_latency: float = 2.0
+    estimate_output_tokens_per_second: float = 50.0
+
+    # Analysis progress store: "memory" (single worker) or "sqlite" (shared)
+    progress_backend: str = "memory"
+    progress_store_path: str = "./analysis_progress.db"
+    progress_ttl_seconds: int = 3600
+    progress_stream_interval: float = 0.5
+    progress_stream_keepalive: float = 15.0
+
+    # Durable analysis job queue
+    job_queue_path: str = "./analysis_jobs.db"
+    job_workers: int = 2
+    job_queue_max_pending: int = 100
+    job_lease_seconds: float = 60.0
+    job_max_attempts: int = 3
+    job_retry_delay: float = 5.0
+    job_poll_interval: float = 1.0
+    job_retention_seconds: int = 7 * 24 * 3600
+
+    # LLM HTTP clients (one pooled client per provider)
+    llm_http2: bool = True
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry: float = 30.0
+    llm_connect_timeout: float = 10.0
+    llm_request_timeout: float = 60.0
+    llm_streaming: bool = True
+    # Record provider traffic to a cassette ("record") or answer from it ("replay")
+    llm_cassette_mode: str = ""
+    llm_cassette_path: str = "./llm_cassette.jsonl"
+
+    # LLM retries, rate limits and circuit breaker
+    llm_rate_limits_enabled: bool = True
+    llm_max_retries: int = 4
+    llm_backoff_base: float = 1.0
+    llm_backoff_max: float = 30.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+
+    # Provider batch APIs (sessions created with batch=true)
+    llm_batch_base_url: str = ""
+    llm_batch_poll_interval: float = 30.0
+    llm_batch_completion_window: str = "24h"
+
+    # LLM response cache (memory LRU + SQLite)
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "./llm_cache.db"
+    llm_cache_ttl: int = 7 * 24 * 3600
+    llm_cache_memory_entries: int = 512
+    llm_cache_max_disk_entries: int = 20000
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -52,19 +52,65 @@ AVAILABLE_LLM_MODELS = [
     )
 ]
 
-# Model configuration for API calls
+# Model configuration for API calls.
+#
+# "api_format" selects the request/response adapter (app/services/llm_adapters.py):
+# "openai" (chat completions), "anthropic" or "google". "api_key_setting" names
+# the Settings field holding the key; "{api_key}" in headers is filled from it.
+# "prompt_cache" turns on the provider's prompt caching for the static
+# instructions (Anthropic cache_control, OpenAI prompt_cache_key).
+# "batch_api_base" lets batch sessions use the provider's batch API.
+# "batch_price_ratio", "cached_input_price_ratio" and "cache_write_price_ratio"
+# scale cost_per_token for batch requests, input tokens read from the prompt
+# cache and (Anthropic) input tokens written to it; each defaults to 1, so
+# models without them are charged the full interactive price.
+# "chars_per_token" tunes token estimates for cost projections and budgets
+# (default 4).
+#
+# A self-hosted OpenAI-compatible endpoint (vLLM, Ollama, ...) only needs an
+# entry here (plus one in AVAILABLE_LLM_MODELS) and can omit "api_key_setting":
+#
+#     "local-llama": {
+#         "provider": "local",
+#         "api_format": "openai",
+#         "max_concurrency": 16,
+#         "api_endpoint": "http://localhost:8001/v1/chat/completions",
+#         "model_name": "meta-llama/Llama-3.1-8B-Instruct",
+#         "headers": {"Content-Type": "application/json"},
+#         "max_tokens": 4000,
+#         "temperature": 0.1
+#     }
 LLM_CONFIGS = {
     "gpt-5": {
+        "provider": "openai",
+        "api_format": "openai",
+        "api_key_setting": "openai_api_key",
+        "max_concurrency": 8,
+        "requests_per_minute": 500,
+        "tokens_per_minute": 500000,
         "api_endpoint": "https://api.openai.com/v1/chat/completions",
+        "batch_api_base": "https://api.openai.com/v1",
         "model_name": "gpt-5",
         "headers": {
             "Authorization": "Bearer {api_key}",
             "Content-Type": "application/json"
         },
-        "max_completion_tokens": 4000
+        "max_tokens_param": "max_completion_tokens",
+        "max_completion_tokens": 4000,
+        "stream_usage": True,
+        "prompt_cache": True,
+        "batch_price_ratio": 0.5,
+        "cached_input_price_ratio": 0.1
     },
     "claude-opus-4": {
+        "provider": "anthropic",
+        "api_format": "anthropic",
+        "api_key_setting": "anthropic_api_key",
+        "max_concurrency": 4,
+        "requests_per_minute": 50,
+        "tokens_per_minute": 80000,
         "api_endpoint": "https://api.anthropic.com/v1/messages",
+        "batch_api_base": "https://api.anthropic.com/v1",
         "model_name": "claude-opus-4-20250514",
         "headers": {
             "x-api-key": "{api_key}",
@@ -72,9 +118,19 @@ LLM_CONFIGS = {
             "anthropic-version": "2023-06-01"
         },
         "max_tokens": 4000,
-        "temperature": 0.1
+        "temperature": 0.1,
+        "prompt_cache": True,
+        "batch_price_ratio": 0.5,
+        "cached_input_price_ratio": 0.1,
+        "cache_write_price_ratio": 1.25
     },
     "gemini-2.5-pro": {
+        "provider": "google",
+        "api_format": "google",
+        "api_key_setting": "google_api_key",
+        "max_concurrency": 8,
+        "requests_per_minute": 150,
+        "tokens_per_minute": 1000000,
         "api_endpoint": "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-pro:generateContent",
         "model_name": "gemini-2.5-pro",
         "headers": {
@@ -84,6 +140,12 @@ LLM_CONFIGS = {
         "temperature": 0.1
     },
     "grok-4": {
+        "provider": "xai",
+        "api_format": "openai",
+        "api_key_setting": "groq_api_key",
+        "max_concurrency": 4,
+        "requests_per_minute": 60,
+        "tokens_per_minute": 200000,
         "api_endpoint": "https://api.x.ai/v1/chat/completions",
         "model_name": "grok-4-0709",
         "headers": {
@@ -94,6 +156,12 @@ LLM_CONFIGS = {
         "temperature": 0.1
     },
     "llama-4": {
+        "provider": "groq",
+        "api_format": "openai",
+        "api_key_setting": "huggingface_api_key",
+        "max_concurrency": 4,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 60000,
         "api_endpoint": "https://api.groq.com/openai/v1/chat/completions",
         "model_name": "llama-maverick",
         "headers": {
@@ -104,8 +172,15 @@ LLM_CONFIGS = {
         "temperature": 0.1
     },
     "deepseek-v3.1": {
+        "provider": "deepseek",
+        "api_format": "openai",
+        "api_key_setting": "deepseek_api_key",
+        "max_concurrency": 4,
+        "requests_per_minute": 60,
+        "tokens_per_minute": 500000,
         "api_endpoint": "https://api.deepseek.com/v1/chat/completions",
         "model_name": "deepseek-chat",
+        "stream_usage": True,
         "headers": {
             "Authorization": "Bearer {api_key}",
             "Content-Type": "application/json"
@@ -148,6 +148,17 @@ WCAG_22_GUIDELINES = [
             "Text is selectable and searchable"
         ]
     ),
+    WCAGGuideline(
+        id="1.4.6",
+        title="Contrast (Enhanced)",
+        description="The visual presentation of text and images of text has a contrast ratio of at least 7:1.",
+        level="AAA",
+        pour_principle=POURPrinciple.PERCEIVABLE,
+        success_criteria=[
+            "Text contrast ratio 7:1 or higher",
+            "Large text contrast ratio 4.5:1 or higher"
+        ]
+    ),
     WCAGGuideline(
         id="1.4.10",
         title="Reflow",
@@ -430,7 +441,19 @@ WCAG_22_GUIDELINES = [
             "Platform input methods respected"
         ]
     ),
-    
+    WCAGGuideline(
+        id="2.5.8",
+        title="Target Size (Minimum)",
+        description="The size of the target for pointer inputs is at least 24 by 24 CSS pixels, except where the target is spaced, inline, available through an equivalent control, or its presentation is essential or determined by the user agent.",
+        level="AA",
+        pour_principle=POURPrinciple.OPERABLE,
+        success_criteria=[
+            "Targets are at least 24x24 CSS pixels",
+            "Undersized targets have 24px spacing",
+            "Inline links in text are exempt"
+        ]
+    ),
+
     # Understandable
     WCAGGuideline(
         id="3.1.1",
@@ -7,6 +7,8 @@ import logging
 from app.config import settings
 from app.database import create_tables
 from app.routers import auth, files, analysis, wcag
+from app.services.job_worker import JobWorker
+from app.analyzers.engine import shutdown_executor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,9 +20,15 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 [MAIN] Starting Accessibility Analysis API...")
     create_tables()
     logger.info("✅ [MAIN] Database tables created")
+    await analysis.analysis_service.llm_service.open_clients()
+    job_worker = JobWorker(analysis.job_queue, analysis.analysis_service)
+    await job_worker.start()
     yield
     # Shutdown
     logger.info("🛑 [MAIN] Shutting down API...")
+    await job_worker.stop()
+    await analysis.analysis_service.llm_service.close_clients()
+    shutdown_executor()
 
 app = FastAPI(
     title="Accessibility Analysis API",
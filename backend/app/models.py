@@ -91,6 +91,32 @@ class AnalysisResult(Base):
     # Relationships
     analysis_session = relationship("AnalysisSession", back_populates="results")
 
+class AnalysisResultSet(Base):
+    __tablename__ = "analysis_result_sets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, nullable=False, index=True)
+    llm_model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)  # prompt fingerprint the issues answer
+    source_session_id = Column(String, nullable=True)  # session that produced the issues
+    file_path = Column(String, nullable=True)
+    issues = Column(JSON, nullable=False)  # parsed LLM issues for this file/model
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    llm_model = Column(String, nullable=False)
+    requests = Column(Integer, default=0)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    cached_input_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)  # priced with LLMModel.cost_per_token
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
 # Pydantic Models
 class UserCreate(BaseModel):
     email: EmailStr
@@ -135,6 +161,16 @@ class AnalysisSessionCreate(BaseModel):
     description: Optional[str] = None
     file_ids: List[int]
     llm_models: List[str]
+    incremental: bool = False  # reuse prior results for unchanged files
+    batch: bool = False  # use provider batch APIs where supported
+    budget_usd: Optional[float] = None  # spend cap; defaults to SESSION_BUDGET_USD
+
+class AnalysisEstimateRequest(BaseModel):
+    file_ids: List[int]
+    llm_models: List[str]
+    incremental: bool = False
+    batch: bool = False
+    budget_usd: Optional[float] = None
 
 class AnalysisSessionResponse(BaseModel):
     id: int
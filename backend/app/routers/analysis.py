@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.auth import get_current_active_user, get_current_active_user_dev
 from app.models import (
     User, 
     AnalysisSessionCreate, 
+    AnalysisEstimateRequest,
     AnalysisSessionResponse, 
     AnalysisResultResponse,
+    AnalysisSession,
     UploadedFile
 )
 from app.services.analysis_service import AnalysisService
+from app.services.job_queue import JobQueue, QueueFullError
+from app.services.token_budget import session_usage
+from app.data.llm_models import LLM_CONFIGS
 
 router = APIRouter(prefix="/analysis", tags=["accessibility analysis"])
 analysis_service = AnalysisService()
+job_queue = JobQueue()
 
 # Add logging
 import logging
@@ -22,7 +30,6 @@ logger = logging.getLogger(__name__)
 @router.post("/start")
 async def start_analysis_endpoint(
     request_data: dict,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user_dev),
     db: Session = Depends(get_db)
 ):
@@ -38,18 +45,29 @@ async def start_analysis_endpoint(
         
         logger.info(f"📝 [BACKEND] Session ID: {session_id}")
         
-        # Start analysis in background
-        background_tasks.add_task(
-            analysis_service.start_analysis_simple,
-            session_id,
-            files,
-            models,
-            current_user.id
-        )
+        # Visible to pollers right away, and reset before a worker can write to it
+        await asyncio.to_thread(analysis_service.progress_store.start, session_id)
+        
+        # Queue the analysis; a job worker picks it up
+        try:
+            job_id = await asyncio.to_thread(job_queue.enqueue, "analysis_simple", {
+                "session_id": session_id,
+                "files": files,
+                "models": models,
+                "user_id": current_user.id,
+                "incremental": bool(request_data.get('incremental', False)),
+                "budget_usd": request_data.get('budgetUsd')
+            })
+        except QueueFullError:
+            await asyncio.to_thread(analysis_service.progress_store.delete, session_id)
+            raise
         
-        logger.info(f"✅ [BACKEND] Analysis started for session {session_id}")
+        logger.info(f"✅ [BACKEND] Analysis queued for session {session_id} as job {job_id}")
         return {"message": "Analysis started", "sessionId": session_id, "status": "analyzing"}
         
+    except QueueFullError as e:
+        logger.warning(f"⚠️ [BACKEND] Rejected analysis for session {session_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except Exception as e:
         logger.error(f"💥 [BACKEND] Failed to start analysis: {e}")
         import traceback
@@ -59,25 +77,115 @@ async def start_analysis_endpoint(
 @router.get("/progress/{session_id}")
 async def get_analysis_progress(
     session_id: str,
+    since: Optional[int] = None,
     current_user: User = Depends(get_current_active_user_dev),
     db: Session = Depends(get_db)
 ):
-    """Get analysis progress endpoint."""
-    logger.info(f"📊 [BACKEND] Getting progress for session {session_id}")
+    """Get analysis progress endpoint.
     
+    Pass ``since`` (the ``cursor`` from the previous response) to receive
+    only the issues found after it instead of the whole list.
+    """
     try:
-        progress_data = analysis_service.get_progress(session_id)
-        logger.info(f"📈 [BACKEND] Progress data: {progress_data}")
+        progress_data = await asyncio.to_thread(analysis_service.get_progress, session_id, since)
+        logger.info(
+            f"📈 [BACKEND] Progress for session {session_id}: {progress_data['status']} "
+            f"{progress_data['progress']}% - {len(progress_data['issues'])} issues since {since or 0}"
+        )
         return progress_data
         
     except Exception as e:
         logger.error(f"💥 [BACKEND] Failed to get progress: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/progress/{session_id}/stream")
+async def stream_analysis_progress(
+    session_id: str,
+    request: Request,
+    cursor: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user_dev)
+):
+    """Stream analysis progress and newly found issues as Server-Sent Events.
+    
+    Resumes after the ``Last-Event-ID`` header (sent automatically by
+    EventSource on reconnect) or the ``cursor`` query parameter.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if cursor is None and last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    
+    logger.info(f"📡 [BACKEND] Streaming progress for session {session_id} from cursor {cursor or 0}")
+    return StreamingResponse(
+        analysis_service.stream_progress(session_id, cursor or 0, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/stats")
+async def get_job_stats(
+    current_user: User = Depends(get_current_active_user_dev)
+):
+    """Get analysis job queue counts by status."""
+    return {"jobs": job_queue.stats()}
+
+@router.get("/llm/stats")
+async def get_llm_stats(
+    current_user: User = Depends(get_current_active_user_dev)
+):
+    """Get LLM response cache, provider rate limit and token usage statistics."""
+    return {
+        "cache": analysis_service.llm_service.cache_stats(),
+        "providers": analysis_service.llm_service.provider_stats(),
+        "usage": analysis_service.llm_service.usage_stats()
+    }
+
+@router.post("/estimate")
+async def estimate_analysis(
+    estimate_data: AnalysisEstimateRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Project requests, tokens, cost and duration of a session before starting it."""
+    files = db.query(UploadedFile).filter(
+        UploadedFile.id.in_(estimate_data.file_ids),
+        UploadedFile.user_id == current_user.id
+    ).all()
+    
+    if len(files) != len(estimate_data.file_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Some files not found or don't belong to user"
+        )
+    
+    unknown_models = [model for model in estimate_data.llm_models if model not in LLM_CONFIGS]
+    if unknown_models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown models: {', '.join(unknown_models)}"
+        )
+    
+    return await analysis_service.estimate_analysis(
+        db,
+        files,
+        estimate_data.llm_models,
+        current_user.id,
+        incremental=estimate_data.incremental,
+        batch=estimate_data.batch,
+        budget_usd=estimate_data.budget_usd
+    )
+
+@router.get("/usage/{session_id}")
+async def get_session_usage(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user_dev),
+    db: Session = Depends(get_db)
+):
+    """Get the recorded LLM token usage and cost of one of the user's sessions."""
+    return session_usage(db, session_id, current_user.id)
+
 @router.post("/sessions", response_model=AnalysisSessionResponse)
 async def create_analysis_session(
     session_data: AnalysisSessionCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -105,14 +213,20 @@ async def create_analysis_session(
     db.commit()
     db.refresh(db_session)
     
-    # Start analysis in background
-    background_tasks.add_task(
-        analysis_service.start_analysis,
-        db,
-        db_session.id,
-        session_data.file_ids,
-        session_data.llm_models
-    )
+    # Queue the analysis; a job worker picks it up
+    try:
+        await asyncio.to_thread(job_queue.enqueue, "analysis_session", {
+            "session_id": db_session.id,
+            "file_ids": session_data.file_ids,
+            "llm_models": session_data.llm_models,
+            "incremental": session_data.incremental,
+            "batch": session_data.batch,
+            "budget_usd": session_data.budget_usd
+        })
+    except QueueFullError as e:
+        db_session.status = "failed"
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     
     return db_session
 
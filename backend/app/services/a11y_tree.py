@@ -0,0 +1,436 @@
+import re
+from typing import List, Dict, Optional, Tuple
+from bs4 import BeautifulSoup, Tag
+from app.config import settings
+from app.analyzers.static_rules import TEXT_TYPES, QmlObject, parse_qml
+from app.services.chunker import LabeledChunk, file_family
+
+PROMPT_MODES = ("source", "tree")
+
+# Longest name or text shown in a node, and source line shown in the excerpts
+MAX_NAME_CHARS = 60
+MAX_SOURCE_CHARS = 160
+# Attribute values too long to matter (SVG path data, inline styles, data URIs)
+LONG_ATTRIBUTE = re.compile(r"""(=\s*)("[^"]{40,}"|'[^']{40,}')""")
+
+# --- HTML / Vue / Svelte -------------------------------------------------------
+
+# Implicit ARIA roles; <a> is a link only with an href, <section> a region only when named
+TAG_ROLES = {
+    "a": "link", "button": "button", "select": "combobox", "textarea": "textbox", "img": "img",
+    "area": "link", "nav": "navigation", "main": "main", "header": "banner", "footer": "contentinfo",
+    "aside": "complementary", "form": "form", "section": "region", "article": "article",
+    "ul": "list", "ol": "list", "menu": "list", "li": "listitem", "table": "table", "tr": "row",
+    "th": "columnheader", "td": "cell", "dialog": "dialog", "fieldset": "group", "details": "group",
+    "summary": "button", "option": "option", "progress": "progressbar", "meter": "meter",
+    "iframe": "iframe", "video": "video", "audio": "audio", "label": "label", "output": "status",
+    "hr": "separator", "svg": "graphic", "canvas": "canvas", "figure": "figure",
+    **{f"h{level}": "heading" for level in range(1, 7)}
+}
+INPUT_ROLES = {
+    "checkbox": "checkbox", "radio": "radio", "range": "slider", "number": "spinbutton",
+    "search": "searchbox", "submit": "button", "reset": "button", "button": "button",
+    "image": "button", "color": "button", "file": "button"
+}
+# Roles named by their content, and roles that are unusable without a name
+NAME_FROM_CONTENT = {
+    "button", "link", "heading", "option", "cell", "columnheader", "rowheader", "tab", "menuitem",
+    "menuitemcheckbox", "menuitemradio", "checkbox", "radio", "switch", "treeitem", "label", "tooltip"
+}
+NAME_REQUIRED = {
+    "button", "link", "img", "textbox", "searchbox", "checkbox", "radio", "combobox", "slider",
+    "spinbutton", "switch", "tab", "menuitem", "iframe", "dialog", "listbox", "progressbar"
+}
+NOT_RENDERED_TAGS = {"head", "script", "style", "noscript", "meta", "link", "base"}
+CLICK_HANDLERS = {"onclick", "@click", "v-on:click", "on:click", "(click)", "@tap", "v-on:tap", "@touchstart"}
+REPEATERS = {"v-for", "*ngfor"}
+# ARIA states shown on the nodes
+ARIA_STATES = ("checked", "pressed", "expanded", "selected", "current", "invalid", "disabled", "required", "live", "modal")
+
+
+def _attr(element: Tag, name: str) -> Optional[str]:
+    value = element.get(name)
+    if isinstance(value, list):
+        value = " ".join(value)
+    return value
+
+
+def _bound(element: Tag, name: str) -> bool:
+    return any(element.has_attr(key) for key in (f":{name}", f"v-bind:{name}", f"[{name}]", f"[attr.{name}]"))
+
+
+def _clean(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_NAME_CHARS else text[:MAX_NAME_CHARS - 1] + "…"
+
+
+def _text(element: Tag) -> str:
+    """Text content plus the alt text of images inside, as accessible names are computed."""
+    parts = []
+    for node in element.descendants:
+        if type(node) in TEXT_TYPES:
+            parts.append(str(node))
+        elif isinstance(node, Tag) and node.name == "img" and _attr(node, "alt"):
+            parts.append(_attr(node, "alt"))
+    return _clean(" ".join(parts))
+
+
+class _MarkupTree:
+    """Builds the tree lines of one HTML/Vue/Svelte document."""
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.by_id = {element["id"]: element for element in soup.find_all(id=True) if isinstance(element["id"], str)}
+        self.labels: Dict[str, Tag] = {
+            _attr(label, "for"): label for label in soup.find_all("label") if _attr(label, "for")
+        }
+        self.nodes: List[Tuple[int, int, str]] = []
+        # Lines whose source the LLM needs to see (interactive, unnamed, ...)
+        self.referenced: List[int] = []
+
+    def role(self, element: Tag) -> Optional[str]:
+        explicit = (_attr(element, "role") or "").split()
+        if explicit:
+            return explicit[0]
+        if element.name == "input":
+            input_type = (_attr(element, "type") or "text").lower()
+            return None if input_type == "hidden" else INPUT_ROLES.get(input_type, "textbox")
+        if element.name in ("a", "area") and not (element.has_attr("href") or _bound(element, "href")):
+            return None
+        if element.name == "img" and _attr(element, "alt") == "" and not _bound(element, "alt"):
+            return None
+        if element.name == "select" and (element.has_attr("multiple") or (_attr(element, "size") or "1") != "1"):
+            return "listbox"
+        return TAG_ROLES.get(element.name)
+
+    def name(self, element: Tag, role: Optional[str]) -> Optional[str]:
+        """A simplified accessible name computation; "{bound}" for names set by expressions."""
+        labelledby = _attr(element, "aria-labelledby")
+        if labelledby:
+            texts = [_text(self.by_id[ref]) for ref in labelledby.split() if ref in self.by_id]
+            if any(texts):
+                return _clean(" ".join(texts))
+        if _bound(element, "aria-label") or _bound(element, "aria-labelledby"):
+            return "{bound}"
+        if (_attr(element, "aria-label") or "").strip():
+            return _clean(_attr(element, "aria-label"))
+        if element.name in ("input", "select", "textarea"):
+            label = self.labels.get(_attr(element, "id") or "") or element.find_parent("label")
+            if label is not None:
+                return _text(label) or None
+            if (_attr(element, "type") or "").lower() in ("submit", "reset", "button"):
+                return _clean(_attr(element, "value") or (_attr(element, "type") or "").capitalize())
+        if element.name in ("img", "area") or (element.name == "input" and (_attr(element, "type") or "").lower() == "image"):
+            if _bound(element, "alt"):
+                return "{bound}"
+            if _attr(element, "alt"):
+                return _clean(_attr(element, "alt"))
+        if element.name == "svg":
+            title = element.find("title")
+            if title is not None:
+                return _text(title) or None
+        for container, caption in (("fieldset", "legend"), ("table", "caption"), ("figure", "figcaption")):
+            if element.name == container and element.find(caption) is not None:
+                return _text(element.find(caption)) or None
+        if role in NAME_FROM_CONTENT:
+            text = _text(element)
+            if text:
+                return text
+        if (_attr(element, "title") or "").strip():
+            return _clean(_attr(element, "title"))
+        return None
+
+    def states(self, element: Tag, role: Optional[str]) -> List[str]:
+        states = []
+        if role == "heading":
+            level = _attr(element, "aria-level") or (element.name[1:] if re.match(r"^h[1-6]$", element.name) else None)
+            if level:
+                states.append(f"level={level}")
+        if element.name == "input" and role == "textbox" and _attr(element, "type") not in (None, "text"):
+            states.append(f"type={_attr(element, 'type')}")
+        if role in ("textbox", "searchbox") and not self.name(element, role) and _attr(element, "placeholder"):
+            states.append(f'placeholder="{_clean(_attr(element, "placeholder"))}"')
+        for attribute in ("disabled", "required", "readonly", "checked", "multiple", "autoplay", "controls", "muted"):
+            if element.has_attr(attribute):
+                states.append(attribute)
+        for state in ARIA_STATES:
+            value = _attr(element, f"aria-{state}")
+            if value is not None:
+                states.append(f"{state}={value}")
+            elif _bound(element, f"aria-{state}"):
+                states.append(f"{state}={{bound}}")
+        if element.name in ("video", "audio"):
+            tracks = {(_attr(track, "kind") or "subtitles") for track in element.find_all("track")}
+            states.append("captions" if tracks & {"captions", "subtitles"} else "no captions")
+        href = _attr(element, "href")
+        if element.name == "a" and href is not None and (href in ("#", "") or href.startswith("javascript:")):
+            states.append(f'href="{href}"')
+        if element.name == "html" and _attr(element, "lang") is None:
+            states.append("no lang")
+        elif element.name == "html":
+            states.append(f"lang={_attr(element, 'lang')}")
+        if any(key in REPEATERS or key.startswith("{#each") for key in element.attrs):
+            states.append("repeated")
+        return states
+
+    def focusable(self, element: Tag, role: Optional[str]) -> Optional[bool]:
+        """True, False, or None when the element is not interactive at all."""
+        tabindex = _attr(element, "tabindex")
+        if tabindex is not None and tabindex.strip().lstrip("-").isdigit():
+            return int(tabindex) >= 0
+        if element.has_attr("disabled"):
+            return False
+        if element.name in ("button", "select", "textarea", "summary", "iframe") or element.has_attr("contenteditable"):
+            return True
+        if element.name == "input":
+            return role is not None
+        if element.name in ("a", "area"):
+            return role == "link"
+        if element.name in ("video", "audio") and element.has_attr("controls"):
+            return True
+        return None
+
+    def walk(self, element: Tag, depth: int):
+        if element.name in NOT_RENDERED_TAGS:
+            return
+        line = element.sourceline or 1
+        if element.name in ("html", "template") and depth == 0:
+            title = self.soup.find("title")
+            label = "document" if element.name == "html" else "component"
+            if title is not None and element.name == "html":
+                label += f' "{_text(title)}"'
+            states = self.states(element, None)
+            self.nodes.append((line, depth, " ".join([label, *states])))
+            self.walk_children(element, depth + 1)
+            return
+
+        role = self.role(element)
+        clickable = any(key in CLICK_HANDLERS for key in element.attrs)
+        focusable = self.focusable(element, role)
+        hidden = element.has_attr("hidden") or _attr(element, "aria-hidden") == "true"
+        if role in ("region", "form") and self.name(element, role) is None:
+            role = None
+        if role in ("presentation", "none") and not focusable:
+            role = None
+        generic = role is None and not clickable and focusable is None and not hidden
+
+        if generic:
+            self.walk_children(element, depth)
+            return
+
+        name = self.name(element, role)
+        parts = [role or element.name]
+        if name:
+            parts.append(f'"{name}"')
+        elif role in NAME_REQUIRED or clickable:
+            parts.append("(no name)")
+        parts.extend(self.states(element, role))
+        if focusable:
+            parts.append("focusable")
+        elif clickable or (focusable is False and _attr(element, "tabindex") is not None):
+            parts.append("not focusable")
+        if clickable and role is None:
+            parts.append("clickable")
+        if hidden:
+            inside = [
+                node for node in element.find_all(True)
+                if self.focusable(node, self.role(node))
+            ]
+            parts.append("hidden")
+            if inside:
+                parts.append(f"contains {len(inside)} focusable")
+        self.nodes.append((line, depth, " ".join(parts)))
+        if (clickable and not focusable) or (role in NAME_REQUIRED and not name) or (hidden and "contains" in parts[-1]):
+            self.referenced.append(line)
+        if hidden or element.name == "svg":
+            # SVG internals (paths, gradients) carry nothing for the tree
+            return
+        self.walk_children(element, depth + 1, skip_text=role in NAME_FROM_CONTENT and bool(name))
+
+    def walk_children(self, element: Tag, depth: int, skip_text: bool = False):
+        text = []
+        for child in element.children:
+            if isinstance(child, Tag):
+                self.flush_text(element, text, depth)
+                self.walk(child, depth)
+            elif type(child) in TEXT_TYPES and not skip_text and child.strip():
+                text.append(str(child))
+        self.flush_text(element, text, depth)
+
+    def flush_text(self, element: Tag, text: List[str], depth: int):
+        if text:
+            self.nodes.append((element.sourceline or 1, depth, f'text "{_clean(" ".join(text))}"'))
+            text.clear()
+
+
+def _markup_tree(content: str) -> Tuple[List[Tuple[int, int, str]], List[int]]:
+    soup = BeautifulSoup(content, "html.parser")
+    tree = _MarkupTree(soup)
+    for child in soup.children:
+        if isinstance(child, Tag):
+            tree.walk(child, 0)
+    return tree.nodes, tree.referenced
+
+
+# --- QML -------------------------------------------------------------------
+
+QML_ROLES = {
+    **dict.fromkeys(("Button", "RoundButton", "ToolButton", "DelayButton", "AbstractButton", "ItemDelegate"), "button"),
+    **dict.fromkeys(("Image", "AnimatedImage", "IconImage", "BorderImage"), "img"),
+    **dict.fromkeys(("TextField", "TextInput", "TextArea", "TextEdit"), "textbox"),
+    **dict.fromkeys(("Slider", "RangeSlider", "Dial"), "slider"),
+    **dict.fromkeys(("Dialog", "Popup", "Drawer"), "dialog"),
+    **dict.fromkeys(("ListView", "GridView", "PathView"), "list"),
+    **dict.fromkeys(("ProgressBar", "BusyIndicator"), "progressbar"),
+    **dict.fromkeys(("Window", "ApplicationWindow"), "window"),
+    "Text": "text", "Label": "text", "CheckBox": "checkbox", "RadioButton": "radio", "Switch": "switch",
+    "ComboBox": "combobox", "SpinBox": "spinbox", "TabBar": "tablist", "TabButton": "tab", "Menu": "menu",
+    "MenuItem": "menuitem", "Page": "page", "ToolBar": "toolbar", "ScrollView": "scrollarea"
+}
+QML_FOCUSABLE_ROLES = {
+    "button", "textbox", "slider", "checkbox", "radio", "switch", "combobox", "spinbox", "tab", "menuitem"
+}
+# Types with no visual presence; their subtrees are skipped
+QML_NON_VISUAL = re.compile(
+    r"^(?:Timer|Connections|Binding|Behavior|States?|Transition|PropertyChanges|QtObject|Component|"
+    r"ListModel|ListElement|Shortcut|FontLoader|\w*Animation|\w*Action|\w*Model)$"
+)
+QML_HANDLERS = {"MouseArea", "TapHandler"}
+QML_STRING_VALUE = re.compile(r'^(?:qsTr|qsTrId|qsTranslate)?\(?\s*"((?:[^"\\]|\\.)*)"\s*\)?$')
+
+
+def _qml_value(value: Optional[str]) -> Optional[str]:
+    """A literal string value, "{bound}" for other expressions, None if unset."""
+    if value is None:
+        return None
+    match = QML_STRING_VALUE.match(value.strip())
+    return _clean(match.group(1)) if match else "{bound}"
+
+
+def _qml_tree(content: str) -> Tuple[List[Tuple[int, int, str]], List[int]]:
+    objects = parse_qml(content)
+    children: Dict[int, List[QmlObject]] = {}
+    roots = []
+    for obj in objects:
+        if not obj.type_name:
+            continue
+        parent = next(iter(obj.ancestors()), None)
+        if parent is None:
+            roots.append(obj)
+        else:
+            children.setdefault(id(parent), []).append(obj)
+
+    nodes: List[Tuple[int, int, str]] = []
+    referenced: List[int] = []
+
+    def walk(obj: QmlObject, depth: int):
+        props = obj.properties
+        if QML_NON_VISUAL.match(obj.type_name) or obj.type_name in QML_HANDLERS:
+            return
+        kids = children.get(id(obj), [])
+        accessible_role = props.get("Accessible.role", "")
+        role = accessible_role.rsplit(".", 1)[-1].lower() if accessible_role else QML_ROLES.get(obj.type_name)
+        clickable = any(kid.type_name in QML_HANDLERS for kid in kids)
+        focusable = None
+        if props.get("activeFocusOnTab") == "true" or props.get("focus") == "true":
+            focusable = True
+        elif role in QML_FOCUSABLE_ROLES:
+            focusable = "NoFocus" not in props.get("focusPolicy", "")
+        hidden = props.get("visible") == "false" or props.get("Accessible.ignored") == "true"
+        if role is None and not clickable and focusable is None and not props.keys() & {"Accessible.name"}:
+            if not hidden:
+                for kid in kids:
+                    walk(kid, depth)
+            return
+
+        name = _qml_value(props.get("Accessible.name")) or _qml_value(
+            props.get("text") if role != "textbox" else None
+        ) or _qml_value(props.get("title"))
+        parts = [role or obj.type_name]
+        if role and role != obj.type_name.lower():
+            parts.append(f"({obj.type_name})")
+        if name:
+            parts.append(f'"{name}"')
+        elif role in NAME_REQUIRED or clickable:
+            parts.append("(no name)")
+        if role == "textbox" and not name and props.get("placeholderText"):
+            parts.append(f"placeholder={props['placeholderText']}")
+        if props.get("enabled") == "false":
+            parts.append("disabled")
+        if props.get("checked") is not None:
+            parts.append(f"checked={props['checked']}")
+        width, height = props.get("width", ""), props.get("height", "")
+        if width.replace(".", "", 1).isdigit() and height.replace(".", "", 1).isdigit():
+            parts.append(f"{width}×{height}")
+        if focusable:
+            parts.append("focusable")
+        elif clickable or focusable is False:
+            parts.append("not focusable")
+        if clickable:
+            parts.append("clickable")
+        if hidden:
+            parts.append("hidden" if props.get("visible") == "false" else "ignored")
+        nodes.append((obj.line, depth, " ".join(parts)))
+        if (clickable and not focusable) or (role in NAME_REQUIRED and not name):
+            referenced.append(obj.line)
+        if not hidden:
+            for kid in kids:
+                walk(kid, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return nodes, referenced
+
+
+# --- Rendering ---------------------------------------------------------------
+
+def supports(file_type: str) -> bool:
+    family = file_family(file_type)
+    return family == "qml" or (family == "markup" and not (file_type or "").lower().endswith(("xml", "svg")))
+
+
+def tree_mode() -> bool:
+    mode = settings.prompt_mode.lower()
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode: {settings.prompt_mode}")
+    return mode == "tree"
+
+
+def build_tree(content: str, file_type: str) -> Optional[LabeledChunk]:
+    """The accessibility tree of a markup or QML file plus the source lines it references.
+
+    Each line is labeled with the source line it comes from ("L12"), which
+    is what the LLM reports. None for other file types or files with no
+    accessibility-relevant nodes.
+    """
+    if not supports(file_type):
+        return None
+    if file_family(file_type) == "qml":
+        nodes, referenced = _qml_tree(content)
+    else:
+        nodes, referenced = _markup_tree(content)
+    if not nodes:
+        return None
+
+    width = len(str(max(line for line, _, _ in nodes)))
+    lines = [
+        "Accessibility tree (role, \"name\", states; L<n> is the source line, report it as line_number):"
+    ]
+    line_numbers = [nodes[0][0]]
+    for line, depth, text in nodes:
+        lines.append(f"L{line:<{width}} {'  ' * depth}{text}")
+        line_numbers.append(line)
+
+    source_lines = content.split("\n")
+    excerpts = sorted(set(referenced))
+    if excerpts:
+        lines.append("Source of the unnamed and mouse-only nodes:")
+        line_numbers.append(excerpts[0])
+        for line in excerpts:
+            source = source_lines[line - 1].strip() if line <= len(source_lines) else ""
+            source = LONG_ATTRIBUTE.sub(lambda match: f"{match.group(1)}{match.group(2)[0]}…{match.group(2)[0]}", source)
+            if len(source) > MAX_SOURCE_CHARS:
+                source = source[:MAX_SOURCE_CHARS - 1] + "…"
+            lines.append(f"L{line}: {source}")
+            line_numbers.append(line)
+    return LabeledChunk("\n".join(lines), line_numbers)
@@ -1,7 +1,10 @@
 import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Awaitable, Callable
 from sqlalchemy.orm import Session
+from app.database import SessionLocal
 from app.models import (
     AnalysisSession, 
     AnalysisFile, 
@@ -9,77 +12,617 @@ from app.models import (
     UploadedFile,
     FileProcessingResult
 )
-from app.services.llm_service import LLMService
+from app.analyzers import image_contrast
+from app.analyzers.engine import (
+    STATIC_MODEL, StyleSummary, replaces_llm, run_image_rules, run_static_rules, session_stylesheets
+)
+from app.services.llm_service import ANALYSIS_INSTRUCTIONS, LLMService
+from app.services.batch_service import BatchService
+from app.services.scheduler import AnalysisScheduler
+from app.services.packing import plan_packs
+from app.services.token_budget import (
+    SessionBudget,
+    budget_limit,
+    estimate_duration,
+    estimate_prompts,
+    record_session_usage,
+    reset_budget,
+    session_usage,
+    use_budget
+)
+from app.services.result_sink import ResultSink, issue_to_row
+from app.services.progress_store import ProgressWriter, create_progress_store, FINISHED_STATUSES
+from app.services.job_queue import JobCheckpoints
+from app.services.result_sets import (
+    content_hash,
+    load_prior_result_sets,
+    prompt_fingerprint,
+    record_result_sets,
+    result_set_row
+)
+from app.config import settings
 from app.data.wcag22 import WCAG_22_GUIDELINES, POUR_PRINCIPLES
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage for analysis progress (in production, use Redis or database)
-analysis_progress = {}
-
 class AnalysisService:
     def __init__(self):
-        self.llm_service = LLMService()
+        self.scheduler = AnalysisScheduler()
+        # Provider calls (including each chunk of a large file) take a scheduler slot
+        self.llm_service = LLMService(scheduler=self.scheduler)
+        self.batch_service = BatchService(self.llm_service)
+        # In-process by default; the SQLite backend shares progress across workers
+        self.progress_store = create_progress_store()
     
     async def start_analysis(
         self,
-        db: Session,
         session_id: int,
         file_ids: List[int],
-        llm_models: List[str]
+        llm_models: List[str],
+        incremental: bool = False,
+        batch: bool = False,
+        checkpoints: Optional[JobCheckpoints] = None,
+        budget_usd: Optional[float] = None
     ) -> Dict[str, Any]:
-        """Start accessibility analysis for uploaded files."""
-        # Get analysis session
-        session = db.query(AnalysisSession).filter(AnalysisSession.id == session_id).first()
-        if not session:
-            raise ValueError("Analysis session not found")
+        """Start accessibility analysis for uploaded files.
         
-        # Update session status
-        session.status = "running"
-        db.commit()
+        Runs from the job queue after the request that created the session
+        has finished, so it opens its own database session instead of using
+        the request-scoped one. With ``checkpoints`` the (file, model) pairs
+        finished by an earlier attempt are skipped. With ``incremental`` the
+        issues of files whose content was already analyzed by the same model
+        with the same prompt (see ``prompt_fingerprint``) are copied instead
+        of calling the LLM. With ``batch`` models that support it go through
+        the provider's batch API.
         
+        LLM calls are charged to a session budget capped by ``budget_usd``
+        (or SESSION_BUDGET_USD) and the user's remaining budget; calls that
+        no longer fit are skipped. The actual usage is stored per model.
+        """
+        db = SessionLocal()
         try:
-            # Get uploaded files
-            files = db.query(UploadedFile).filter(UploadedFile.id.in_(file_ids)).all()
+            # Get analysis session
+            session = db.query(AnalysisSession).filter(AnalysisSession.id == session_id).first()
+            if not session:
+                raise ValueError("Analysis session not found")
             
-            # Process files
-            processed_files = await self._process_files(files)
+            # An earlier attempt (failed and requeued, or interrupted while
+            # still marked running) may have written rows it never checkpointed
+            resumed = session.status == "running" or (checkpoints is not None and checkpoints.retried)
             
-            # Create analysis file records
-            for file_data in processed_files:
-                analysis_file = AnalysisFile(
-                    analysis_session_id=session_id,
-                    uploaded_file_id=file_data["file_id"],
-                    processed_content=file_data["content"],
-                    file_metadata=file_data["metadata"]
-                )
-                db.add(analysis_file)
+            # Update session status
+            session.status = "running"
             db.commit()
             
-            # Analyze with each LLM
-            all_issues = []
+            budget = SessionBudget(budget_limit(db, session.user_id, budget_usd, session_id))
+            budget_token = use_budget(budget)
+            try:
+                # Get uploaded files
+                files = db.query(UploadedFile).filter(UploadedFile.id.in_(file_ids)).all()
+                
+                # Process files
+                processed_files = await self._process_files(files)
+                
+                # Create analysis file records (kept from the first attempt on resume)
+                has_files = db.query(AnalysisFile).filter(
+                    AnalysisFile.analysis_session_id == session_id
+                ).first() is not None
+                if not has_files:
+                    for file_data in processed_files:
+                        analysis_file = AnalysisFile(
+                            analysis_session_id=session_id,
+                            uploaded_file_id=file_data["file_id"],
+                            processed_content=file_data["content"],
+                            file_metadata=file_data["metadata"]
+                        )
+                        db.add(analysis_file)
+                    db.commit()
+                
+                if resumed:
+                    self._discard_unfinished_results(
+                        db, session_id, processed_files, llm_models, checkpoints
+                    )
+                
+                prior_results = {}
+                if incremental:
+                    prior_results = load_prior_result_sets(
+                        db,
+                        [f["metadata"]["content_hash"] for f in processed_files if "content_hash" in f["metadata"]],
+                        llm_models
+                    )
+                    logger.info(f"♻️ [ANALYSIS SERVICE] Reusing {len(prior_results)} prior file/model results")
+                
+                # Analyze every (file, model) pair concurrently; a single writer
+                # drains the results so only one coroutine ever writes to the DB.
+                all_issues = await self._run_analysis_pipeline(
+                    session_id, processed_files, llm_models, checkpoints, prior_results, batch
+                )
+                
+                if budget.refused:
+                    logger.warning(
+                        f"💸 [ANALYSIS SERVICE] Session {session_id} hit its ${budget.limit_usd:.2f} budget; "
+                        f"{budget.refused} LLM calls were skipped"
+                    )
+                
+                # Update session status
+                session.status = "completed"
+                session.completed_at = datetime.utcnow()
+                db.commit()
+                
+                return {
+                    "session_id": session_id,
+                    "total_issues": len(all_issues),
+                    "issues_by_pour": self._categorize_by_pour(all_issues),
+                    "issues_by_severity": self._categorize_by_severity(all_issues),
+                    "usage": budget.summary()
+                }
+                
+            except Exception as e:
+                logger.error(f"💥 [ANALYSIS SERVICE] Session {session_id} failed: {e}")
+                # Update session status to failed
+                db.rollback()
+                session.status = "failed"
+                session.completed_at = datetime.utcnow()
+                db.commit()
+                raise e
+            finally:
+                reset_budget(budget_token)
+                # Spend is real even if the session failed
+                try:
+                    record_session_usage(db, session_id, session.user_id, budget)
+                except Exception as e:
+                    logger.error(f"💥 [ANALYSIS SERVICE] Failed to store LLM usage for session {session_id}: {e}")
+        finally:
+            db.close()
+    
+    def mark_session_failed(self, session_id: int):
+        """Mark a session failed unless it finished (its job died without doing so)."""
+        db = SessionLocal()
+        try:
+            session = db.query(AnalysisSession).filter(AnalysisSession.id == session_id).first()
+            if session is not None and session.status != "completed":
+                session.status = "failed"
+                session.completed_at = datetime.utcnow()
+                db.commit()
+        finally:
+            db.close()
+    
+    def _discard_unfinished_results(
+        self,
+        db: Session,
+        session_id: int,
+        processed_files: List[Dict[str, Any]],
+        llm_models: List[str],
+        checkpoints: Optional[JobCheckpoints]
+    ):
+        """Delete rows a previous attempt wrote for pairs it never checkpointed.
+        
+        Rows only carry the file path, so a pair is left alone when another
+        file of the same path has its checkpoint for the model; deleting
+        would lose that file's results, which are not analyzed again.
+        """
+        for llm_model in [*llm_models, STATIC_MODEL]:
+            unfinished = []
+            kept_paths = set()
+            for file_data in processed_files:
+                path = file_data["metadata"].get("filename")
+                if checkpoints is not None and self._unit_key(file_data["file_id"], llm_model) in checkpoints:
+                    kept_paths.add(path)
+                else:
+                    unfinished.append(path)
+            for path in unfinished:
+                if path in kept_paths:
+                    logger.warning(
+                        f"⚠️ [ANALYSIS SERVICE] Keeping {llm_model} rows of {path}: "
+                        f"another file of that name is already checkpointed"
+                    )
+                    continue
+                db.query(AnalysisResult).filter(
+                    AnalysisResult.analysis_session_id == session_id,
+                    AnalysisResult.llm_model == llm_model,
+                    AnalysisResult.file_path == path
+                ).delete(synchronize_session=False)
+        db.commit()
+    
+    def _unit_key(self, file_key: Any, llm_model: str) -> str:
+        """Checkpoint key of one (file, model) pair."""
+        return f"{file_key}:{llm_model}"
+    
+    async def _run_analysis_pipeline(
+        self,
+        session_id: int,
+        processed_files: List[Dict[str, Any]],
+        llm_models: List[str],
+        checkpoints: Optional[JobCheckpoints] = None,
+        prior_results: Optional[Dict[Any, List[Dict[str, Any]]]] = None,
+        batch: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Fan out (file, model) work and funnel issues through one DB writer."""
+        results_queue: asyncio.Queue = asyncio.Queue()
+        writer = asyncio.create_task(
+            self._result_writer(session_id, results_queue, checkpoints)
+        )
+        
+        await self._static_pass(processed_files, results_queue, checkpoints)
+        
+        tasks = []
+        batch_files: Dict[str, List[Dict[str, Any]]] = {}
+        interactive_files: Dict[str, List[Dict[str, Any]]] = {}
+        for file_data in processed_files:
+            if "error" in file_data["metadata"] or replaces_llm(
+                file_data.get("static_issues"), file_data["metadata"]["file_type"]
+            ):
+                continue
             for llm_model in llm_models:
-                issues = await self._analyze_with_llm(
-                    db, session_id, processed_files, llm_model
+                unit_key = self._unit_key(file_data["file_id"], llm_model)
+                if checkpoints is not None and unit_key in checkpoints:
+                    continue
+                
+                prior_key = (*self._result_key(file_data), llm_model)
+                if prior_results and prior_key in prior_results:
+                    # Unchanged file: copy the stored issues, no LLM call
+                    await results_queue.put((
+                        unit_key, llm_model, file_data["metadata"]["filename"],
+                        prior_results[prior_key], None
+                    ))
+                    continue
+                
+                if batch and self.batch_service.supports(llm_model):
+                    batch_files.setdefault(llm_model, []).append(file_data)
+                    continue
+                
+                interactive_files.setdefault(llm_model, []).append(file_data)
+        
+        for llm_model, files in interactive_files.items():
+            by_id = {file_data["file_id"]: file_data for file_data in files}
+            groups, singles = plan_packs(llm_model, [self._llm_file(file_data) for file_data in files])
+            for group in groups:
+                tasks.append(asyncio.create_task(
+                    self._analyze_packed(
+                        session_id, [by_id[entry["key"]] for entry in group], llm_model, results_queue
+                    )
+                ))
+            for entry in singles:
+                tasks.append(asyncio.create_task(
+                    self._analyze_pair(session_id, by_id[entry["key"]], llm_model, results_queue)
+                ))
+        
+        for llm_model, files in batch_files.items():
+            tasks.append(asyncio.create_task(
+                self._analyze_model_batch(session_id, files, llm_model, results_queue, checkpoints)
+            ))
+        
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Tell the writer no more results are coming
+            await results_queue.put(None)
+        
+        return await writer
+    
+    async def _static_pass(
+        self,
+        processed_files: List[Dict[str, Any]],
+        results_queue: asyncio.Queue,
+        checkpoints: Optional[JobCheckpoints] = None
+    ):
+        """Check every file with the local rules and queue their issues.
+        
+        The issues are kept on each file as "static_issues" for narrowing
+        its prompts, and the computed styles of markup files (the session's
+        stylesheets applied) as "style_summary", together with the
+        "prompt_fingerprint" its result sets are keyed on; the issues are stored
+        under the STATIC_MODEL model name. Images are checked for
+        low-contrast regions from their file.
+        """
+        files = [file_data for file_data in processed_files if "error" not in file_data["metadata"]]
+        stylesheets = session_stylesheets([
+            (file_data["metadata"]["filename"], file_data["content"], file_data["metadata"]["file_type"])
+            for file_data in files
+        ])
+        
+        results = await asyncio.gather(*(self._run_rules(file_data, stylesheets) for file_data in files))
+        for file_data, (issues, style_summary) in zip(files, results):
+            file_data["prompt_fingerprint"] = prompt_fingerprint(
+                file_data["metadata"]["file_type"], issues, style_summary
+            )
+            if issues is None:
+                continue
+            file_data["static_issues"] = issues
+            file_data["style_summary"] = style_summary
+            unit_key = self._unit_key(file_data["file_id"], STATIC_MODEL)
+            if checkpoints is None or unit_key not in checkpoints:
+                await results_queue.put((unit_key, STATIC_MODEL, file_data["metadata"]["filename"], issues, None))
+    
+    async def _run_rules(
+        self,
+        file_data: Dict[str, Any],
+        stylesheets: List[Tuple[str, str]]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[StyleSummary]]:
+        """The local rules' issues and style summary of a processed file (see run_static_rules)."""
+        file_type = file_data["metadata"]["file_type"]
+        if "image_path" in file_data:
+            return await run_image_rules(file_data["image_path"], file_type), None
+        return await run_static_rules(file_data["content"], file_type, stylesheets)
+    
+    async def _analyze_pair(
+        self,
+        session_id: int,
+        file_data: Dict[str, Any],
+        llm_model: str,
+        results_queue: asyncio.Queue
+    ):
+        """Analyze one file with one model and queue the issues for writing.
+        
+        Issues are queued one by one as they stream in; a final item with no
+        issues marks the pair as complete.
+        """
+        filename = file_data["metadata"]["filename"]
+        
+        def queue_issue(issue: Dict[str, Any]):
+            results_queue.put_nowait((None, llm_model, filename, [issue], None))
+        
+        try:
+            # Analyze file content
+            issues = await self.llm_service.analyze_file(
+                llm_model,
+                file_data["content"],
+                file_data["metadata"]["file_type"],
+                filename,
+                on_issue=queue_issue,
+                static_issues=file_data.get("static_issues"),
+                style_summary=file_data.get("style_summary")
+            )
+            
+        except Exception as e:
+            logger.error(f"💥 [ANALYSIS SERVICE] Error analyzing {filename} with {llm_model}: {e}")
+            return
+        
+        unit_key = self._unit_key(file_data["file_id"], llm_model)
+        result_set = result_set_row(*self._result_key(file_data), llm_model, session_id, filename, issues)
+        await results_queue.put((unit_key, llm_model, filename, [], result_set))
+    
+    def _result_key(self, file_data: Dict[str, Any]) -> Tuple[str, str]:
+        """(content hash, prompt fingerprint) a processed file's result sets are keyed on."""
+        return file_data["metadata"]["content_hash"], file_data["prompt_fingerprint"]
+    
+    def _llm_file(self, file_data: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields of a processed file the LLM services need, keyed by file id."""
+        return {
+            "key": file_data["file_id"],
+            "content": file_data["content"],
+            "file_type": file_data["metadata"]["file_type"],
+            "filename": file_data["metadata"]["filename"],
+            "static_issues": file_data.get("static_issues"),
+            "style_summary": file_data.get("style_summary")
+        }
+    
+    async def _analyze_packed(
+        self,
+        session_id: int,
+        files: List[Dict[str, Any]],
+        llm_model: str,
+        results_queue: asyncio.Queue
+    ):
+        """Analyze several small files with one model in a single prompt.
+        
+        If the packed call fails the files are analyzed one by one instead.
+        """
+        try:
+            results = await self.llm_service.analyze_packed(
+                llm_model, [self._llm_file(file_data) for file_data in files]
+            )
+        except Exception as e:
+            logger.error(f"💥 [ANALYSIS SERVICE] Packed call for {len(files)} files with {llm_model} failed, analyzing separately: {e}")
+            await asyncio.gather(*(
+                self._analyze_pair(session_id, file_data, llm_model, results_queue)
+                for file_data in files
+            ))
+            return
+        
+        for file_data in files:
+            filename = file_data["metadata"]["filename"]
+            issues = results[file_data["file_id"]]
+            result_set = result_set_row(*self._result_key(file_data), llm_model, session_id, filename, issues)
+            await results_queue.put((
+                self._unit_key(file_data["file_id"], llm_model), llm_model, filename, issues, result_set
+            ))
+    
+    async def _analyze_model_batch(
+        self,
+        session_id: int,
+        files: List[Dict[str, Any]],
+        llm_model: str,
+        results_queue: asyncio.Queue,
+        checkpoints: Optional[JobCheckpoints] = None
+    ):
+        """Analyze many files with one model through a provider batch.
+        
+        The batch id is checkpointed so a resumed job polls the same batch.
+        Files the batch could not analyze fall back to interactive calls.
+        """
+        state_key = f"batch:{llm_model}"
+        state = checkpoints.get(state_key) if checkpoints is not None else None
+        
+        async def save_state(new_state: Dict[str, Any]):
+            if checkpoints is not None:
+                await asyncio.to_thread(checkpoints.save, state_key, new_state)
+        
+        try:
+            results, failed = await self.batch_service.analyze_files(
+                llm_model,
+                [self._llm_file(file_data) for file_data in files],
+                state=state,
+                on_submit=save_state
+            )
+        except Exception as e:
+            logger.error(f"💥 [ANALYSIS SERVICE] Batch for {llm_model} failed, analyzing interactively: {e}")
+            results, failed = {}, [file_data["file_id"] for file_data in files]
+        
+        for file_data in files:
+            issues = results.get(file_data["file_id"])
+            if issues is None:
+                continue
+            filename = file_data["metadata"]["filename"]
+            result_set = result_set_row(*self._result_key(file_data), llm_model, session_id, filename, issues)
+            await results_queue.put((
+                self._unit_key(file_data["file_id"], llm_model), llm_model, filename, issues, result_set
+            ))
+        
+        retry = [file_data for file_data in files if file_data["file_id"] in failed]
+        if retry:
+            logger.warning(f"⚠️ [ANALYSIS SERVICE] {len(retry)} files missing from the {llm_model} batch")
+            await asyncio.gather(*(
+                self._analyze_pair(session_id, file_data, llm_model, results_queue)
+                for file_data in retry
+            ))
+    
+    async def _result_writer(
+        self,
+        session_id: int,
+        results_queue: asyncio.Queue,
+        checkpoints: Optional[JobCheckpoints] = None
+    ) -> List[Dict[str, Any]]:
+        """Single consumer that bulk-inserts queued issues with its own DB session.
+        
+        A pair is checkpointed only once its rows have been committed.
+        Flushes (and the checkpoints they trigger) run in a thread, one at a
+        time, so the event loop never waits on the database.
+        """
+        all_issues = []
+        db = SessionLocal()
+        
+        def checkpoint_units(unit_keys: List[str]):
+            for unit_key in unit_keys:
+                checkpoints.save(unit_key, {"written": True})
+        
+        sink = ResultSink(db, on_flush=checkpoint_units if checkpoints is not None else None)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        results_queue.get(), timeout=sink.time_until_flush()
+                    )
+                except asyncio.TimeoutError:
+                    # Nothing arrived before buffered rows were due
+                    await asyncio.to_thread(sink.flush)
+                    continue
+                
+                if item is None:
+                    break
+                
+                unit_key, llm_model, filename, issues, result_set = item
+                sink.add(
+                    [issue_to_row(session_id, llm_model, filename, issue) for issue in issues],
+                    key=unit_key,
+                    result_set=result_set
                 )
                 all_issues.extend(issues)
+                if sink.due:
+                    await asyncio.to_thread(sink.flush)
             
-            # Update session status
-            session.status = "completed"
-            db.commit()
-            
-            return {
-                "session_id": session_id,
-                "total_issues": len(all_issues),
-                "issues_by_pour": self._categorize_by_pour(all_issues),
-                "issues_by_severity": self._categorize_by_severity(all_issues)
-            }
+            await asyncio.to_thread(sink.flush)
+        finally:
+            db.close()
+        
+        return all_issues
+    
+    async def estimate_analysis(
+        self,
+        db: Session,
+        files: List[UploadedFile],
+        llm_models: List[str],
+        user_id: Any,
+        incremental: bool = False,
+        batch: bool = False,
+        budget_usd: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Project the requests, tokens, cost and duration of a session without running it.
+        
+        Builds the prompts the session would send (chunked, packed or batched
+        the same way) and prices them with the models' ``cost_per_token``.
+        Pairs reused by ``incremental`` cost nothing; response cache hits are
+        not predicted, so the projection is an upper bound.
+        """
+        processed_files = [
+            file_data for file_data in await self._process_files(files)
+            if "error" not in file_data["metadata"]
+        ]
+        prior_results = {}
+        if incremental:
+            prior_results = load_prior_result_sets(
+                db, [f["metadata"]["content_hash"] for f in processed_files], llm_models
+            )
+        # The rules' findings narrow prompts, or replace the LLM calls entirely
+        stylesheets = session_stylesheets([
+            (file_data["metadata"]["filename"], file_data["content"], file_data["metadata"]["file_type"])
+            for file_data in processed_files
+        ])
+        static_results = await asyncio.gather(*(
+            self._run_rules(file_data, stylesheets) for file_data in processed_files
+        ))
+        for file_data, (issues, style_summary) in zip(processed_files, static_results):
+            file_data["prompt_fingerprint"] = prompt_fingerprint(
+                file_data["metadata"]["file_type"], issues, style_summary
+            )
+            if issues is not None:
+                file_data["static_issues"] = issues
+                file_data["style_summary"] = style_summary
+        
+        models = {}
+        interactive = {}
+        reused_pairs = 0
+        for llm_model in llm_models:
+            entries = []
+            for file_data in processed_files:
+                if replaces_llm(file_data.get("static_issues"), file_data["metadata"]["file_type"]):
+                    continue
+                if (*self._result_key(file_data), llm_model) in prior_results:
+                    reused_pairs += 1
+                else:
+                    entries.append(self._llm_file(file_data))
             
-        except Exception as e:
-            # Update session status to failed
-            session.status = "failed"
-            db.commit()
-            raise e
+            use_batch = batch and self.batch_service.supports(llm_model)
+            if use_batch:
+                groups, singles = [], entries
+            else:
+                groups, singles = plan_packs(llm_model, entries)
+            prompts = [self.llm_service.prepare_packed_prompt(group)[0] for group in groups]
+            for entry in singles:
+                prompts.extend(
+                    prompt for _, prompt in self.llm_service.prepare_prompts(
+                        llm_model, entry["content"], entry["file_type"], entry["filename"],
+                        entry["static_issues"], entry["style_summary"]
+                    )
+                )
+            # Every request also carries the system prompt
+            estimate = estimate_prompts(
+                llm_model, [f"{ANALYSIS_INSTRUCTIONS}\n{prompt}" for prompt in prompts], use_batch
+            )
+            estimate["batch"] = use_batch
+            models[llm_model] = estimate
+            if not use_batch:
+                interactive[llm_model] = estimate
+        
+        total_cost = sum(estimate["cost_usd"] for estimate in models.values())
+        limit = budget_limit(db, user_id, budget_usd)
+        return {
+            "files": len(processed_files),
+            "reused_pairs": reused_pairs,
+            "models": models,
+            "total": {
+                "requests": sum(estimate["requests"] for estimate in models.values()),
+                "input_tokens": sum(estimate["input_tokens"] for estimate in models.values()),
+                "output_tokens": sum(estimate["output_tokens"] for estimate in models.values()),
+                "cost_usd": round(total_cost, 6)
+            },
+            # Batch jobs finish within the provider's completion window instead
+            "estimated_duration_seconds": estimate_duration(interactive, self.scheduler),
+            "budget_usd": limit,
+            "within_budget": limit is None or total_cost <= limit
+        }
     
     async def _process_files(self, files: List[UploadedFile]) -> List[Dict[str, Any]]:
         """Process uploaded files for analysis."""
@@ -90,6 +633,7 @@ class AnalysisService:
                 # Read file content
                 with open(file.file_path, 'rb') as f:
                     content = f.read()
+                file_hash = content_hash(content)
                 
                 # Decode text files
                 if file.mime_type.startswith('text/') or file.file_type in [
@@ -110,20 +654,25 @@ class AnalysisService:
                     "file_type": file.file_type,
                     "mime_type": file.mime_type,
                     "file_size": file.file_size,
+                    "content_hash": file_hash,
                     "is_text": file.mime_type.startswith('text/') or file.file_type in [
                         '.html', '.css', '.js', '.ts', '.jsx', '.tsx', 
                         '.vue', '.svelte', '.json', '.xml', '.qml'
                     ]
                 }
                 
-                processed_files.append({
+                file_data = {
                     "file_id": file.id,
                     "content": content,
                     "metadata": metadata
-                })
+                }
+                if image_contrast.supports(file.file_type):
+                    # Screenshots are checked from their pixels by the static pass
+                    file_data["image_path"] = file.file_path
+                processed_files.append(file_data)
                 
             except Exception as e:
-                print(f"Error processing file {file.original_filename}: {e}")
+                logger.error(f"💥 [ANALYSIS SERVICE] Error processing file {file.original_filename}: {e}")
                 processed_files.append({
                     "file_id": file.id,
                     "content": f"Error processing file: {str(e)}",
@@ -132,56 +681,6 @@ class AnalysisService:
         
         return processed_files
     
-    async def _analyze_with_llm(
-        self,
-        db: Session,
-        session_id: int,
-        processed_files: List[Dict[str, Any]],
-        llm_model: str
-    ) -> List[Dict[str, Any]]:
-        """Analyze files with a specific LLM model."""
-        all_issues = []
-        
-        for file_data in processed_files:
-            try:
-                # Analyze file content
-                response = await self.llm_service.analyze_accessibility(
-                    llm_model,
-                    file_data["content"],
-                    file_data["metadata"]["file_type"],
-                    file_data["metadata"]["filename"]
-                )
-                
-                # Parse response
-                issues = self.llm_service.parse_llm_response(response, llm_model)
-                
-                # Save issues to database
-                for issue in issues:
-                    db_issue = AnalysisResult(
-                        analysis_session_id=session_id,
-                        llm_model=llm_model,
-                        wcag_guideline=issue.get("wcag_guideline", "Unknown"),
-                        pour_principle=issue.get("pour_principle", "unknown"),
-                        severity=issue.get("severity", "medium"),
-                        title=issue.get("title", "Accessibility Issue"),
-                        description=issue.get("description", ""),
-                        file_path=file_data["metadata"]["filename"],
-                        line_number=issue.get("line_number"),
-                        code_snippet=issue.get("code_snippet"),
-                        suggestion=issue.get("suggestion"),
-                        confidence_score=issue.get("confidence_score", 0.5)
-                    )
-                    db.add(db_issue)
-                    all_issues.append(issue)
-                
-                db.commit()
-                
-            except Exception as e:
-                print(f"Error analyzing file with {llm_model}: {e}")
-                continue
-        
-        return all_issues
-    
     def _categorize_by_pour(self, issues: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Categorize issues by POUR principle."""
         categorized = {
@@ -258,7 +757,8 @@ class AnalysisService:
             "issues_by_pour": {k: len(v) for k, v in issues_by_pour.items()},
             "issues_by_severity": {k: len(v) for k, v in issues_by_severity.items()},
             "unique_wcag_guidelines": len(set(issue["wcag_guideline"] for issue in issues_data)),
-            "files_analyzed": len(set(issue["file_path"] for issue in issues_data if issue["file_path"]))
+            "files_analyzed": len(set(issue["file_path"] for issue in issues_data if issue["file_path"])),
+            "usage": session_usage(db, session_id, session.user_id)
         }
         
         return {
@@ -281,134 +781,458 @@ class AnalysisService:
         session_id: str,
         files: List[Dict],
         models: List[str],
-        user_id: str
+        user_id: str,
+        incremental: bool = False,
+        checkpoints: Optional[JobCheckpoints] = None,
+        budget_usd: Optional[float] = None
     ):
-        """Simplified analysis start method for frontend compatibility."""
+        """Simplified analysis start method for frontend compatibility.
+        
+        With ``checkpoints`` the issues of (file, model) pairs finished by an
+        earlier attempt are replayed instead of calling the LLM again. With
+        ``incremental`` files already analyzed with the same content, model
+        and prompt reuse the stored issues. Budgets apply as in
+        ``start_analysis``.
+        """
         logger.info(f"🚀 [ANALYSIS SERVICE] Starting real LLM analysis for session {session_id}")
         logger.info(f"📁 [ANALYSIS SERVICE] Files: {len(files)}")
         logger.info(f"🤖 [ANALYSIS SERVICE] Models: {models}")
         
-        # Initialize progress
-        analysis_progress[session_id] = {
-            "status": "analyzing",
-            "progress": 0,
-            "issues": [],
-            "error": None
-        }
+        # Initialize progress; later writes go through the writer's thread
+        await asyncio.to_thread(self.progress_store.start, session_id)
+        progress = ProgressWriter(self.progress_store, session_id)
         
+        new_result_sets: List[Dict[str, Any]] = []
+        budget = SessionBudget()
+        budget_token = use_budget(budget)
         try:
-            # Calculate total steps
-            total_steps = len(files) * len(models) + 2  # +2 for setup and completion
-            current_step = 0
+            budget.limit_usd = await asyncio.to_thread(self._budget_limit, session_id, user_id, budget_usd)
+            file_hashes = [content_hash(file_data.get('content', '')) for file_data in files]
+            prior_results = {}
+            if incremental:
+                prior_results = await asyncio.to_thread(
+                    self._load_prior_results, file_hashes, models
+                )
+                logger.info(f"♻️ [ANALYSIS SERVICE] Reusing {len(prior_results)} prior file/model results")
             
-            # Step 1: Setup
-            logger.info(f"📝 [ANALYSIS SERVICE] Step 1: Setup")
-            analysis_progress[session_id]["progress"] = int((current_step / total_steps) * 100)
-            current_step += 1
-            await asyncio.sleep(0.5)
+            stylesheets = session_stylesheets([
+                (file_data.get('name', 'Unknown'), file_data.get('content', ''), file_data.get('type', 'text/plain'))
+                for file_data in files
+            ])
+            static_results = await asyncio.gather(*(
+                self._run_rules_simple(file_data, stylesheets) for file_data in files
+            ))
+            static_issues = [issues for issues, _ in static_results]
+            style_summaries = [style_summary for _, style_summary in static_results]
+            result_keys = [
+                (file_hash, prompt_fingerprint(file_data.get('type', 'text/plain'), issues, style_summary))
+                for file_hash, file_data, (issues, style_summary) in zip(file_hashes, files, static_results)
+            ]
+            for file_idx, issues in enumerate(static_issues):
+                if issues:
+                    # Static issues take the model slot after the LLMs
+                    file_name = files[file_idx].get('name', 'Unknown')
+                    progress.append_issues([
+                        self._format_issue(session_id, file_idx, file_name, len(models), issue_idx, issue)
+                        for issue_idx, issue in enumerate(issues)
+                    ])
             
-            # Step 2: Analyze each file with each model
+            # Dispatch every (file, model) pair at once; the scheduler bounds
+            # how many are actually in flight globally and per provider.
+            # Pairs that need an LLM call and are small get packed per model.
+            tasks = []
+            task_steps = {}
+            fresh: Dict[int, List[Dict[str, Any]]] = {}
             for file_idx, file_data in enumerate(files):
-                file_name = file_data.get('name', 'Unknown')
-                file_content = file_data.get('content', '')
-                file_type = file_data.get('type', 'text/plain')
-                
-                logger.info(f"📄 [ANALYSIS SERVICE] Processing file {file_idx + 1}/{len(files)}: {file_name}")
-                
+                if replaces_llm(static_issues[file_idx], file_data.get('type', 'text/plain')):
+                    continue
                 for model_idx, model_id in enumerate(models):
-                    logger.info(f"🤖 [ANALYSIS SERVICE] Using model {model_idx + 1}/{len(models)}: {model_id}")
-                    
-                    try:
-                        # Call real LLM service for analysis
-                        logger.info(f"🔍 [ANALYSIS SERVICE] Calling LLM {model_id} for analysis...")
-                        response = await self.llm_service.analyze_accessibility(
-                            model_id,
-                            file_content,
-                            file_type,
-                            file_name
+                    prior_issues = prior_results.get((*result_keys[file_idx], model_id))
+                    done = checkpoints is not None and self._unit_key(file_idx, model_id) in checkpoints
+                    if prior_issues is None and not done:
+                        fresh.setdefault(model_idx, []).append({
+                            "key": file_idx,
+                            "content": file_data.get('content', ''),
+                            "file_type": file_data.get('type', 'text/plain'),
+                            "filename": file_data.get('name', 'Unknown'),
+                            "static_issues": static_issues[file_idx],
+                            "style_summary": style_summaries[file_idx]
+                        })
+                        continue
+                    task = asyncio.create_task(
+                        self._analyze_pair_simple(
+                            session_id, progress, file_idx, file_data, model_idx, model_id, checkpoints,
+                            result_keys[file_idx], prior_issues, new_result_sets,
+                            static_issues[file_idx], style_summaries[file_idx]
                         )
+                    )
+                    tasks.append(task)
+                    task_steps[task] = 1
+            
+            for model_idx, entries in fresh.items():
+                model_id = models[model_idx]
+                groups, singles = plan_packs(model_id, entries)
+                for group in groups:
+                    task = asyncio.create_task(
+                        self._analyze_packed_simple(
+                            session_id, progress, files, group, model_idx, model_id, checkpoints,
+                            result_keys, new_result_sets
+                        )
+                    )
+                    tasks.append(task)
+                    task_steps[task] = len(group)
+                for entry in singles:
+                    file_idx = entry["key"]
+                    task = asyncio.create_task(
+                        self._analyze_pair_simple(
+                            session_id, progress, file_idx, files[file_idx], model_idx, model_id, checkpoints,
+                            result_keys[file_idx], None, new_result_sets,
+                            entry["static_issues"], entry["style_summary"]
+                        )
+                    )
+                    tasks.append(task)
+                    task_steps[task] = 1
+            
+            total_steps = sum(task_steps.values())
+            completed_steps = 0
+            total_issues = 0
+            
+            try:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        # Each task publishes its own issues as they arrive
+                        formatted_issues = task.result()
+                        total_issues += len(formatted_issues)
                         
-                        logger.info(f"📝 [ANALYSIS SERVICE] LLM {model_id} response received")
-                        
-                        # Parse LLM response to extract issues
-                        issues = self.llm_service.parse_llm_response(response, model_id)
-                        
-                        logger.info(f"🎯 [ANALYSIS SERVICE] Found {len(issues)} issues from {model_id}")
-                        
-                        # Convert issues to frontend format
-                        for issue_idx, issue in enumerate(issues):
-                            formatted_issue = {
-                                "id": f"issue_{session_id}_{file_idx}_{model_idx}_{issue_idx}",
-                                "title": issue.get("title", f"Accessibility Issue in {file_name}"),
-                                "description": issue.get("description", "Accessibility issue found by LLM analysis"),
-                                "severity": issue.get("severity", "medium"),
-                                "wcagGuideline": {
-                                    "id": f"wcag_{issue_idx}",
-                                    "principle": issue.get("pour_principle", "Perceivable"),
-                                    "guideline": issue.get("wcag_guideline", "1.1.1 Non-text Content"),
-                                    "level": issue.get("wcag_level", "A"),
-                                    "successCriteria": issue.get("success_criteria", "1.1.1"),
-                                    "description": issue.get("wcag_description", "WCAG guideline description"),
-                                    "version": "2.2"
-                                },
-                                "pourPrinciple": issue.get("pour_principle", "Perceivable"),
-                                "confidence": int(issue.get("confidence_score", 0.85) * 100),
-                                "files": [{
-                                    "fileId": f"file_{file_idx}",
-                                    "fileName": file_name,
-                                    "lineNumber": issue.get("line_number", 1),
-                                    "codeSnippet": issue.get("code_snippet", f"Code from {file_name}"),
-                                    "context": issue.get("context", f"Context in {file_name}")
-                                }],
-                                "suggestions": issue.get("suggestions", [
-                                    "Review the identified accessibility issue",
-                                    "Implement recommended fixes",
-                                    "Test with assistive technologies"
-                                ]),
-                                "createdAt": issue.get("created_at", "2024-01-01T00:00:00Z")
-                            }
-                            
-                            analysis_progress[session_id]["issues"].append(formatted_issue)
-                        
-                    except Exception as e:
-                        logger.error(f"💥 [ANALYSIS SERVICE] Error with model {model_id}: {e}")
-                        # Continue with other models even if one fails
-                        continue
-                    
-                    # Update progress
-                    analysis_progress[session_id]["progress"] = int((current_step / total_steps) * 100)
-                    current_step += 1
-                    
-                    # Small delay to prevent overwhelming the API
-                    await asyncio.sleep(0.5)
+                        # Update progress
+                        completed_steps += task_steps[task]
+                        progress.update(progress=int((completed_steps / total_steps) * 100))
+            finally:
+                for task in tasks:
+                    task.cancel()
             
-            # Step 3: Completion
+            # Completion
             logger.info(f"✅ [ANALYSIS SERVICE] Analysis completed")
-            analysis_progress[session_id]["progress"] = 100
-            analysis_progress[session_id]["status"] = "completed"
+            progress.update(status="completed", progress=100)
             
-            total_issues = len(analysis_progress[session_id]["issues"])
             logger.info(f"🎉 [ANALYSIS SERVICE] Generated {total_issues} real accessibility issues")
+            if budget.refused:
+                logger.warning(
+                    f"💸 [ANALYSIS SERVICE] Session {session_id} hit its ${budget.limit_usd:.2f} budget; "
+                    f"{budget.refused} LLM calls were skipped"
+                )
             
         except Exception as e:
             logger.error(f"💥 [ANALYSIS SERVICE] Analysis failed: {e}")
-            analysis_progress[session_id]["status"] = "failed"
-            analysis_progress[session_id]["error"] = str(e)
+            progress.update(status="failed", error=str(e))
+        finally:
+            reset_budget(budget_token)
+            await progress.close()
+        
+        try:
+            await asyncio.to_thread(self._store_usage, session_id, user_id, budget)
+        except Exception as e:
+            logger.error(f"💥 [ANALYSIS SERVICE] Failed to store LLM usage: {e}")
+        
+        # Remember what was analyzed so later incremental runs can reuse it
+        if new_result_sets:
+            try:
+                await asyncio.to_thread(self._store_result_sets, new_result_sets)
+            except Exception as e:
+                logger.error(f"💥 [ANALYSIS SERVICE] Failed to store result sets: {e}")
+    
+    async def _run_rules_simple(
+        self,
+        file_data: Dict,
+        stylesheets: List[Tuple[str, str]]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[StyleSummary]]:
+        """The local rules' issues and style summary of a frontend file.
+        
+        Images arrive as base64 data URLs and are checked from their bytes.
+        """
+        content = file_data.get('content', '')
+        file_type = file_data.get('type', 'text/plain')
+        if image_contrast.supports(file_type):
+            image = image_contrast.data_url_bytes(content)
+            if image is None:
+                return None, None
+            return await run_image_rules(image, file_type), None
+        return await run_static_rules(content, file_type, stylesheets)
+    
+    def _load_prior_results(self, hashes: List[str], models: List[str]) -> Dict[Any, List[Dict[str, Any]]]:
+        db = SessionLocal()
+        try:
+            return load_prior_result_sets(db, hashes, models)
+        finally:
+            db.close()
+    
+    def _budget_limit(self, session_id: str, user_id: Any, budget_usd: Optional[float]) -> Optional[float]:
+        db = SessionLocal()
+        try:
+            return budget_limit(db, user_id, budget_usd, session_id)
+        finally:
+            db.close()
+    
+    def _store_usage(self, session_id: Any, user_id: Any, budget: SessionBudget):
+        db = SessionLocal()
+        try:
+            record_session_usage(db, session_id, user_id, budget)
+        finally:
+            db.close()
+    
+    def _store_result_sets(self, rows: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            record_result_sets(db, rows)
+        finally:
+            db.close()
     
-    def get_progress(self, session_id: str) -> Dict[str, Any]:
-        """Get analysis progress for a session."""
-        logger.info(f"📊 [ANALYSIS SERVICE] Getting progress for session {session_id}")
+    async def _analyze_pair_simple(
+        self,
+        session_id: str,
+        progress: ProgressWriter,
+        file_idx: int,
+        file_data: Dict,
+        model_idx: int,
+        model_id: str,
+        checkpoints: Optional[JobCheckpoints] = None,
+        result_key: Optional[Tuple[str, str]] = None,
+        prior_issues: Optional[List[Dict[str, Any]]] = None,
+        new_result_sets: Optional[List[Dict[str, Any]]] = None,
+        static_issues: Optional[List[Dict[str, Any]]] = None,
+        style_summary: Optional[List[Tuple[int, str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Analyze one file with one model and publish frontend-formatted issues.
+        
+        Issues go to ``progress`` as soon as they are parsed from the
+        streamed completion; the formatted list is also returned.
+        """
+        file_name = file_data.get('name', 'Unknown')
+        file_content = file_data.get('content', '')
+        file_type = file_data.get('type', 'text/plain')
+        
+        unit_key = self._unit_key(file_idx, model_id)
+        if checkpoints is not None and unit_key in checkpoints:
+            formatted_issues = checkpoints.get(unit_key)
+            progress.append_issues(formatted_issues)
+            return formatted_issues
+        
+        formatted_issues: List[Dict[str, Any]] = []
+        
+        def publish_issue(issue: Dict[str, Any]):
+            formatted = self._format_issue(
+                session_id, file_idx, file_name, model_idx, len(formatted_issues), issue
+            )
+            formatted_issues.append(formatted)
+            progress.append_issues([formatted])
+        
+        if prior_issues is not None:
+            # Unchanged file: reuse the stored issues instead of calling the LLM
+            for issue in prior_issues:
+                publish_issue(issue)
+            logger.info(f"♻️ [ANALYSIS SERVICE] Reused {len(prior_issues)} issues in {file_name} from {model_id}")
+        else:
+            try:
+                # Call real LLM service for analysis
+                logger.info(f"🔍 [ANALYSIS SERVICE] Calling LLM {model_id} for {file_name}...")
+                issues = await self.llm_service.analyze_file(
+                    model_id,
+                    file_content,
+                    file_type,
+                    file_name,
+                    on_issue=publish_issue,
+                    static_issues=static_issues,
+                    style_summary=style_summary
+                )
+                logger.info(f"🎯 [ANALYSIS SERVICE] Found {len(issues)} issues in {file_name} from {model_id}")
+                
+            except Exception as e:
+                logger.error(f"💥 [ANALYSIS SERVICE] Error with model {model_id} on {file_name}: {e}")
+                # Other pairs carry on even if one fails; streamed issues stay
+                return formatted_issues
+            
+            if result_key is not None and new_result_sets is not None:
+                new_result_sets.append(
+                    result_set_row(*result_key, model_id, session_id, file_name, issues)
+                )
         
-        if session_id not in analysis_progress:
+        if checkpoints is not None:
+            await asyncio.to_thread(checkpoints.save, unit_key, formatted_issues)
+        return formatted_issues
+    
+    async def _analyze_packed_simple(
+        self,
+        session_id: str,
+        progress: ProgressWriter,
+        files: List[Dict],
+        entries: List[Dict[str, Any]],
+        model_idx: int,
+        model_id: str,
+        checkpoints: Optional[JobCheckpoints],
+        result_keys: List[Tuple[str, str]],
+        new_result_sets: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Analyze several small files with one model in a single prompt.
+        
+        ``entries`` are the packed files keyed by file index. Falls back to
+        one call per file if the packed call fails.
+        """
+        try:
+            logger.info(f"🔍 [ANALYSIS SERVICE] Calling LLM {model_id} for {len(entries)} packed files...")
+            results = await self.llm_service.analyze_packed(model_id, entries)
+        except Exception as e:
+            logger.error(f"💥 [ANALYSIS SERVICE] Packed call with {model_id} failed, analyzing separately: {e}")
+            per_file = await asyncio.gather(*(
+                self._analyze_pair_simple(
+                    session_id, progress, entry["key"], files[entry["key"]], model_idx, model_id, checkpoints,
+                    result_keys[entry["key"]], None, new_result_sets,
+                    entry["static_issues"], entry["style_summary"]
+                )
+                for entry in entries
+            ))
+            return [issue for formatted_issues in per_file for issue in formatted_issues]
+        
+        all_formatted = []
+        for entry in entries:
+            file_idx = entry["key"]
+            issues = results[file_idx]
+            formatted_issues = [
+                self._format_issue(session_id, file_idx, entry["filename"], model_idx, issue_idx, issue)
+                for issue_idx, issue in enumerate(issues)
+            ]
+            progress.append_issues(formatted_issues)
+            new_result_sets.append(
+                result_set_row(*result_keys[file_idx], model_id, session_id, entry["filename"], issues)
+            )
+            if checkpoints is not None:
+                await asyncio.to_thread(checkpoints.save, self._unit_key(file_idx, model_id), formatted_issues)
+            all_formatted.extend(formatted_issues)
+        logger.info(f"🎯 [ANALYSIS SERVICE] Found {len(all_formatted)} issues in {len(entries)} packed files from {model_id}")
+        return all_formatted
+    
+    def _format_issue(
+        self,
+        session_id: str,
+        file_idx: int,
+        file_name: str,
+        model_idx: int,
+        issue_idx: int,
+        issue: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Convert a parsed LLM issue to the frontend format."""
+        return {
+            "id": f"issue_{session_id}_{file_idx}_{model_idx}_{issue_idx}",
+            "title": issue.get("title", f"Accessibility Issue in {file_name}"),
+            "description": issue.get("description", "Accessibility issue found by LLM analysis"),
+            "severity": issue.get("severity", "medium"),
+            "wcagGuideline": {
+                "id": f"wcag_{issue_idx}",
+                "principle": issue.get("pour_principle", "Perceivable"),
+                "guideline": issue.get("wcag_guideline", "1.1.1 Non-text Content"),
+                "level": issue.get("wcag_level", "A"),
+                "successCriteria": issue.get("success_criteria", "1.1.1"),
+                "description": issue.get("wcag_description", "WCAG guideline description"),
+                "version": "2.2"
+            },
+            "pourPrinciple": issue.get("pour_principle", "Perceivable"),
+            "confidence": int(issue.get("confidence_score", 0.85) * 100),
+            "files": [{
+                "fileId": f"file_{file_idx}",
+                "fileName": file_name,
+                "lineNumber": issue.get("line_number", 1),
+                "codeSnippet": issue.get("code_snippet", f"Code from {file_name}"),
+                "context": issue.get("context", f"Context in {file_name}")
+            }],
+            "suggestions": issue.get("suggestions", [
+                "Review the identified accessibility issue",
+                "Implement recommended fixes",
+                "Test with assistive technologies"
+            ]),
+            "createdAt": issue.get("created_at", "2024-01-01T00:00:00Z")
+        }
+    
+    def get_progress(self, session_id: str, since: Optional[int] = None) -> Dict[str, Any]:
+        """Get analysis progress for a session.
+        
+        With ``since`` set, only issues appended after that cursor are
+        returned; the response's ``cursor`` is the value for the next poll.
+        """
+        logger.debug(f"📊 [ANALYSIS SERVICE] Getting progress for session {session_id} since {since}")
+        
+        progress_data = self.progress_store.get_since(session_id, since or 0)
+        if progress_data is None:
             logger.warning(f"⚠️ [ANALYSIS SERVICE] Session {session_id} not found")
             return {
                 "status": "not_found",
                 "progress": 0,
                 "issues": [],
-                "error": "Session not found"
+                "error": "Session not found",
+                "cursor": since or 0
             }
         
-        progress_data = analysis_progress[session_id]
-        logger.info(f"📈 [ANALYSIS SERVICE] Progress: {progress_data['progress']}% - {progress_data['status']}")
+        logger.debug(f"📈 [ANALYSIS SERVICE] Progress: {progress_data['progress']}% - {progress_data['status']}")
         
         return progress_data
+    
+    async def stream_progress(
+        self,
+        session_id: str,
+        cursor: int = 0,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> AsyncIterator[str]:
+        """Yield Server-Sent Events for a session's progress and new issues.
+        
+        Each ``issue`` event carries an ``id`` equal to the number of issues
+        delivered so far, so a client reconnecting with ``Last-Event-ID`` (or
+        ``cursor``) resumes right after the last issue it received.
+        """
+        logger.info(f"📡 [ANALYSIS SERVICE] Streaming progress for session {session_id} from {cursor}")
+        last_state = None
+        idle_time = 0.0
+        
+        while True:
+            if is_disconnected is not None and await is_disconnected():
+                return
+            
+            data = await asyncio.to_thread(self.progress_store.get_since, session_id, cursor)
+            if data is None:
+                yield self._sse_event("error", {"status": "not_found", "error": "Session not found"})
+                return
+            
+            for issue in data["issues"]:
+                cursor += 1
+                yield self._sse_event("issue", issue, event_id=cursor)
+            
+            state = {
+                "status": data["status"],
+                "progress": data["progress"],
+                "error": data["error"],
+                "cursor": cursor
+            }
+            if state != last_state:
+                yield self._sse_event("progress", state)
+                last_state = state
+                idle_time = 0.0
+            
+            if data["status"] in FINISHED_STATUSES:
+                yield self._sse_event("end", state)
+                return
+            
+            await asyncio.sleep(settings.progress_stream_interval)
+            idle_time += settings.progress_stream_interval
+            if idle_time >= settings.progress_stream_keepalive:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                idle_time = 0.0
+    
+    def _sse_event(self, event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+        """Encode one Server-Sent Event."""
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, default=str)}")
+        return "\n".join(lines) + "\n\n"
+
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Awaitable, Callable, Tuple
+import httpx
+from app.config import settings
+from app.data.llm_models import LLM_CONFIGS
+from app.services.chunker import remap_issue
+from app.services.token_budget import current_budget, estimate_call_cost
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJobError(Exception):
+    """Raised when a provider batch fails as a whole."""
+
+
+class ProviderBatchAPI(ABC):
+    """Submit, poll and download one provider's asynchronous batch jobs."""
+
+    def __init__(self, client: httpx.AsyncClient, adapter, base_url: str):
+        self.client = client
+        self.adapter = adapter
+        self.base_url = base_url.rstrip("/")
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("headers", self.adapter.headers)
+        response = await self.client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @abstractmethod
+    async def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        """Create a batch from ``{custom_id: payload}`` and return its id."""
+
+    @abstractmethod
+    async def poll(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Return the finished batch object, or None while it is still running."""
+
+    @abstractmethod
+    async def results(self, batch: Dict[str, Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Return ``{custom_id: response}``; failed requests map to None."""
+
+    @staticmethod
+    def _jsonl(text: str) -> List[Dict[str, Any]]:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBatchAPI(ProviderBatchAPI):
+    """OpenAI Batch API: upload a JSONL file, create a batch, fetch the output file."""
+
+    async def submit(self, requests):
+        lines = "\n".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": payload
+            })
+            for custom_id, payload in requests.items()
+        )
+        # Multipart upload: drop the JSON content type from the static headers
+        upload_headers = {
+            name: value for name, value in self.adapter.headers.items()
+            if name.lower() != "content-type"
+        }
+        upload = await self._request(
+            "POST",
+            f"{self.base_url}/files",
+            headers=upload_headers,
+            data={"purpose": "batch"},
+            files={"file": ("requests.jsonl", lines.encode("utf-8"), "application/jsonl")}
+        )
+        batch = await self._request(
+            "POST",
+            f"{self.base_url}/batches",
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": settings.llm_batch_completion_window
+            }
+        )
+        return batch.json()["id"]
+
+    async def poll(self, batch_id):
+        batch = (await self._request("GET", f"{self.base_url}/batches/{batch_id}")).json()
+        if batch["status"] == "failed":
+            raise BatchJobError(f"OpenAI batch {batch_id} failed: {batch.get('errors')}")
+        if batch["status"] in ("completed", "expired", "cancelled"):
+            # Expired/cancelled batches still return whatever finished
+            return batch
+        return None
+
+    async def results(self, batch):
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        if batch.get("output_file_id"):
+            output = await self._request("GET", f"{self.base_url}/files/{batch['output_file_id']}/content")
+            for line in self._jsonl(output.text):
+                response = line.get("response") or {}
+                ok = response.get("status_code") == 200 and not line.get("error")
+                results[line["custom_id"]] = response.get("body") if ok else None
+        return results
+
+
+class AnthropicBatchAPI(ProviderBatchAPI):
+    """Anthropic Message Batches API."""
+
+    async def submit(self, requests):
+        batch = await self._request(
+            "POST",
+            f"{self.base_url}/messages/batches",
+            json={
+                "requests": [
+                    {"custom_id": custom_id, "params": payload}
+                    for custom_id, payload in requests.items()
+                ]
+            }
+        )
+        return batch.json()["id"]
+
+    async def poll(self, batch_id):
+        batch = (await self._request("GET", f"{self.base_url}/messages/batches/{batch_id}")).json()
+        return batch if batch["processing_status"] == "ended" else None
+
+    async def results(self, batch):
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        if batch.get("results_url"):
+            output = await self._request("GET", batch["results_url"])
+            for line in self._jsonl(output.text):
+                result = line.get("result") or {}
+                results[line["custom_id"]] = result.get("message") if result.get("type") == "succeeded" else None
+        return results
+
+
+# Batch APIs by the "api_format" of LLM_CONFIGS
+BATCH_APIS = {
+    "openai": OpenAIBatchAPI,
+    "anthropic": AnthropicBatchAPI
+}
+
+
+class BatchService:
+    """Runs a whole session's prompts for one model through a provider batch.
+
+    Prompts are the same ones the interactive path would send (chunks
+    included), so responses already in the response cache are reused and
+    batch responses are cached for later interactive runs. Models opt in
+    with a ``batch_api_base`` entry in LLM_CONFIGS.
+    """
+
+    def __init__(self, llm_service):
+        self.llm_service = llm_service
+
+    def supports(self, model_id: str) -> bool:
+        config = LLM_CONFIGS.get(model_id, {})
+        return bool(config.get("batch_api_base")) and config.get("api_format", "openai") in BATCH_APIS
+
+    def _api(self, model_id: str) -> ProviderBatchAPI:
+        adapter = self.llm_service._get_adapter(model_id)
+        config = adapter.config
+        base_url = settings.llm_batch_base_url or config["batch_api_base"]
+        api_class = BATCH_APIS[config.get("api_format", "openai")]
+        return api_class(self.llm_service._get_client(config), adapter, base_url)
+
+    async def analyze_files(
+        self,
+        model_id: str,
+        files: List[Dict[str, Any]],
+        state: Optional[Dict[str, Any]] = None,
+        on_submit: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Tuple[Dict[Any, List[Dict[str, Any]]], List[Any]]:
+        """Analyze ``files`` (dicts with key, content, file_type, filename).
+
+        ``state`` is what ``on_submit`` (awaited once the batch is
+        submitted) was given by an earlier attempt; with it the existing
+        batch is polled instead of submitting a new one.
+        Returns the issues per file key and the keys of files that could not
+        be analyzed (to be retried interactively).
+        """
+        adapter = self.llm_service._get_adapter(model_id)
+        if adapter.requires_api_key and not adapter.api_key:
+            raise ValueError(f"API key not configured for model: {model_id}")
+
+        # Custom ids depend only on file order and chunking, so a resumed
+        # attempt maps the earlier batch's results the same way
+        units: Dict[str, Tuple[Any, Any, str]] = {}
+        for file_index, file_data in enumerate(files):
+            prompts = self.llm_service.prepare_prompts(
+                model_id, file_data["content"], file_data["file_type"], file_data["filename"],
+                file_data.get("static_issues"), file_data.get("style_summary")
+            )
+            for chunk_index, (chunk, prompt) in enumerate(prompts):
+                units[f"f{file_index}-c{chunk_index}"] = (file_data["key"], chunk, prompt)
+
+        responses: Dict[str, Optional[Dict[str, Any]]] = {}
+        if self.llm_service.cache is not None:
+            for custom_id, (_, _, prompt) in units.items():
+                cache_key = self.llm_service.response_cache_key(model_id, prompt)
+                cached = await asyncio.to_thread(self.llm_service.cache.get, cache_key)
+                if cached is not None:
+                    responses[custom_id] = cached
+
+        pending = {custom_id: unit for custom_id, unit in units.items() if custom_id not in responses}
+        if pending:
+            api = self._api(model_id)
+            batch_id = (state or {}).get("batch_id")
+            budget = current_budget()
+            reservation = 0.0
+            if batch_id is None and budget is not None:
+                # The whole batch must fit the session budget before submission
+                reservation = await budget.reserve(model_id, sum(
+                    estimate_call_cost(model_id, f"{adapter.system_prompt}\n{prompt}", batch=True)
+                    for _, _, prompt in pending.values()
+                ))
+            try:
+                batch_results = await self._run_batch(api, model_id, adapter, pending, batch_id, on_submit)
+                for custom_id, (_, _, prompt) in pending.items():
+                    response = batch_results.get(custom_id)
+                    if response is not None:
+                        cache_key = self.llm_service.response_cache_key(model_id, prompt)
+                        await self.llm_service.record_response(model_id, cache_key, response, batch=True)
+                    responses[custom_id] = response
+            finally:
+                if budget is not None:
+                    await budget.release(reservation)
+
+        issues_by_file: Dict[Any, List[Dict[str, Any]]] = {file_data["key"]: [] for file_data in files}
+        failed = set()
+        for custom_id, (key, chunk, _) in units.items():
+            response = responses.get(custom_id)
+            if response is None:
+                failed.add(key)
+                continue
+            issues = self.llm_service.parse_llm_response(response, model_id)
+            if chunk is not None:
+                issues = [remap_issue(issue, chunk) for issue in issues]
+            issues_by_file[key].extend(issues)
+
+        for key in failed:
+            del issues_by_file[key]
+        return issues_by_file, list(failed)
+
+    async def _run_batch(
+        self,
+        api: ProviderBatchAPI,
+        model_id: str,
+        adapter,
+        pending: Dict[str, Tuple[Any, Any, str]],
+        batch_id: Optional[str],
+        on_submit: Optional[Callable[[Dict[str, Any]], Awaitable[None]]]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Submit (or resume) a batch, wait for it and return its results by custom id."""
+        if batch_id is None:
+            batch_id = await api.submit({
+                custom_id: adapter.build_payload(prompt)
+                for custom_id, (_, _, prompt) in pending.items()
+            })
+            if on_submit is not None:
+                await on_submit({"batch_id": batch_id})
+            logger.info(f"📦 [BATCH SERVICE] Submitted {len(pending)} requests for {model_id} as batch {batch_id}")
+        else:
+            logger.info(f"📦 [BATCH SERVICE] Resuming batch {batch_id} for {model_id}")
+
+        while True:
+            batch = await api.poll(batch_id)
+            if batch is not None:
+                break
+            await asyncio.sleep(settings.llm_batch_poll_interval)
+
+        batch_results = await api.results(batch)
+        logger.info(
+            f"📦 [BATCH SERVICE] Batch {batch_id} finished: "
+            f"{sum(1 for r in batch_results.values() if r is not None)}/{len(pending)} succeeded"
+        )
+        return batch_results
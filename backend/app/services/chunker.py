@@ -0,0 +1,180 @@
+import re
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.data.llm_models import AVAILABLE_LLM_MODELS, LLM_CONFIGS
+from app.services.rate_limiter import estimate_tokens
+
+# Tokens kept free for the instructions wrapped around the file content
+PROMPT_OVERHEAD_TOKENS = 1500
+
+# Lines that start a new element/component/function, by file family
+BOUNDARY_PATTERNS = {
+    "markup": re.compile(r"^\s*<(?![/?])"),
+    "qml": re.compile(r"^\s*(?:[A-Z][\w.]*\s*\{|(?:function|component|signal|property)\s)"),
+    "script": re.compile(
+        r"^\s*(?:export\s|(?:async\s+)?function[\s*]|class\s|(?:const|let|var)\s+\w+\s*=|"
+        r"(?:async\s+)?\w+\s*\([^;]*\)\s*\{\s*$)"
+    ),
+    "css": re.compile(r"^\s*(?:@|[^\s{}/][^{};]*\{\s*$)")
+}
+
+FILE_FAMILIES = {
+    "markup": ("html", "htm", "xml", "svg", "vue", "svelte", "xhtml"),
+    "qml": ("qml",),
+    "script": ("js", "ts", "jsx", "tsx", "javascript", "typescript", "mjs", "cjs"),
+    "css": ("css", "scss", "less")
+}
+
+
+class Chunk:
+    """A window of a file plus the original line number of each of its lines."""
+
+    def __init__(self, content: str, line_numbers: List[int]):
+        self.content = content
+        self.line_numbers = line_numbers
+
+    @property
+    def start_line(self) -> int:
+        return self.line_numbers[0]
+
+    @property
+    def end_line(self) -> int:
+        return self.line_numbers[-1]
+
+    def original_line(self, line_number: Any) -> Any:
+        """Map a 1-based line number within the chunk back to the file."""
+        if isinstance(line_number, str) and line_number.strip().isdigit():
+            line_number = int(line_number)
+        if not isinstance(line_number, int) or isinstance(line_number, bool):
+            return line_number
+        index = min(max(line_number, 1), len(self.line_numbers)) - 1
+        return self.line_numbers[index]
+
+    def local_lines(self) -> Dict[int, int]:
+        """Original line number -> the line number the LLM sees it as."""
+        return {number: index for index, number in enumerate(self.line_numbers, start=1)}
+
+    def window(self, chunk: "Chunk") -> "Chunk":
+        """A chunk of this chunk's content, with its line numbers pointing into the file."""
+        return self.__class__(chunk.content, [self.line_numbers[number - 1] for number in chunk.line_numbers])
+
+
+class LabeledChunk(Chunk):
+    """Derived content (e.g. an accessibility tree) whose lines are labeled "L<n>".
+
+    The labels are the file's own line numbers and the LLM reports them, so
+    no translation is needed; ``line_numbers`` holds each line's label.
+    """
+
+    def original_line(self, line_number: Any) -> Any:
+        if isinstance(line_number, str) and line_number.strip().lstrip("Ll").isdigit():
+            return int(line_number.strip().lstrip("Ll"))
+        return line_number
+
+    def local_lines(self) -> Dict[int, int]:
+        return {number: number for number in range(min(self.line_numbers), max(self.line_numbers) + 1)}
+
+
+def file_family(file_type: str) -> Optional[str]:
+    """Classify a file type (".qml", "text/html", "javascript", ...) for boundary detection."""
+    file_type = (file_type or "").lower().lstrip(".")
+    file_type = file_type.rsplit("/", 1)[-1]
+    for family, names in FILE_FAMILIES.items():
+        if any(file_type == name or file_type.endswith(f"-{name}") or file_type.endswith(f"+{name}") for name in names):
+            return family
+    return None
+
+
+def chunk_token_budget(model_id: str) -> int:
+    """Largest chunk, in estimated tokens, to send to a model.
+
+    The model's context window (``LLMModel.max_tokens``) minus the prompt
+    overhead and the completion budget, capped by ``chunk_max_tokens`` so a
+    chunk's issues still fit in one completion.
+    """
+    config = LLM_CONFIGS.get(model_id, {})
+    output_tokens = config.get(config.get("max_tokens_param", "max_tokens"), config.get("max_tokens", 4000))
+    context = next((model.max_tokens for model in AVAILABLE_LLM_MODELS if model.id == model_id), None)
+    budget = settings.chunk_max_tokens
+    if context:
+        budget = min(budget, context - output_tokens - PROMPT_OVERHEAD_TOKENS)
+    return max(budget, 256)
+
+
+def _split_long_lines(lines: List[str], max_chars: int):
+    """Yield (text, original line number), cutting lines that alone exceed the budget."""
+    for number, line in enumerate(lines, start=1):
+        if len(line) <= max_chars:
+            yield line, number
+            continue
+        # Minified bundles: cut at the last separator before the limit
+        start = 0
+        while start < len(line):
+            end = min(start + max_chars, len(line))
+            if end < len(line):
+                cut = max(line.rfind(sep, start, end) for sep in (">", ";", "}", ","))
+                if cut > start:
+                    end = cut + 1
+            yield line[start:end], number
+            start = end
+
+
+def chunk_content(content: str, file_type: str, max_tokens: int) -> List[Chunk]:
+    """Split content into chunks of at most ``max_tokens`` estimated tokens.
+
+    Cuts are placed before a line that opens an element, component or
+    function, preferring the least indented candidate in the second half of
+    each window, then before a blank line, and only as a last resort
+    wherever the budget runs out.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return [Chunk(content, list(range(1, content.count("\n") + 2)))]
+
+    max_chars = max_tokens * 4
+    pattern = BOUNDARY_PATTERNS.get(file_family(file_type))
+    segments = list(_split_long_lines(content.split("\n"), max_chars))
+
+    chunks = []
+    start = 0
+    while start < len(segments):
+        # Grow the window to the budget
+        end = start
+        size = 0
+        while end < len(segments) and (end == start or size + len(segments[end][0]) + 1 <= max_chars):
+            size += len(segments[end][0]) + 1
+            end += 1
+
+        if end < len(segments):
+            end = _best_cut(segments, start, end, pattern)
+
+        window = segments[start:end]
+        chunks.append(Chunk("\n".join(text for text, _ in window), [number for _, number in window]))
+        start = end
+    return chunks
+
+
+def _best_cut(segments, start: int, end: int, pattern) -> int:
+    """Index to end a window at, somewhere in (start, end]."""
+    earliest = start + max(1, (end - start) // 2)
+    if pattern is not None:
+        best = None
+        best_indent = None
+        for index in range(earliest, end + 1):
+            text = segments[index][0]
+            if pattern.match(text):
+                indent = len(text) - len(text.lstrip())
+                if best_indent is None or indent <= best_indent:
+                    best, best_indent = index, indent
+        if best is not None:
+            return best
+    for index in range(end - 1, earliest - 2, -1):
+        if not segments[index][0].strip():
+            return index + 1
+    return end
+
+
+def remap_issue(issue: Dict[str, Any], chunk: Chunk) -> Dict[str, Any]:
+    """Return the issue with its line number translated to the whole file."""
+    if "line_number" not in issue:
+        return issue
+    return {**issue, "line_number": chunk.original_line(issue["line_number"])}
@@ -0,0 +1,292 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+from app.config import settings
+
+# Error of jobs failed by fail_expired
+LEASE_EXPIRED_ERROR = "Lease expired on final attempt"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue refuses new work (admission control)."""
+
+
+class JobQueue:
+    """Persistent job queue backed by a WAL-mode SQLite file.
+
+    Workers claim a job by taking a time-limited lease and must heartbeat to
+    keep it. A job whose lease expires (worker crashed, deploy killed the
+    process) becomes claimable again, and its per-unit checkpoints let the
+    next attempt skip work that already finished.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.path = path or settings.job_queue_path
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.max_pending = max_pending or settings.job_queue_max_pending
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=30.0, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                heartbeat_at REAL,
+                available_at REAL NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, available_at);
+            CREATE TABLE IF NOT EXISTS job_checkpoints (
+                job_id INTEGER NOT NULL,
+                unit_key TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, unit_key)
+            );
+            """
+        )
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Add a job, refusing it if too many jobs are already waiting or running."""
+        now = time.time()
+        with self._transaction() as conn:
+            active = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if active >= self.max_pending:
+                raise QueueFullError(
+                    f"Analysis queue is full ({active} jobs pending), try again later"
+                )
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, payload, status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (kind, json.dumps(payload), now, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job (queued, or running with an expired lease).
+
+        Jobs whose lease expired on their final attempt are left for
+        ``fail_expired``.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_expires_at < ? AND attempts < ?) "
+                "ORDER BY id LIMIT 1",
+                (now, now, self.max_attempts)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, kind, payload, attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, now, job_id)
+            )
+            return {
+                "id": job_id,
+                "kind": kind,
+                "payload": json.loads(payload),
+                "attempts": attempts + 1
+            }
+
+    def fail_expired(self) -> List[Dict[str, Any]]:
+        """Fail the jobs whose lease expired on their final attempt and return them.
+
+        Their worker died without finishing or failing them, so nothing has
+        marked what they were working on as failed yet; that is up to the
+        caller.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            ).fetchall()
+            for job_id, _, _, _ in rows:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_owner = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    (LEASE_EXPIRED_ERROR, now, job_id)
+                )
+        return [
+            {"id": job_id, "kind": kind, "payload": json.loads(payload), "attempts": attempts}
+            for job_id, kind, payload, attempts in rows
+        ]
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend a lease; returns False if the worker no longer holds it."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (now + self.lease_seconds, now, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str):
+        """Mark a job finished and drop its checkpoints."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (now, job_id, worker_id)
+            )
+            conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id: int, worker_id: str, error: str):
+        """Requeue a failed job with a delay, or fail it for good after max attempts."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ?",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0]
+            if attempts < self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', lease_owner = NULL, error = ?, "
+                    "available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now + settings.job_retry_delay * attempts, now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, error = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+
+    def release(self, job_id: int, worker_id: str):
+        """Give a job back without counting the attempt (e.g. on shutdown)."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), "
+                "lease_owner = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (now, now, job_id, worker_id)
+            )
+
+    def save_checkpoint(self, job_id: int, unit_key: str, result: Any):
+        """Record that one unit of work (e.g. a file/model pair) is done."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (job_id, unit_key, result, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (job_id, unit_key, json.dumps(result), time.time())
+            )
+
+    def load_checkpoints(self, job_id: int) -> Dict[str, Any]:
+        """Return every checkpointed unit of a job."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT unit_key, result FROM job_checkpoints WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+        return {unit_key: json.loads(result) for unit_key, result in rows}
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """Delete completed/failed jobs older than the retention period."""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            finished = [
+                row[0] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                    (cutoff,)
+                )
+            ]
+            for job_id in finished:
+                conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            return len(finished)
+
+    def stats(self) -> Dict[str, int]:
+        """Return job counts by status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+
+class JobCheckpoints:
+    """Checkpoints of one job, loaded once and written through on save.
+
+    ``attempt`` is the job's attempt number (1 for the first run).
+    """
+
+    def __init__(self, queue: JobQueue, job_id: int, attempt: int = 1):
+        self.queue = queue
+        self.job_id = job_id
+        self.attempt = attempt
+        self._done = queue.load_checkpoints(job_id)
+
+    @property
+    def retried(self) -> bool:
+        """Whether an earlier attempt of the job may have written results."""
+        return self.attempt > 1 or bool(self._done)
+
+    def __contains__(self, unit_key: str) -> bool:
+        return unit_key in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def get(self, unit_key: str) -> Any:
+        return self._done.get(unit_key)
+
+    def keys(self) -> List[str]:
+        return list(self._done)
+
+    def save(self, unit_key: str, result: Any):
+        """Write a unit's checkpoint through; blocks on the queue database."""
+        self.queue.save_checkpoint(self.job_id, unit_key, result)
+        self._done[unit_key] = result
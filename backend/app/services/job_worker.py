@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.services.job_queue import LEASE_EXPIRED_ERROR, JobQueue, JobCheckpoints
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Pulls analysis jobs from the JobQueue and runs them.
+
+    ``concurrency`` jobs run at once per worker; several processes (API
+    workers and/or ``run_worker.py``) can share one queue file because jobs
+    are handed out through leases.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        analysis_service,
+        concurrency: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.analysis_service = analysis_service
+        self.concurrency = concurrency if concurrency is not None else settings.job_workers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loops: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the worker loops."""
+        for index in range(self.concurrency):
+            self._loops.append(asyncio.create_task(self._loop(f"{self.worker_id}/{index}")))
+        logger.info(f"👷 [JOB WORKER] Started {self.concurrency} job loops as {self.worker_id}")
+
+    async def stop(self):
+        """Stop the loops; jobs in progress are released back to the queue."""
+        for loop in self._loops:
+            loop.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops.clear()
+        logger.info(f"👷 [JOB WORKER] Stopped {self.worker_id}")
+
+    async def _loop(self, lease_owner: str):
+        idle_polls = 0
+        while True:
+            try:
+                for expired in await asyncio.to_thread(self.queue.fail_expired):
+                    await self._fail_abandoned(expired)
+                job = await asyncio.to_thread(self.queue.claim, lease_owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"💥 [JOB WORKER] Failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                idle_polls += 1
+                if idle_polls % 600 == 0:
+                    await asyncio.to_thread(self.queue.purge_finished, settings.job_retention_seconds)
+                await asyncio.sleep(settings.job_poll_interval)
+                continue
+
+            idle_polls = 0
+            await self._run_job(job, lease_owner)
+
+    async def _run_job(self, job: Dict[str, Any], lease_owner: str):
+        job_id = job["id"]
+        logger.info(f"📥 [JOB WORKER] Running job {job_id} ({job['kind']}, attempt {job['attempts']})")
+
+        lease_lost = asyncio.Event()
+        task = asyncio.create_task(self._dispatch(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, lease_owner, task, lease_lost))
+        try:
+            await task
+        except asyncio.CancelledError:
+            if lease_lost.is_set():
+                logger.warning(f"⚠️ [JOB WORKER] Job {job_id} cancelled after losing its lease")
+                return
+            # Worker is shutting down: hand the job to someone else
+            task.cancel()
+            await asyncio.to_thread(self.queue.release, job_id, lease_owner)
+            logger.info(f"↩️ [JOB WORKER] Released job {job_id}")
+            raise
+        except Exception as e:
+            logger.error(f"💥 [JOB WORKER] Job {job_id} failed: {e}")
+            await asyncio.to_thread(self.queue.fail, job_id, lease_owner, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self.queue.complete, job_id, lease_owner)
+        logger.info(f"✅ [JOB WORKER] Job {job_id} completed")
+
+    async def _heartbeat(
+        self,
+        job_id: int,
+        lease_owner: str,
+        task: asyncio.Task,
+        lease_lost: asyncio.Event
+    ):
+        """Renew the lease until the job ends; cancel the job if the lease is lost."""
+        interval = self.queue.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, lease_owner):
+                lease_lost.set()
+                task.cancel()
+                return
+
+    async def _fail_abandoned(self, job: Dict[str, Any]):
+        """Mark the session of a job whose final attempt died (see JobQueue.fail_expired) as failed."""
+        logger.error(f"💥 [JOB WORKER] Job {job['id']} failed: {LEASE_EXPIRED_ERROR}")
+        payload = job["payload"]
+        if job["kind"] == "analysis_simple":
+            await asyncio.to_thread(
+                self.analysis_service.progress_store.update,
+                payload["session_id"], status="failed", error=LEASE_EXPIRED_ERROR
+            )
+        elif job["kind"] == "analysis_session":
+            await asyncio.to_thread(self.analysis_service.mark_session_failed, payload["session_id"])
+
+    async def _dispatch(self, job: Dict[str, Any]):
+        payload = job["payload"]
+        checkpoints = await asyncio.to_thread(JobCheckpoints, self.queue, job["id"], job["attempts"])
+        if len(checkpoints):
+            logger.info(f"🔁 [JOB WORKER] Resuming job {job['id']} with {len(checkpoints)} checkpointed units")
+
+        if job["kind"] == "analysis_simple":
+            await self.analysis_service.start_analysis_simple(
+                payload["session_id"],
+                payload["files"],
+                payload["models"],
+                payload["user_id"],
+                incremental=payload.get("incremental", False),
+                checkpoints=checkpoints,
+                budget_usd=payload.get("budget_usd")
+            )
+        elif job["kind"] == "analysis_session":
+            await self.analysis_service.start_analysis(
+                payload["session_id"],
+                payload["file_ids"],
+                payload["llm_models"],
+                incremental=payload.get("incremental", False),
+                batch=payload.get("batch", False),
+                checkpoints=checkpoints,
+                budget_usd=payload.get("budget_usd")
+            )
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
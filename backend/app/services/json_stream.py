@@ -0,0 +1,82 @@
+import json
+import logging
+from typing import List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONArrayParser:
+    """Yields the objects of a JSON array while the array is still arriving.
+
+    Text is fed in arbitrary pieces (e.g. streamed completion deltas). Each
+    top-level ``{...}`` element of the first ``[`` array is decoded as soon as
+    its closing brace arrives. Anything before the array, such as a markdown
+    code fence, is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self._started = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume more text and return the objects completed by it."""
+        if self.done or not text:
+            return []
+
+        self._buffer += text
+        objects = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._depth == 1 and char == "{":
+                    self._object_start = pos
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1 and char == "}" and self._object_start is not None:
+                    item = self._decode(buffer[self._object_start:pos + 1])
+                    if item is not None:
+                        objects.append(item)
+                    self._object_start = None
+                elif self._depth == 0:
+                    self.done = True
+                    break
+            pos += 1
+
+        # Drop consumed text, keeping any partial element
+        keep_from = self._object_start if self._object_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        self._pos = pos - keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+        return objects
+
+    @staticmethod
+    def _decode(text: str):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ [JSON STREAM] Skipping malformed array element: {e}")
+            return None
+        return item if isinstance(item, dict) else None
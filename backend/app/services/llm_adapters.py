@@ -0,0 +1,228 @@
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Tuple, Type
+from app.services.llm_streaming import (
+    AnthropicStreamDecoder,
+    GeminiStreamDecoder,
+    OpenAIStreamDecoder,
+    StreamDecoder
+)
+
+
+class ProviderAdapter(ABC):
+    """Builds requests for one model and reads its responses.
+
+    Headers, URLs and the payload template (including the static system
+    prompt) are computed once per model, so a request only adds the per-file
+    prompt. Subclasses implement one wire format each and are picked through
+    the ``api_format`` entry of the model's config. With ``"prompt_cache":
+    True`` in the config, the adapter enables the provider's prompt caching
+    for the system prompt.
+    """
+
+    decoder_class: Type[StreamDecoder]
+
+    def __init__(self, config: Dict[str, Any], api_key: str = "", system_prompt: str = ""):
+        self.config = config
+        self.api_key = api_key
+        self.system_prompt = system_prompt
+        self.prompt_cache = bool(config.get("prompt_cache"))
+        self.requires_api_key = bool(config.get("api_key_setting"))
+        self.headers = {
+            name: value.format(api_key=api_key)
+            for name, value in config.get("headers", {}).items()
+        }
+        self.url = config["api_endpoint"]
+        self.stream_url = self.url
+        self.payload_template = self._payload_template()
+
+    @abstractmethod
+    def _payload_template(self) -> Dict[str, Any]:
+        """The parts of the payload shared by every request (model, system prompt)."""
+
+    @abstractmethod
+    def build_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """Return the JSON payload for a prompt, based on the payload template."""
+
+    def build_request(self, prompt: str, stream: bool = False) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Return the URL, headers and JSON payload for a prompt."""
+        url = self.stream_url if stream else self.url
+        return url, self.headers, self.build_payload(prompt, stream)
+
+    @abstractmethod
+    def extract_text(self, response: Dict[str, Any]) -> str:
+        """Return the completion text of a (non-streaming shaped) response."""
+
+    @abstractmethod
+    def extract_usage(self, response: Dict[str, Any]) -> Dict[str, int]:
+        """Return the token usage reported by the provider.
+
+        ``input_tokens`` counts the whole prompt, ``cached_input_tokens`` the
+        part of it served from the provider's prompt cache and the optional
+        ``cache_write_tokens`` the part written to it.
+        """
+
+    def stream_decoder(self) -> StreamDecoder:
+        return self.decoder_class()
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """Chat completions API (OpenAI, xAI, Groq, DeepSeek, vLLM, Ollama, ...)."""
+
+    decoder_class = OpenAIStreamDecoder
+
+    def _payload_template(self):
+        config = self.config
+        template = {"model": config["model_name"]}
+        # Newer OpenAI models take max_completion_tokens instead of max_tokens
+        max_tokens_param = config.get("max_tokens_param", "max_tokens")
+        template[max_tokens_param] = config.get(max_tokens_param, config.get("max_tokens", 4000))
+        if "temperature" in config:
+            template["temperature"] = config["temperature"]
+        if self.prompt_cache:
+            # Caching is automatic for long prefixes; the key routes requests
+            # sharing the system prompt to the same cache
+            digest = hashlib.sha256(self.system_prompt.encode("utf-8")).hexdigest()[:16]
+            template["prompt_cache_key"] = f"a11y-{digest}"
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        return template
+
+    def build_payload(self, prompt, stream=False):
+        payload = {
+            **self.payload_template,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if stream:
+            payload["stream"] = True
+            if self.config.get("stream_usage"):
+                payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def extract_text(self, response):
+        return response["choices"][0]["message"]["content"]
+
+    def extract_usage(self, response):
+        usage = response.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return {
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+            # DeepSeek reports cache hits under its own field
+            "cached_input_tokens": details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens", 0)
+        }
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Anthropic Messages API."""
+
+    decoder_class = AnthropicStreamDecoder
+
+    def _payload_template(self):
+        system_block = {"type": "text", "text": self.system_prompt}
+        if self.prompt_cache:
+            system_block["cache_control"] = {"type": "ephemeral"}
+        return {
+            "model": self.config["model_name"],
+            "max_tokens": self.config.get("max_tokens", 4000),
+            "temperature": self.config.get("temperature", 0.1),
+            "system": [system_block]
+        }
+
+    def build_payload(self, prompt, stream=False):
+        payload = {
+            **self.payload_template,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def extract_text(self, response):
+        return response["content"][0]["text"]
+
+    def extract_usage(self, response):
+        usage = response.get("usage") or {}
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        # Anthropic's input_tokens excludes tokens read from or written to the cache
+        return {
+            "input_tokens": (usage.get("input_tokens") or 0) + cache_read + cache_write,
+            "output_tokens": usage.get("output_tokens", 0),
+            "cached_input_tokens": cache_read,
+            "cache_write_tokens": cache_write
+        }
+
+
+class GoogleAdapter(ProviderAdapter):
+    """Gemini generateContent API; the key goes in the query string.
+
+    Gemini 2.5 caches repeated prefixes implicitly, so the system prompt is
+    sent as ``systemInstruction`` ahead of the per-file content.
+    """
+
+    decoder_class = GeminiStreamDecoder
+
+    def __init__(self, config, api_key="", system_prompt=""):
+        super().__init__(config, api_key, system_prompt)
+        endpoint = config["api_endpoint"]
+        stream_endpoint = endpoint.replace(":generateContent", ":streamGenerateContent")
+        self.url = f"{endpoint}?key={api_key}"
+        self.stream_url = f"{stream_endpoint}?alt=sse&key={api_key}"
+
+    def _payload_template(self):
+        return {
+            "systemInstruction": {"parts": [{"text": self.system_prompt}]},
+            "generationConfig": {
+                "temperature": self.config.get("temperature", 0.1),
+                "maxOutputTokens": self.config.get("max_tokens", 4000)
+            }
+        }
+
+    def build_payload(self, prompt, stream=False):
+        return {
+            **self.payload_template,
+            "contents": [
+                {
+                    "parts": [
+                        {"text": prompt}
+                    ]
+                }
+            ]
+        }
+
+    def extract_text(self, response):
+        return response["candidates"][0]["content"]["parts"][0]["text"]
+
+    def extract_usage(self, response):
+        usage = response.get("usageMetadata") or {}
+        return {
+            "input_tokens": usage.get("promptTokenCount", 0),
+            "output_tokens": usage.get("candidatesTokenCount", 0),
+            "cached_input_tokens": usage.get("cachedContentTokenCount", 0)
+        }
+
+
+# Wire formats by the "api_format" value used in LLM_CONFIGS
+ADAPTERS: Dict[str, Type[ProviderAdapter]] = {
+    "openai": OpenAICompatibleAdapter,
+    "anthropic": AnthropicAdapter,
+    "google": GoogleAdapter
+}
+
+
+def create_adapter(
+    config: Dict[str, Any],
+    api_key: Optional[str] = None,
+    system_prompt: str = ""
+) -> ProviderAdapter:
+    """Build the adapter for a model config (``api_format`` defaults to "openai")."""
+    api_format = config.get("api_format", "openai")
+    adapter_class = ADAPTERS.get(api_format)
+    if adapter_class is None:
+        raise ValueError(f"Unsupported API format: {api_format}")
+    return adapter_class(config, api_key or "", system_prompt)
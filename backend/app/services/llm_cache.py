@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.config import settings
+
+
+def make_cache_key(model_id: str, model_name: str, prompt: str) -> str:
+    """Build a content-addressed cache key for an LLM request."""
+    digest = hashlib.sha256()
+    for part in (model_id, model_name, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier (in-memory LRU + SQLite) cache for raw LLM responses."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        memory_entries: Optional[int] = None,
+        max_disk_entries: Optional[int] = None
+    ):
+        self.path = path or settings.llm_cache_path
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.llm_cache_ttl
+        self.memory_entries = memory_entries if memory_entries is not None else settings.llm_cache_memory_entries
+        self.max_disk_entries = max_disk_entries if max_disk_entries is not None else settings.llm_cache_max_disk_entries
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the on-disk tier lazily."""
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_response_cache_accessed "
+                "ON llm_response_cache (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, response: Dict[str, Any], created_at: float):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+
+            response_text, created_at = row
+            if self._expired(created_at, now):
+                conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                conn.commit()
+                self.counters["misses"] += 1
+                return None
+
+            conn.execute(
+                "UPDATE llm_response_cache SET accessed_at = ? WHERE key = ?",
+                (now, key)
+            )
+            conn.commit()
+            response = json.loads(response_text)
+            self._remember(key, response, created_at)
+            self.counters["disk_hits"] += 1
+            return response
+
+    def set(self, key: str, response: Dict[str, Any]):
+        """Store a response in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now)
+            )
+            self.counters["stores"] += 1
+            self._evict_disk(conn, now)
+            conn.commit()
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows and trim the disk tier to its size limit."""
+        if self.ttl_seconds > 0:
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+        count = conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE key IN ("
+                "SELECT key FROM llm_response_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+            self.counters["disk_evictions"] += overflow
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_response_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            disk_entries = self._connection().execute(
+                "SELECT COUNT(*) FROM llm_response_cache"
+            ).fetchone()[0]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
+
+    def close(self):
+        """Close the on-disk tier."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httpx
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that carry credentials (Gemini passes the API key as ?key=)
+SECRET_PARAMS = {"key", "api_key"}
+
+# Response headers worth replaying; the body is stored decoded
+KEPT_HEADERS = {"content-type", "retry-after"}
+
+
+def redact_url(url: str) -> str:
+    """Drop credential query parameters from a URL."""
+    parts = urlsplit(str(url))
+    query = [(name, value) for name, value in parse_qsl(parts.query) if name not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def request_key(method: str, url: str, body: bytes) -> str:
+    """Match key of a provider request: method, path, redacted query and canonical JSON body.
+
+    The host is left out so recordings of a real provider also match the
+    same request sent to mock_llm_server.py.
+    """
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = body.decode("utf-8", errors="replace")
+    parts = urlsplit(redact_url(url))
+    digest = hashlib.sha256()
+    for part in (method.upper(), parts.path, parts.query, canonical):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Cassette:
+    """JSONL file of recorded provider request/response pairs.
+
+    Each line holds the request (redacted URL and JSON body), its match key,
+    the response status, kept headers and body text, and the time the
+    provider took. Streaming responses are stored as their raw SSE text.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._replayed: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float):
+        try:
+            request_body = json.loads(request.content)
+        except ValueError:
+            request_body = request.content.decode("utf-8", errors="replace")
+        entry = {
+            "key": request_key(request.method, str(request.url), request.content),
+            "request": {
+                "method": request.method,
+                "url": redact_url(str(request.url)),
+                "body": request_body
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": {
+                    name: value for name, value in response.headers.items()
+                    if name.lower() in KEPT_HEADERS
+                },
+                "body": body.decode("utf-8", errors="replace")
+            },
+            "elapsed": round(elapsed, 3),
+            "recorded_at": time.time()
+        }
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def find(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the next recorded entry for a key; repeats cycle through the recordings."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            return entries[index % len(entries)]
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests to the real transport and appends every exchange to a cassette."""
+
+    def __init__(self, cassette: Cassette, transport: httpx.AsyncBaseTransport):
+        self.cassette = cassette
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        self.cassette.record(request, response, body, time.monotonic() - started)
+        # The body is already decoded, so encoding/length headers no longer apply
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers requests from a cassette without touching the network.
+
+    Requests with no recording get a 404, which LLMService does not retry.
+    """
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        entry = self.cassette.find(request_key(request.method, str(request.url), request.content))
+        if entry is None:
+            self.misses += 1
+            logger.warning(f"📼 [LLM RECORDER] No recording for {request.method} {redact_url(str(request.url))}")
+            return httpx.Response(
+                404,
+                json={"error": {"message": "No cassette recording matches this request"}},
+                request=request
+            )
+        recorded = entry["response"]
+        return httpx.Response(
+            recorded["status_code"],
+            headers=recorded["headers"],
+            content=recorded["body"].encode("utf-8"),
+            request=request
+        )
+
+
+_cassettes: Dict[str, Cassette] = {}
+
+
+def cassette_transport(transport_factory) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for ``llm_cassette_mode`` ("record" or "replay"), or None when off.
+
+    ``transport_factory`` builds the real transport wrapped while recording.
+    All clients share one Cassette per path.
+    """
+    mode = settings.llm_cassette_mode.lower()
+    if not mode:
+        return None
+    cassette = _cassettes.get(settings.llm_cassette_path)
+    if cassette is None:
+        cassette = Cassette(settings.llm_cassette_path)
+        _cassettes[settings.llm_cassette_path] = cassette
+    if mode == "record":
+        return RecordingTransport(cassette, transport_factory())
+    if mode == "replay":
+        return ReplayTransport(cassette)
+    raise ValueError(f"Unknown LLM cassette mode: {settings.llm_cassette_mode}")
@@ -1,66 +1,42 @@
+import asyncio
 import httpx
 import json
-from typing import Dict, List, Any, Optional
+import logging
+from contextlib import nullcontext
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from app.config import settings
 from app.data.llm_models import LLM_CONFIGS
+from app.analyzers.engine import prompt_note
+from app.services.chunker import Chunk, chunk_content, chunk_token_budget, remap_issue
+from app.services.json_stream import IncrementalJSONArrayParser
+from app.services.llm_adapters import ProviderAdapter, create_adapter
+from app.services.llm_cache import LLMResponseCache, make_cache_key
+from app.services.llm_recorder import cassette_transport
+from app.services.llm_streaming import StreamDecoder
+from app.services.packing import PackDemultiplexer, create_packed_prompt
+from app.services.preprocessor import preprocess
+from app.services.a11y_tree import build_tree, tree_mode
+from app.services.token_budget import current_budget, estimate_call_cost
+from app.services.rate_limiter import (
+    ProviderRateLimiter,
+    backoff_delay,
+    estimate_tokens,
+    parse_retry_after
+)
 
-class LLMService:
-    def __init__(self):
-        self.api_keys = {
-            "gpt-5": settings.openai_api_key,
-            "claude-opus-4": settings.anthropic_api_key,
-            "gemini-2.5-pro": settings.google_api_key,
-            "grok-4": settings.groq_api_key,
-            "llama-4": settings.huggingface_api_key,  # Using Hugging Face for Llama
-            "deepseek-v3.1": settings.deepseek_api_key
-        }
-    
-    async def analyze_accessibility(
-        self, 
-        model_id: str, 
-        content: str, 
-        file_type: str,
-        filename: str
-    ) -> Dict[str, Any]:
-        """Analyze content for accessibility issues using the specified LLM."""
-        if model_id not in LLM_CONFIGS:
-            raise ValueError(f"Unsupported model: {model_id}")
-        
-        config = LLM_CONFIGS[model_id]
-        api_key = self.api_keys.get(model_id)
-        
-        if not api_key:
-            raise ValueError(f"API key not configured for model: {model_id}")
-        
-        # Prepare the prompt
-        prompt = self._create_accessibility_prompt(content, file_type, filename)
-        
-        # Make API call based on model
-        if model_id == "gpt-5":
-            return await self._call_openai(config, api_key, prompt)
-        elif model_id == "claude-opus-4":
-            return await self._call_anthropic(config, api_key, prompt)
-        elif model_id == "gemini-2.5-pro":
-            return await self._call_google(config, api_key, prompt)
-        elif model_id == "grok-4":
-            return await self._call_grok(config, api_key, prompt)
-        elif model_id == "llama-4":
-            return await self._call_groq_llama(config, api_key, prompt)
-        elif model_id == "deepseek-v3.1":
-            return await self._call_deepseek(config, api_key, prompt)
-        else:
-            raise ValueError(f"Unsupported model: {model_id}")
-    
-    def _create_accessibility_prompt(self, content: str, file_type: str, filename: str) -> str:
-        """Create a comprehensive accessibility analysis prompt."""
-        return f"""
-You are an expert accessibility analyst specializing in WCAG 2.2 compliance for infotainment systems. Analyze the following {file_type} file for accessibility issues.
+logger = logging.getLogger(__name__)
 
-File: {filename}
-Content:
-{content}
+# Bump whenever the analysis prompt changes so incremental runs do not reuse
+# results produced by an older prompt.
+PROMPT_VERSION = "4"
 
-Please analyze this content for accessibility issues according to WCAG 2.2 guidelines. For each issue found, provide:
+# Static instructions sent ahead of every file as the system prompt. Keeping
+# them byte-identical and first lets provider-side prompt caches reuse them;
+# providers only cache prefixes above a minimum size (~1024 tokens), so any
+# further static guidance belongs here rather than in the per-file prompt.
+ANALYSIS_INSTRUCTIONS = """You are an expert accessibility analyst specializing in WCAG 2.2 compliance for infotainment systems. You analyze one file at a time for accessibility issues and always respond with valid JSON.
+
+For each issue found, provide:
 
 1. WCAG Guideline ID (e.g., "1.4.3 Contrast (Minimum)")
 2. POUR Principle (Perceivable, Operable, Understandable, or Robust)
@@ -88,7 +64,7 @@ Return your analysis as a JSON array of issues. If no issues are found, return a
 
 Example format:
 [
-  {{
+  {
     "wcag_guideline": "1.4.3 Contrast (Minimum)",
     "pour_principle": "perceivable",
     "severity": "high",
@@ -98,218 +74,600 @@ Example format:
     "code_snippet": "color: #999999;",
     "suggestion": "Use a darker color such as #666666 or #333333 to achieve at least 4.5:1 contrast ratio.",
     "confidence_score": 0.95
-  }}
+  }
 ]
 
-Provide only the JSON array, no additional text.
-"""
+Provide only the JSON array, no additional text."""
+
+# HTTP/2 support in httpx needs the optional ``h2`` package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Responses worth retrying: timeouts, rate limits and server-side failures
+# (529 is Anthropic's "overloaded")
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class LLMService:
+    def __init__(self, scheduler=None):
+        # Optional AnalysisScheduler bounding concurrent provider calls
+        self.scheduler = scheduler
+        # Request builders/response readers per model, built on first use
+        self._adapters: Dict[str, ProviderAdapter] = {}
+        # One long-lived client per provider so connections are kept alive
+        # and reused across files and models instead of re-handshaking.
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limiters: Dict[str, ProviderRateLimiter] = {}
+        # Token usage reported by providers, per model
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self.cache = LLMResponseCache() if settings.llm_cache_enabled else None
+    
+    async def open_clients(self):
+        """Create the pooled HTTP client for every configured provider."""
+        for config in LLM_CONFIGS.values():
+            self._get_client(config)
+        logger.info(f"🔌 [LLM SERVICE] Opened HTTP clients for providers: {sorted(self._clients)}")
     
-    async def _call_openai(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call OpenAI API."""
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    async def close_clients(self):
+        """Close all pooled HTTP clients."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+        if self.cache is not None:
+            self.cache.close()
+        logger.info("🔌 [LLM SERVICE] Closed HTTP clients")
+    
+    def _get_client(self, config: Dict) -> httpx.AsyncClient:
+        """Return the pooled client for a provider, creating it on first use."""
+        provider = config["provider"]
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            http2 = settings.llm_http2 and HTTP2_AVAILABLE
+            limits = httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry
+            )
+            # Cassette recording/replay swaps in its own transport
+            transport = cassette_transport(
+                lambda: httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+            )
+            client = httpx.AsyncClient(
+                http2=http2,
+                limits=limits,
+                transport=transport,
+                timeout=httpx.Timeout(
+                    settings.llm_request_timeout,
+                    connect=settings.llm_connect_timeout
+                )
+            )
+            self._clients[provider] = client
+        return client
+    
+    def _get_adapter(self, model_id: str) -> ProviderAdapter:
+        """Return the adapter of a model, creating it on first use."""
+        adapter = self._adapters.get(model_id)
+        if adapter is None:
+            if model_id not in LLM_CONFIGS:
+                raise ValueError(f"Unsupported model: {model_id}")
+            config = LLM_CONFIGS[model_id]
+            key_setting = config.get("api_key_setting")
+            api_key = getattr(settings, key_setting, "") if key_setting else ""
+            adapter = create_adapter(config, api_key, ANALYSIS_INSTRUCTIONS)
+            self._adapters[model_id] = adapter
+        return adapter
+    
+    def _get_limiter(self, config: Dict) -> ProviderRateLimiter:
+        """Return the rate limiter for a provider, creating it on first use."""
+        provider = config["provider"]
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            if settings.llm_rate_limits_enabled:
+                limiter = ProviderRateLimiter(
+                    config.get("requests_per_minute"),
+                    config.get("tokens_per_minute")
+                )
+            else:
+                limiter = ProviderRateLimiter()
+            self._limiters[provider] = limiter
+        return limiter
+    
+    async def _send(
+        self,
+        config: Dict,
+        url: str,
+        headers: Dict,
+        payload: Dict,
+        stream: bool = False
+    ) -> httpx.Response:
+        """POST a request through the provider's pooled client.
         
-        payload = {
-            "model": config["model_name"],
-            "messages": [
-                {"role": "system", "content": "You are an expert accessibility analyst. Always respond with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_completion_tokens": config.get("max_completion_tokens", config.get("max_tokens", 4000))
-        }
+        Calls wait for the provider's request/token budget. Timeouts,
+        connection errors, 429s and 5xx responses are retried with
+        exponential backoff, waiting for Retry-After when the provider sends
+        it. Once the provider's circuit opens, calls wait until it resets and
+        then behind the single probe call, so the provider is paused rather
+        than its pending calls dropped. The scheduler slot is given up while
+        waiting for the circuit, budget or a retry, so the wait does not
+        hold back calls to other providers.
         
-        # Add temperature only if it exists in config
-        if "temperature" in config:
-            payload["temperature"] = config["temperature"]
+        With ``stream`` the body is left unread and the caller must close the
+        response. Only the request itself is retried, never a half-read stream.
+        """
+        client = self._get_client(config)
+        limiter = self._get_limiter(config)
+        provider = config["provider"]
+        tokens = estimate_tokens(json.dumps(payload))
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config["api_endpoint"],
-                headers=headers,
-                json=payload,
-                timeout=60.0
+        for attempt in range(settings.llm_max_retries + 1):
+            retry_after = None
+            admitted = False
+            try:
+                async with self._slot_released():
+                    await limiter.breaker.wait()
+                    admitted = True
+                    await limiter.acquire(tokens)
+                try:
+                    request = client.build_request("POST", url, headers=headers, json=payload)
+                    response = await client.send(request, stream=stream)
+                except httpx.TransportError as e:
+                    error: Exception = e
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        # Other 4xx are our fault, not the provider's health
+                        if response.is_success:
+                            limiter.breaker.record_success()
+                            return response
+                        if stream:
+                            await response.aclose()
+                        response.raise_for_status()
+                    
+                    if stream:
+                        await response.aclose()
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    if response.status_code == 429:
+                        limiter.throttled += 1
+                        if retry_after is not None:
+                            # The whole provider is throttled, not just this call
+                            limiter.pause(retry_after)
+                    error = httpx.HTTPStatusError(
+                        f"{response.status_code} from {provider}",
+                        request=response.request,
+                        response=response
+                    )
+                
+                # Throttling is handled by the rate limiter, not the breaker
+                if not (isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429):
+                    limiter.breaker.record_failure()
+            finally:
+                # However the call ended (cancelled, an invalid URL, a 4xx),
+                # a half-open circuit must not keep waiting for this probe
+                if admitted:
+                    limiter.breaker.record_neutral()
+            if attempt == settings.llm_max_retries:
+                raise error
+            
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            limiter.retries += 1
+            logger.warning(
+                f"🔁 [LLM SERVICE] {provider} call failed ({error}), "
+                f"retry {attempt + 1}/{settings.llm_max_retries} in {delay:.1f}s"
             )
-            response.raise_for_status()
-            return response.json()
+            async with self._slot_released():
+                await asyncio.sleep(delay)
     
-    async def _call_anthropic(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call Anthropic API."""
-        headers = {
-            "x-api-key": api_key,
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        
-        payload = {
-            "model": config["model_name"],
-            "max_tokens": config.get("max_tokens", 4000),
-            "temperature": config.get("temperature", 0.1),
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
+    def _slot_released(self):
+        """Context giving up this task's scheduler slot while it waits (see AnalysisScheduler.released)."""
+        return self.scheduler.released() if self.scheduler is not None else nullcontext()
+    
+    async def _post(self, config: Dict, url: str, headers: Dict, payload: Dict) -> Dict[str, Any]:
+        """POST a request and return the decoded JSON body."""
+        response = await self._send(config, url, headers, payload)
+        return response.json()
+    
+    async def _post_stream(
+        self,
+        config: Dict,
+        url: str,
+        headers: Dict,
+        payload: Dict,
+        decoder: StreamDecoder,
+        on_text: Callable[[str], None]
+    ) -> Dict[str, Any]:
+        """POST a streaming request, passing each text delta to ``on_text``.
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config["api_endpoint"],
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            return response.json()
+        Returns the assembled response in the provider's non-streaming shape.
+        """
+        response = await self._send(config, url, headers, payload, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                if not data:
+                    continue
+                delta = decoder.feed(json.loads(data))
+                if delta:
+                    on_text(delta)
+        finally:
+            await response.aclose()
+        return decoder.response()
     
-    async def _call_google(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call Google Gemini API."""
-        headers = {
-            "Content-Type": "application/json"
-        }
+    async def analyze_file(
+        self,
+        model_id: str,
+        content: str,
+        file_type: str,
+        filename: str,
+        on_issue: Optional[Callable[[Dict[str, Any]], None]] = None,
+        static_issues: Optional[List[Dict[str, Any]]] = None,
+        style_summary: Optional[List[Tuple[int, str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Analyze a file and return the parsed issues.
+        
+        With ``on_issue`` the completion is streamed (if ``llm_streaming`` is
+        on) and every issue is handed to the callback as soon as its JSON
+        object is complete; issues that could only be recovered from the full
+        text, or came from the cache, are handed over at the end.
         
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": config.get("temperature", 0.1),
-                "maxOutputTokens": config.get("max_tokens", 4000)
-            }
-        }
+        Content is preprocessed (comments, data URIs, minified code
+        stripped), or replaced by its accessibility tree in "tree" prompt
+        mode, and files over the model's chunk budget are split along
+        element, component or function boundaries and the chunks analyzed
+        concurrently; line numbers are mapped back to the original file.
         
-        url = f"{config['api_endpoint']}?key={api_key}"
+        ``static_issues`` (from the local rules) narrow the prompt so the
+        model does not repeat them; ``style_summary`` adds the computed styles
+        of a markup file's elements.
+        """
+        parts = self._file_parts(model_id, content, file_type, filename)
+        if len(parts) == 1:
+            chunk = parts[0][0]
+            return await self._analyze_chunk(
+                model_id, chunk.content if chunk is not None else content, file_type, filename, chunk, on_issue,
+                prompt_note(file_type, static_issues, chunk, style_summary, content)
+            )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=60.0
+        logger.info(f"✂️ [LLM SERVICE] Split {filename} into {len(parts)} chunks for {model_id}")
+        tasks = [
+            asyncio.create_task(
+                self._analyze_chunk(
+                    model_id, chunk.content, file_type, part_name, chunk, on_issue,
+                    prompt_note(file_type, static_issues, chunk, style_summary, content)
+                )
             )
-            response.raise_for_status()
-            return response.json()
+            for chunk, part_name in parts
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return [issue for chunk_issues in results for issue in chunk_issues]
     
-    async def _call_grok(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call Grok API."""
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    async def analyze_packed(
+        self,
+        model_id: str,
+        files: List[Dict[str, Any]]
+    ) -> Dict[Any, List[Dict[str, Any]]]:
+        """Analyze several small files (dicts with key, content, file_type, filename) in one prompt.
         
-        payload = {
-            "model": config["model_name"],
-            "messages": [
-                {"role": "system", "content": "You are an expert accessibility analyst. Always respond with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": config.get("max_tokens", 4000),
-            "temperature": config.get("temperature", 0.1)
-        }
+        Files may carry "static_issues" and "style_summary" for the prompt as
+        in analyze_file.
+        Issues are routed back to their files through the required "file"
+        field and returned per file key; issues naming no known file are
+        dropped. Not streamed, so a failed call leaves nothing to undo and
+        the files can simply be analyzed one by one instead.
+        """
+        demux = PackDemultiplexer(files)
+        issues_by_file: Dict[Any, List[Dict[str, Any]]] = {file_data["key"]: [] for file_data in files}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config["api_endpoint"],
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            return response.json()
+        label = f"{len(files)} packed files"
+        prompt, line_maps = self.prepare_packed_prompt(files)
+        response = await self._complete(model_id, prompt, label)
+        unrouted = 0
+        for issue in self.parse_llm_response(response, model_id):
+            key = demux.file_key(issue)
+            if key is None:
+                unrouted += 1
+                continue
+            issue = demux.strip(issue)
+            if line_maps.get(key) is not None:
+                issue = remap_issue(issue, line_maps[key])
+            issues_by_file[key].append(issue)
+        if unrouted:
+            logger.warning(f"⚠️ [LLM SERVICE] {model_id} returned {unrouted} issues for unknown files in {label}")
+        return issues_by_file
+    
+    def prepare_packed_prompt(
+        self,
+        files: List[Dict[str, Any]]
+    ) -> Tuple[str, Dict[Any, Optional[Chunk]]]:
+        """Build the prompt analyze_packed would send and each file's line map (None if unchanged)."""
+        line_maps = {file_data["key"]: self._reduce(file_data["content"], file_data["file_type"]) for file_data in files}
+        prepared = []
+        for file_data in files:
+            line_map = line_maps[file_data["key"]]
+            prepared.append({
+                **file_data,
+                "content": line_map.content if line_map is not None else file_data["content"],
+                "note": prompt_note(
+                    file_data["file_type"], file_data.get("static_issues"), line_map,
+                    file_data.get("style_summary"), file_data["content"]
+                )
+            })
+        return create_packed_prompt(prepared), line_maps
+    
+    def _file_parts(
+        self,
+        model_id: str,
+        content: str,
+        file_type: str,
+        filename: str
+    ) -> List[Tuple[Optional[Chunk], str]]:
+        """Preprocess and split a file for a model.
+        
+        Returns (chunk, name) pairs; chunk is None if the whole file is sent
+        unchanged, otherwise its line numbers point into the original file.
+        """
+        reduced = self._reduce(content, file_type)
+        if reduced is not None:
+            saved = estimate_tokens(content) - estimate_tokens(reduced.content)
+            logger.debug(f"🧹 [LLM SERVICE] Preprocessing saved ~{saved} tokens of {filename}")
+            content = reduced.content
+        chunks = chunk_content(content, file_type, chunk_token_budget(model_id))
+        if reduced is not None:
+            # Chunk line numbers point into the reduced content; map them through
+            chunks = [reduced.window(chunk) for chunk in chunks]
+        if len(chunks) == 1:
+            return [(chunks[0] if reduced is not None else None, filename)]
+        return [
+            (chunk, f"{filename} (part {index} of {len(chunks)})")
+            for index, chunk in enumerate(chunks, start=1)
+        ]
     
-    async def _call_groq_llama(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call Groq API for Llama model."""
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    def _reduce(self, content: str, file_type: str) -> Optional[Chunk]:
+        """What to prompt with instead of the raw file (None to send it as is).
         
-        payload = {
-            "model": config["model_name"],
-            "messages": [
-                {"role": "system", "content": "You are an expert accessibility analyst. Always respond with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": config.get("max_tokens", 4000),
-            "temperature": config.get("temperature", 0.1)
-        }
+        In "tree" prompt mode the accessibility tree, for the file types it
+        supports and unless it is no smaller than the source (plain content
+        markup); otherwise the preprocessed content.
+        """
+        reduced = preprocess(content, file_type)
+        if tree_mode():
+            tree = build_tree(content, file_type)
+            source = reduced.content if reduced is not None else content
+            if tree is not None and len(tree.content) < len(source):
+                return tree
+        return reduced
+    
+    def prepare_prompts(
+        self,
+        model_id: str,
+        content: str,
+        file_type: str,
+        filename: str,
+        static_issues: Optional[List[Dict[str, Any]]] = None,
+        style_summary: Optional[List[Tuple[int, str]]] = None
+    ) -> List[Tuple[Optional[Chunk], str]]:
+        """Build the per-file prompts analyze_file would send, one per chunk."""
+        return [
+            (chunk, self._create_accessibility_prompt(
+                chunk.content if chunk is not None else content, file_type, part_name,
+                prompt_note(file_type, static_issues, chunk, style_summary, content)
+            ))
+            for chunk, part_name in self._file_parts(model_id, content, file_type, filename)
+        ]
+    
+    def response_cache_key(self, model_id: str, prompt: str) -> str:
+        """Response cache key of a per-file prompt (the system prompt included)."""
+        config = self._get_adapter(model_id).config
+        return make_cache_key(model_id, config["model_name"], f"{ANALYSIS_INSTRUCTIONS}\0{prompt}")
+    
+    async def _analyze_chunk(
+        self,
+        model_id: str,
+        content: str,
+        file_type: str,
+        filename: str,
+        chunk: Optional[Chunk],
+        on_issue: Optional[Callable[[Dict[str, Any]], None]],
+        note: str = ""
+    ) -> List[Dict[str, Any]]:
+        """Analyze one chunk (or a whole file when ``chunk`` is None)."""
+        emitted: List[Dict[str, Any]] = []
+        on_text = None
+        if on_issue is not None and settings.llm_streaming:
+            parser = IncrementalJSONArrayParser()
+            
+            def on_text(delta: str):
+                for issue in parser.feed(delta):
+                    if chunk is not None:
+                        issue = remap_issue(issue, chunk)
+                    emitted.append(issue)
+                    on_issue(issue)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config["api_endpoint"],
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.analyze_accessibility(
+            model_id, content, file_type, filename, on_text=on_text, note=note
+        )
+        issues = self.parse_llm_response(response, model_id)
+        if chunk is not None:
+            issues = [remap_issue(issue, chunk) for issue in issues]
+        if len(issues) < len(emitted):
+            # The full text did not parse (e.g. a truncated completion)
+            issues = emitted
+        if on_issue is not None:
+            for issue in issues[len(emitted):]:
+                on_issue(issue)
+        return issues
+    
+    async def analyze_accessibility(
+        self, 
+        model_id: str, 
+        content: str, 
+        file_type: str,
+        filename: str,
+        on_text: Optional[Callable[[str], None]] = None,
+        note: str = ""
+    ) -> Dict[str, Any]:
+        """Analyze content for accessibility issues using the specified LLM.
+        
+        With ``on_text`` the completion is streamed and each text delta is
+        passed to it; the return value is the same either way. ``note`` is
+        appended to the prompt.
+        """
+        prompt = self._create_accessibility_prompt(content, file_type, filename, note)
+        return await self._complete(model_id, prompt, filename, on_text)
     
-    async def _call_deepseek(self, config: Dict, api_key: str, prompt: str) -> Dict[str, Any]:
-        """Call DeepSeek API."""
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    async def _complete(
+        self,
+        model_id: str,
+        prompt: str,
+        label: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Send a user prompt, going through the response cache and a scheduler slot."""
+        adapter = self._get_adapter(model_id)
+        
+        if adapter.requires_api_key and not adapter.api_key:
+            raise ValueError(f"API key not configured for model: {model_id}")
+        
+        # Identical (model, prompt) pairs are served from the response cache
+        cache_key = self.response_cache_key(model_id, prompt)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"💾 [LLM SERVICE] Cache hit for {label} with {model_id}")
+                return cached
         
-        payload = {
-            "model": config["model_name"],
-            "messages": [
-                {"role": "system", "content": "You are an expert accessibility analyst. Always respond with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": config.get("max_tokens", 4000),
-            "temperature": config.get("temperature", 0.1)
-        }
+        if self.scheduler is None:
+            response = await self._request(adapter, prompt, on_text)
+            await self.record_response(model_id, cache_key, response)
+            return response
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config["api_endpoint"],
-                headers=headers,
-                json=payload,
-                timeout=60.0
+        # The projected cost stays reserved against the session budget until
+        # the actual usage has been charged
+        estimated_cost = estimate_call_cost(model_id, f"{ANALYSIS_INSTRUCTIONS}\n{prompt}")
+        async with self.scheduler.slot(model_id, estimated_cost):
+            response = await self._request(adapter, prompt, on_text)
+            await self.record_response(model_id, cache_key, response)
+        return response
+    
+    async def record_response(self, model_id: str, cache_key: str, response: Dict[str, Any], batch: bool = False):
+        """Account a provider response's usage and store it in the response cache.
+
+        ``batch`` marks responses from the provider's batch API, which are billed at its batch price.
+        """
+        self._record_usage(model_id, self._get_adapter(model_id).extract_usage(response), batch)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, cache_key, response)
+    
+    def _record_usage(self, model_id: str, usage: Dict[str, int], batch: bool = False):
+        totals = self._usage.setdefault(
+            model_id,
+            {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0}
+        )
+        totals["requests"] += 1
+        for field in ("input_tokens", "output_tokens", "cached_input_tokens"):
+            totals[field] += usage.get(field) or 0
+        budget = current_budget()
+        if budget is not None:
+            budget.record(model_id, usage, batch)
+        if usage.get("cached_input_tokens"):
+            logger.debug(
+                f"💾 [LLM SERVICE] {model_id} served {usage['cached_input_tokens']}/"
+                f"{usage.get('input_tokens', 0)} input tokens from the prompt cache"
             )
-            response.raise_for_status()
-            return response.json()
+    
+    def usage_stats(self) -> Dict[str, Any]:
+        """Return token usage per model, including prompt-cache hits."""
+        return {model_id: dict(totals) for model_id, totals in self._usage.items()}
+    
+    async def _request(
+        self,
+        adapter: ProviderAdapter,
+        prompt: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Send a prompt through an adapter, streaming if ``on_text`` is given."""
+        url, headers, payload = adapter.build_request(prompt, stream=on_text is not None)
+        if on_text is not None:
+            return await self._post_stream(
+                adapter.config, url, headers, payload, adapter.stream_decoder(), on_text
+            )
+        return await self._post(adapter.config, url, headers, payload)
+    
+    def provider_stats(self) -> Dict[str, Any]:
+        """Return rate limiter and circuit breaker state per provider."""
+        return {provider: limiter.stats() for provider, limiter in self._limiters.items()}
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return response cache counters."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def _create_accessibility_prompt(self, content: str, file_type: str, filename: str, note: str = "") -> str:
+        """Create the per-file part of the analysis prompt.
+        
+        The instructions are sent separately as ANALYSIS_INSTRUCTIONS so that
+        every request starts with the same cacheable prefix.
+        """
+        return f"""Analyze the following {file_type} file for accessibility issues according to WCAG 2.2 guidelines.
+
+File: {filename}
+Content:
+{content}
+""" + (f"\n{note}\n" if note else "")
     
     def parse_llm_response(self, response: Dict[str, Any], model_id: str) -> List[Dict[str, Any]]:
         """Parse LLM response and extract accessibility issues."""
         try:
-            if model_id == "gpt-5":
-                content = response["choices"][0]["message"]["content"]
-            elif model_id == "claude-opus-4":
-                content = response["content"][0]["text"]
-            elif model_id == "gemini-2.5-pro":
-                content = response["candidates"][0]["content"]["parts"][0]["text"]
-            elif model_id == "grok-4":
-                content = response["choices"][0]["message"]["content"]
-            elif model_id == "llama-4":
-                content = response["choices"][0]["message"]["content"]
-            elif model_id == "deepseek-v3.1":
-                content = response["choices"][0]["message"]["content"]
-            else:
-                return []
-            
-            # Clean content - remove markdown code blocks if present
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]  # Remove ```json
-            if content.startswith("```"):
-                content = content[3:]   # Remove ```
-            if content.endswith("```"):
-                content = content[:-3]  # Remove trailing ```
-            content = content.strip()
-            
-            # Parse JSON response
+            content = self.extract_response_text(response, model_id)
+        except (KeyError, IndexError, TypeError) as e:
+            logger.error(f"💥 [LLM SERVICE] Unexpected {model_id} response shape: {e}")
+            return []
+        if content is None:
+            return []
+        return self.parse_issues_text(content)
+    
+    def extract_response_text(self, response: Dict[str, Any], model_id: str) -> Optional[str]:
+        """Return the completion text of a provider response."""
+        if model_id not in LLM_CONFIGS:
+            return None
+        return self._get_adapter(model_id).extract_text(response)
+    
+    def extract_usage(self, response: Dict[str, Any], model_id: str) -> Dict[str, int]:
+        """Return the input/output token counts a provider reported."""
+        if model_id not in LLM_CONFIGS:
+            return {"input_tokens": 0, "output_tokens": 0}
+        return self._get_adapter(model_id).extract_usage(response)
+    
+    def parse_issues_text(self, content: str) -> List[Dict[str, Any]]:
+        """Parse completion text holding a JSON array of issues."""
+        # Clean content - remove markdown code blocks if present
+        content = content.strip()
+        if content.startswith("```json"):
+            content = content[7:]  # Remove ```json
+        if content.startswith("```"):
+            content = content[3:]   # Remove ```
+        if content.endswith("```"):
+            content = content[:-3]  # Remove trailing ```
+        content = content.strip()
+        
+        # Parse JSON response
+        try:
             issues = json.loads(content)
-            if isinstance(issues, list):
-                return issues
-            else:
-                return []
-                
-        except (KeyError, IndexError, json.JSONDecodeError) as e:
-            print(f"Error parsing LLM response: {e}")
-            print(f"Content that failed to parse: {content[:200]}...")
+        except json.JSONDecodeError as e:
+            logger.error(f"💥 [LLM SERVICE] Error parsing LLM response: {e}")
+            logger.debug(f"Content that failed to parse: {content[:200]}...")
+            return []
+        if isinstance(issues, list):
+            return issues
+        else:
             return []
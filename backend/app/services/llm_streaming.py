@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+
+
+class StreamDecoder(ABC):
+    """Turns a provider's streamed SSE events back into text deltas.
+
+    ``feed`` returns the completion text carried by one event; ``response``
+    assembles what was received into the shape of the provider's
+    non-streaming response, so caching and parsing work the same for both.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.usage: Optional[Dict[str, Any]] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    @abstractmethod
+    def feed(self, event: Dict[str, Any]) -> str:
+        """Return the completion text carried by one event ("" if none)."""
+
+    @abstractmethod
+    def response(self) -> Dict[str, Any]:
+        """Assemble what was received into the provider's non-streaming response shape."""
+
+
+class OpenAIStreamDecoder(StreamDecoder):
+    """Chat completions chunks (OpenAI, xAI, Groq, DeepSeek)."""
+
+    def feed(self, event):
+        if event.get("usage"):
+            self.usage = event["usage"]
+        choices = event.get("choices") or []
+        if not choices:
+            return ""
+        delta = choices[0].get("delta", {}).get("content") or ""
+        self.parts.append(delta)
+        return delta
+
+    def response(self):
+        response = {"choices": [{"message": {"role": "assistant", "content": self.text}}]}
+        if self.usage:
+            response["usage"] = self.usage
+        return response
+
+
+class AnthropicStreamDecoder(StreamDecoder):
+    """Messages API events (message_start, content_block_delta, message_delta)."""
+
+    def feed(self, event):
+        event_type = event.get("type")
+        if event_type == "message_start":
+            self.usage = dict(event.get("message", {}).get("usage", {}))
+        elif event_type == "message_delta" and event.get("usage"):
+            self.usage = {**(self.usage or {}), **event["usage"]}
+        elif event_type == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                self.parts.append(delta["text"])
+                return delta["text"]
+        elif event_type == "error":
+            raise RuntimeError(f"Anthropic stream error: {event.get('error')}")
+        return ""
+
+    def response(self):
+        response = {"content": [{"type": "text", "text": self.text}]}
+        if self.usage:
+            response["usage"] = self.usage
+        return response
+
+
+class GeminiStreamDecoder(StreamDecoder):
+    """streamGenerateContent chunks, each a partial GenerateContentResponse."""
+
+    def feed(self, event):
+        if event.get("usageMetadata"):
+            self.usage = event["usageMetadata"]
+        candidates = event.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = candidates[0].get("content", {}).get("parts", [])
+        delta = "".join(part.get("text", "") for part in parts)
+        self.parts.append(delta)
+        return delta
+
+    def response(self):
+        response = {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+        if self.usage:
+            response["usageMetadata"] = self.usage
+        return response
@@ -0,0 +1,111 @@
+import posixpath
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.services.chunker import chunk_token_budget
+from app.services.rate_limiter import estimate_tokens
+
+# Issues of a packed prompt name their file in this field
+FILE_FIELD = "file"
+
+
+def is_packable(content: str) -> bool:
+    """Whether a file is small enough to share a prompt with others."""
+    return estimate_tokens(content) <= settings.pack_max_file_tokens
+
+
+def _normalize(name: str) -> str:
+    return name.strip().strip("`'\"").replace("\\", "/").lower()
+
+
+def pack_files(model_id: str, files: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Bin files (dicts with content and filename) into prompt-sized groups.
+
+    First-fit decreasing by estimated tokens, bounded by ``pack_max_tokens``,
+    the model's chunk budget and ``pack_max_files``. Files whose names normalize
+    alike never share a bin, since issues are routed back by normalized name.
+    """
+    budget = min(settings.pack_max_tokens, chunk_token_budget(model_id))
+    bins: List[Dict[str, Any]] = []
+    for file_data in sorted(files, key=lambda f: estimate_tokens(f["content"]), reverse=True):
+        # File markers cost a few tokens on top of the content
+        size = estimate_tokens(file_data["content"]) + estimate_tokens(file_data["filename"]) + 16
+        for packed in bins:
+            if (
+                packed["tokens"] + size <= budget
+                and len(packed["files"]) < settings.pack_max_files
+                and _normalize(file_data["filename"]) not in packed["names"]
+            ):
+                break
+        else:
+            packed = {"tokens": 0, "files": [], "names": set()}
+            bins.append(packed)
+        packed["tokens"] += size
+        packed["files"].append(file_data)
+        packed["names"].add(_normalize(file_data["filename"]))
+    return [packed["files"] for packed in bins]
+
+
+def create_packed_prompt(files: List[Dict[str, Any]]) -> str:
+    """Create the user prompt for several files (dicts with content, file_type, filename).
+
+    Files are labelled with the normalized name the demultiplexer matches on.
+    A file's optional "note" follows its end marker.
+    """
+    sections = "\n".join(
+        f"=== File: {_normalize(file_data['filename'])} ({file_data['file_type']}) ===\n"
+        f"{file_data['content']}\n"
+        f"=== End of file: {_normalize(file_data['filename'])} ===\n"
+        + (f"{file_data['note']}\n" if file_data.get("note") else "")
+        for file_data in files
+    )
+    return f"""Analyze each of the following {len(files)} files for accessibility issues according to WCAG 2.2 guidelines.
+
+Return one JSON array covering all files. Every issue must include a "{FILE_FIELD}" field set to the exact name of the file it was found in, and its line number must count from the first line of that file.
+
+{sections}"""
+
+
+class PackDemultiplexer:
+    """Routes the issues of a packed response back to their files."""
+
+    def __init__(self, files: List[Dict[str, Any]]):
+        self._by_name = {}
+        self._by_basename: Dict[str, List[Any]] = {}
+        for file_data in files:
+            name = _normalize(file_data["filename"])
+            self._by_name[name] = file_data["key"]
+            self._by_basename.setdefault(posixpath.basename(name), []).append(file_data["key"])
+
+    def file_key(self, issue: Dict[str, Any]) -> Optional[Any]:
+        """Return the key of the file an issue belongs to, or None if unknown."""
+        name = issue.get(FILE_FIELD)
+        if not isinstance(name, str):
+            return None
+        name = _normalize(name)
+        if name in self._by_name:
+            return self._by_name[name]
+        matches = self._by_basename.get(posixpath.basename(name), [])
+        return matches[0] if len(matches) == 1 else None
+
+    @staticmethod
+    def strip(issue: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the issue without the routing field."""
+        return {field: value for field, value in issue.items() if field != FILE_FIELD}
+
+
+def plan_packs(model_id: str, files: List[Dict[str, Any]]):
+    """Split files into packed groups (two or more files) and files sent alone.
+
+    Returns ``(groups, singles)``; everything is a single when packing is off.
+    """
+    if not settings.pack_small_files:
+        return [], list(files)
+    small = [file_data for file_data in files if is_packable(file_data["content"])]
+    singles = [file_data for file_data in files if not is_packable(file_data["content"])]
+    groups = []
+    for group in pack_files(model_id, small):
+        if len(group) > 1:
+            groups.append(group)
+        else:
+            singles.extend(group)
+    return groups, singles
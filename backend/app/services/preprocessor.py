@@ -0,0 +1,240 @@
+import re
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.services.chunker import Chunk, file_family
+
+# Base64 payloads of inline data URIs (images, fonts, inline source maps)
+DATA_URI = re.compile(r"(data:[\w.+-]+/[\w.+-]+(?:;[\w.+-]+=[^;,\s\"')]*)*;base64,)[A-Za-z0-9+/=]{64,}")
+
+SOURCE_MAP = re.compile(r"^\s*(?://[#@]\s*sourceMappingURL=.*|/\*[#@]\s*sourceMappingURL=.*?\*/)\s*$")
+
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+
+# Inline <script>/<style> blocks of markup files (external scripts have no body)
+EMBEDDED_BLOCK = re.compile(r"(<(script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.DOTALL | re.IGNORECASE)
+
+# A "/" after one of these starts a regex literal rather than a division,
+# and a "<" a JSX element rather than a comparison
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+EXPRESSION_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await"
+}
+
+# An element or fragment opening tag after an expression start
+JSX_TAG_START = re.compile(r"<(?:[A-Za-z_$][\w$.:-]*|>)")
+
+
+def _keep_newlines(text: str) -> str:
+    """Blank out removed text but keep its line breaks, so line numbers survive."""
+    return "\n" * text.count("\n")
+
+
+def strip_c_comments(text: str, script: bool = True) -> str:
+    """Remove /* */ (and for scripts //) comments, leaving strings intact.
+
+    CSS has no line comments (and unquoted ``url(//host/...)``), so only
+    scripts get those. Regex literals and JSX elements are recognized by
+    the token before the slash or angle bracket, which is good enough for
+    code that only a model will read. JSX text is kept as it is; only its
+    {expressions} are code.
+    """
+    out: List[str] = []
+    _strip_code(text, 0, out, script)
+    return "".join(out)
+
+
+def _strip_code(text: str, i: int, out: List[str], script: bool, nested: bool = False) -> int:
+    """Copy code from ``i`` to ``out`` without comments; return where it stopped.
+
+    With ``nested`` the code is a JSX {expression} and copying stops after
+    its closing brace.
+    """
+    length = len(text)
+    last = ""
+    word = ""
+    braces = 0
+    while i < length:
+        char = text[i]
+        pair = text[i:i + 2]
+        expression_start = not last or last in REGEX_PRECEDERS or word in EXPRESSION_KEYWORDS
+        if pair == "/*":
+            end = text.find("*/", i + 2)
+            end = length if end < 0 else end + 2
+            out.append(_keep_newlines(text[i:end]) or " ")
+            i = end
+        elif pair == "//" and script:
+            end = text.find("\n", i)
+            i = length if end < 0 else end
+        elif char in "'\"`":
+            end = i + 1
+            while end < length and text[end] != char:
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "\n" and char != "`":
+                    break
+                end += 1
+            out.append(text[i:end + 1])
+            i = end + 1
+            last, word = char, ""
+        elif char == "/" and script and expression_start:
+            end = i + 1
+            in_class = False
+            while end < length and text[end] != "\n":
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "[":
+                    in_class = True
+                elif text[end] == "]":
+                    in_class = False
+                elif text[end] == "/" and not in_class:
+                    break
+                end += 1
+            out.append(text[i:end + 1])
+            i = end + 1
+            last, word = "/", ""
+        elif char == "<" and script and expression_start and last != "<" and JSX_TAG_START.match(text, i):
+            i = _copy_jsx_element(text, i, out)
+            # An element is a value, like a closing parenthesis
+            last, word = ")", ""
+        else:
+            if nested and char in "{}":
+                if char == "}" and not braces:
+                    out.append(char)
+                    return i + 1
+                braces += 1 if char == "{" else -1
+            out.append(char)
+            if char.isalnum() or char in "_$":
+                word = word + char if last and (last.isalnum() or last in "_$") else char
+                last = char
+            elif not char.isspace():
+                last, word = char, ""
+            i += 1
+    return i
+
+
+def _copy_jsx_element(text: str, i: int, out: List[str]) -> int:
+    """Copy the JSX element starting at the "<" at ``i``; return the index after it."""
+    length = len(text)
+    depth = 0
+    while i < length:
+        char = text[i]
+        if char == "<":
+            closing = text.startswith("</", i)
+            i, self_closing = _copy_jsx_tag(text, i, out)
+            if closing:
+                depth -= 1
+            elif not self_closing:
+                depth += 1
+            if depth <= 0:
+                return i
+        elif char == "{":
+            out.append(char)
+            i = _strip_code(text, i + 1, out, True, nested=True)
+        else:
+            out.append(char)
+            i += 1
+    return i
+
+
+def _copy_jsx_tag(text: str, i: int, out: List[str]) -> Tuple[int, bool]:
+    """Copy one JSX tag from its "<"; return the index after it and whether it closed itself."""
+    length = len(text)
+    start = i
+    while i < length:
+        char = text[i]
+        if char in "'\"":
+            end = text.find(char, i + 1)
+            end = length if end < 0 else end + 1
+            out.append(text[i:end])
+            i = end
+        elif char == "{":
+            out.append(char)
+            i = _strip_code(text, i + 1, out, True, nested=True)
+        elif char == ">":
+            out.append(char)
+            return i + 1, text[start:i].rstrip().endswith("/")
+        else:
+            out.append(char)
+            i += 1
+    return i, True
+
+
+def _omit_minified(text: str) -> str:
+    """Replace lines of minified code with a short placeholder."""
+    limit = settings.preprocess_minified_line_chars
+    if not limit:
+        return text
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        # Long lines with hardly any whitespace are bundler output, not hand-written code
+        if len(line) > limit and line.count(" ") < len(line) / 10:
+            lines[index] = f"/* minified code omitted ({len(line)} characters) */"
+    return "\n".join(lines)
+
+
+def _strip_script(text: str) -> str:
+    return _omit_minified(strip_c_comments(text))
+
+
+def _strip_css(text: str) -> str:
+    return _omit_minified(strip_c_comments(text, script=False))
+
+
+def _strip_markup(text: str) -> str:
+    text = HTML_COMMENT.sub(lambda match: _keep_newlines(match.group(0)), text)
+
+    def strip_block(match):
+        open_tag, tag, body, close_tag = match.groups()
+        body = _strip_css(body) if tag.lower() == "style" else _strip_script(body)
+        return f"{open_tag}{body}{close_tag}"
+
+    return EMBEDDED_BLOCK.sub(strip_block, text)
+
+
+STRIPPERS = {
+    "markup": _strip_markup,
+    "qml": _strip_script,
+    "script": _strip_script,
+    "css": _strip_css
+}
+
+
+def preprocess(content: str, file_type: str) -> Optional[Chunk]:
+    """Strip what does not matter for accessibility from a file before prompting.
+
+    Removes comments (per file type), source map references, base64 data URI
+    payloads, minified code, trailing whitespace and repeated blank lines.
+    Returns the reduced content as a Chunk whose line numbers point into the
+    original file, or None if nothing was removed (or preprocessing is off).
+    """
+    if not settings.preprocess_content:
+        return None
+
+    # Every step keeps the number of lines; lines are only dropped at the end
+    text = DATA_URI.sub(r"\1...", content)
+    stripper = STRIPPERS.get(file_family(file_type))
+    if stripper is not None:
+        text = stripper(text)
+
+    lines: List[str] = []
+    line_numbers: List[int] = []
+    for number, (line, original) in enumerate(zip(text.split("\n"), content.split("\n")), start=1):
+        line = line.rstrip()
+        if SOURCE_MAP.match(line):
+            continue
+        if not line.strip():
+            # Drop lines that only held comments; keep one of a run of blank lines
+            if original.strip() or not lines or not lines[-1]:
+                continue
+            line = ""
+        lines.append(line)
+        line_numbers.append(number)
+    while lines and not lines[-1]:
+        lines.pop()
+        line_numbers.pop()
+
+    reduced = "\n".join(lines)
+    if not lines or (reduced == content.rstrip() and line_numbers[0] == 1):
+        return None
+    return Chunk(reduced, line_numbers)
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class ProgressStore(ABC):
+    """Storage for the progress of frontend-driven analysis sessions.
+
+    A session's progress is a dict with ``status``, ``progress`` (0-100),
+    ``issues`` (frontend-formatted, append-only) and ``error``. Methods may
+    block (and are thread-safe), so async code calls them in a thread or
+    writes through a ProgressWriter.
+    """
+
+    @abstractmethod
+    def start(self, session_id: str):
+        """Create (or reset) progress for a session."""
+
+    @abstractmethod
+    def update(
+        self,
+        session_id: str,
+        status: Optional[str] = None,
+        progress: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        """Update the scalar fields of a session's progress."""
+
+    @abstractmethod
+    def append_issues(self, session_id: str, issues: List[Dict[str, Any]]):
+        """Append issues to a session."""
+
+    @abstractmethod
+    def get_since(self, session_id: str, cursor: int = 0) -> Optional[Dict[str, Any]]:
+        """Return a session's progress with only the issues after ``cursor``.
+
+        The result carries a ``cursor`` field (the number of issues stored so
+        far) to pass back on the next call. Returns None if the session is
+        unknown or expired.
+        """
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a session's progress with all issues, or None."""
+        data = self.get_since(session_id, 0)
+        if data is None:
+            return None
+        data.pop("cursor")
+        return data
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session."""
+
+
+class InMemoryProgressStore(ProgressStore):
+    """Process-local store; finished sessions are evicted after a TTL."""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.progress_ttl_seconds
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            session_id for session_id, data in self._sessions.items()
+            if data["finished_at"] is not None and data["finished_at"] < cutoff
+        ]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def start(self, session_id: str):
+        with self._lock:
+            self._evict_expired()
+            self._sessions[session_id] = {
+                "status": "analyzing",
+                "progress": 0,
+                "issues": [],
+                "error": None,
+                "finished_at": None
+            }
+
+    def update(self, session_id, status=None, progress=None, error=None):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return
+            if status is not None:
+                data["status"] = status
+                data["finished_at"] = time.time() if status in FINISHED_STATUSES else None
+            if progress is not None:
+                data["progress"] = progress
+            if error is not None:
+                data["error"] = error
+
+    def append_issues(self, session_id, issues):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is not None:
+                data["issues"].extend(issues)
+
+    def get_since(self, session_id, cursor=0):
+        with self._lock:
+            self._evict_expired()
+            data = self._sessions.get(session_id)
+            if data is None:
+                return None
+            return {
+                "status": data["status"],
+                "progress": data["progress"],
+                "issues": data["issues"][max(cursor, 0):],
+                "error": data["error"],
+                "cursor": len(data["issues"])
+            }
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteProgressStore(ProgressStore):
+    """Store shared by every worker process through a WAL-mode SQLite file."""
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.path = path or settings.progress_store_path
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.progress_ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS progress_sessions (
+                session_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS progress_issues (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                issue TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            row[0] for row in self._conn.execute(
+                "SELECT session_id FROM progress_sessions "
+                "WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,)
+            )
+        ]
+        for session_id in expired:
+            self._delete(session_id)
+
+    def _delete(self, session_id: str):
+        self._conn.execute("DELETE FROM progress_issues WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM progress_sessions WHERE session_id = ?", (session_id,))
+
+    def start(self, session_id):
+        with self._lock:
+            self._evict_expired()
+            self._delete(session_id)
+            self._conn.execute(
+                "INSERT INTO progress_sessions (session_id, status, progress, error, updated_at) "
+                "VALUES (?, 'analyzing', 0, NULL, ?)",
+                (session_id, time.time())
+            )
+            self._conn.commit()
+
+    def update(self, session_id, status=None, progress=None, error=None):
+        assignments = ["updated_at = ?"]
+        params: List[Any] = [time.time()]
+        if status is not None:
+            assignments.append("status = ?")
+            params.append(status)
+            assignments.append("finished_at = ?")
+            params.append(time.time() if status in FINISHED_STATUSES else None)
+        if progress is not None:
+            assignments.append("progress = ?")
+            params.append(progress)
+        if error is not None:
+            assignments.append("error = ?")
+            params.append(error)
+        params.append(session_id)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE progress_sessions SET {', '.join(assignments)} WHERE session_id = ?",
+                params
+            )
+            self._conn.commit()
+
+    def append_issues(self, session_id, issues):
+        if not issues:
+            return
+        with self._lock:
+            next_seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM progress_issues WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO progress_issues (session_id, seq, issue) VALUES (?, ?, ?)",
+                [
+                    (session_id, next_seq + offset, json.dumps(issue))
+                    for offset, issue in enumerate(issues)
+                ]
+            )
+            self._conn.commit()
+
+    def get_since(self, session_id, cursor=0):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, progress, error, finished_at FROM progress_sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            status, progress, error, finished_at = row
+            if finished_at is not None and finished_at < time.time() - self.ttl_seconds:
+                self._delete(session_id)
+                self._conn.commit()
+                return None
+            rows = self._conn.execute(
+                "SELECT seq, issue FROM progress_issues WHERE session_id = ? AND seq >= ? ORDER BY seq",
+                (session_id, cursor)
+            ).fetchall()
+            if rows:
+                next_cursor = rows[-1][0] + 1
+            else:
+                total = self._conn.execute(
+                    "SELECT COUNT(*) FROM progress_issues WHERE session_id = ?",
+                    (session_id,)
+                ).fetchone()[0]
+                next_cursor = min(max(cursor, 0), total)
+        return {
+            "status": status,
+            "progress": progress,
+            "issues": [json.loads(issue) for _, issue in rows],
+            "error": error,
+            "cursor": next_cursor
+        }
+
+    def delete(self, session_id):
+        with self._lock:
+            self._delete(session_id)
+            self._conn.commit()
+
+
+class ProgressWriter:
+    """Writes one session's progress from async code without blocking the event loop.
+
+    ``append_issues`` and ``update`` only queue the write, so synchronous
+    callbacks (streamed issues) can call them. A single task applies the
+    queued writes in order, in a thread, merging consecutive appends into
+    one; ``close`` waits until everything queued has been written. Must be
+    created on a running event loop.
+    """
+
+    def __init__(self, store: ProgressStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def append_issues(self, issues: List[Dict[str, Any]]):
+        if issues:
+            self._queue.put_nowait(("append", list(issues)))
+
+    def update(self, status: Optional[str] = None, progress: Optional[int] = None, error: Optional[str] = None):
+        self._queue.put_nowait(("update", {"status": status, "progress": progress, "error": error}))
+
+    async def close(self):
+        """Write everything queued and stop."""
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _run(self):
+        while True:
+            writes = [await self._queue.get()]
+            while not self._queue.empty():
+                writes.append(self._queue.get_nowait())
+            done = writes[-1] is None
+            writes = [write for write in writes if write is not None]
+            try:
+                await asyncio.to_thread(self._apply, writes)
+            except Exception as e:
+                logger.error(f"💥 [PROGRESS STORE] Failed to write progress of session {self.session_id}: {e}")
+            if done:
+                return
+
+    def _apply(self, writes: List[Tuple[str, Any]]):
+        issues: List[Dict[str, Any]] = []
+        for kind, value in writes:
+            if kind == "append":
+                issues.extend(value)
+                continue
+            if issues:
+                self.store.append_issues(self.session_id, issues)
+                issues = []
+            self.store.update(self.session_id, **value)
+        if issues:
+            self.store.append_issues(self.session_id, issues)
+
+
+def create_progress_store() -> ProgressStore:
+    """Build the progress store selected by ``settings.progress_backend``."""
+    if settings.progress_backend == "sqlite":
+        return SQLiteProgressStore()
+    if settings.progress_backend == "memory":
+        return InMemoryProgressStore()
+    raise ValueError(f"Unsupported progress backend: {settings.progress_backend}")
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+from app.config import settings
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit breaker is refusing calls."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for rate limiting."""
+    return len(text) // 4 + 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    base = base if base is not None else settings.llm_backoff_base
+    cap = cap if cap is not None else settings.llm_backoff_max
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate`` tokens per second.
+
+    Waiters are served in arrival order: the lock is held while sleeping, so a
+    large request is not starved by a stream of small ones.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until ``amount`` tokens are available and take them."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # A request larger than the bucket could never fit; let it drain the bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Stops calling a provider after ``failure_threshold`` consecutive failures.
+
+    After ``reset_seconds`` the circuit goes half-open and lets a single probe
+    call through; its success closes the circuit, its failure re-opens it.
+    Every call that passed ``before_call`` or ``wait`` must end with one of
+    the ``record_*`` methods, whatever way it ends, or no further probe is
+    let through.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_seconds: Optional[float] = None):
+        self.failure_threshold = failure_threshold or settings.llm_circuit_failure_threshold
+        self.reset_seconds = reset_seconds or settings.llm_circuit_reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_settled: Optional[asyncio.Event] = None
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.state == "closed":
+            return
+        remaining = self._opened_at + self.reset_seconds - time.monotonic()
+        if self.state == "open" and remaining > 0:
+            raise CircuitOpenError(f"Circuit open, retry in {remaining:.0f}s")
+        if self._probing:
+            raise CircuitOpenError("Circuit half-open, probe call in progress")
+        self.state = "half_open"
+        self._probing = True
+
+    async def wait(self):
+        """Wait until a call may go through, then let it through as before_call does.
+
+        An open circuit is waited out; while a half-open probe is in flight
+        the call waits for it to settle and tries again.
+        """
+        while True:
+            try:
+                self.before_call()
+                return
+            except CircuitOpenError:
+                pass
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                if self._probe_settled is None:
+                    self._probe_settled = asyncio.Event()
+                await self._probe_settled.wait()
+
+    def _end_probe(self):
+        self._probing = False
+        if self._probe_settled is not None:
+            self._probe_settled.set()
+            self._probe_settled = None
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._end_probe()
+
+    def record_neutral(self):
+        """A call ended in a way that says nothing about provider health (e.g. a 429 or an error of ours)."""
+        self._end_probe()
+
+    def record_failure(self):
+        self.failures += 1
+        self._end_probe()
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class ProviderRateLimiter:
+    """Request and token buckets plus a circuit breaker for one provider.
+
+    Limits come from the provider's ``requests_per_minute`` and
+    ``tokens_per_minute`` config entries; a missing entry means unlimited.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self.breaker = CircuitBreaker()
+        self._paused_until = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def pause(self, seconds: float):
+        """Hold back every call to this provider, e.g. after a 429 with Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int):
+        """Wait for any pause to end and for request and token budget."""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "throttled": self.throttled,
+            "retries": self.retries
+        }
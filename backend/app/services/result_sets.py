@@ -0,0 +1,91 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterable
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import AnalysisResultSet
+from app.services.llm_service import PROMPT_VERSION
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """SHA-256 of a file's content, used to recognise unchanged files."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def prompt_fingerprint(
+    file_type: str,
+    static_issues: Optional[List[Dict[str, Any]]] = None,
+    style_summary: Optional[List[Tuple[int, str]]] = None
+) -> str:
+    """Hash of everything besides the content that shapes a file's prompt.
+
+    Covers the prompt version, the preprocessing, chunking and prompt mode
+    settings, and the static issues and computed styles the prompt
+    carries, so a result set is only reused for the prompt it answered.
+    """
+    parts = [
+        PROMPT_VERSION,
+        file_type,
+        settings.preprocess_content,
+        settings.preprocess_minified_line_chars,
+        settings.chunk_max_tokens,
+        settings.prompt_mode,
+        settings.static_rules_mode,
+        static_issues,
+        style_summary
+    ]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def load_prior_result_sets(
+    db: Session,
+    hashes: Iterable[str],
+    llm_models: Iterable[str]
+) -> Dict[Tuple[str, str, str], List[Dict[str, Any]]]:
+    """Latest stored issues per (content hash, prompt fingerprint, model)."""
+    hashes = list(set(hashes))
+    llm_models = list(set(llm_models))
+    if not hashes or not llm_models:
+        return {}
+
+    rows = db.query(AnalysisResultSet).filter(
+        AnalysisResultSet.content_hash.in_(hashes),
+        AnalysisResultSet.llm_model.in_(llm_models)
+    ).order_by(AnalysisResultSet.created_at, AnalysisResultSet.id).all()
+
+    # Later rows overwrite earlier ones, leaving the most recent result set
+    return {(row.content_hash, row.prompt_version, row.llm_model): row.issues for row in rows}
+
+
+def result_set_row(
+    content_hash: str,
+    fingerprint: str,
+    llm_model: str,
+    source_session_id: Any,
+    file_path: str,
+    issues: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Map one file/model analysis to an ``analysis_result_sets`` row.
+
+    The ``prompt_version`` column holds the file's prompt fingerprint.
+    """
+    return {
+        "content_hash": content_hash,
+        "llm_model": llm_model,
+        "prompt_version": fingerprint,
+        "source_session_id": str(source_session_id),
+        "file_path": file_path,
+        "issues": issues,
+        "created_at": datetime.utcnow()
+    }
+
+
+def record_result_sets(db: Session, rows: List[Dict[str, Any]]):
+    """Insert result set rows and commit."""
+    if rows:
+        db.execute(insert(AnalysisResultSet), rows)
+        db.commit()
@@ -0,0 +1,126 @@
+import logging
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import AnalysisResult, AnalysisResultSet
+
+logger = logging.getLogger(__name__)
+
+
+def issue_to_row(
+    session_id: int,
+    llm_model: str,
+    file_path: str,
+    issue: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Map a parsed LLM issue to an ``analysis_results`` row."""
+    return {
+        "analysis_session_id": session_id,
+        "llm_model": llm_model,
+        "wcag_guideline": issue.get("wcag_guideline", "Unknown"),
+        "pour_principle": issue.get("pour_principle", "unknown"),
+        "severity": issue.get("severity", "medium"),
+        "title": issue.get("title", "Accessibility Issue"),
+        "description": issue.get("description", ""),
+        "file_path": file_path,
+        "line_number": issue.get("line_number"),
+        "code_snippet": issue.get("code_snippet"),
+        "suggestion": issue.get("suggestion"),
+        "confidence_score": issue.get("confidence_score", 0.5),
+        "created_at": datetime.utcnow()
+    }
+
+
+class ResultSink:
+    """Buffers analysis result rows and writes them as bulk inserts.
+
+    Rows are flushed with a single executemany ``INSERT`` and one commit
+    once ``batch_size`` rows are buffered or ``flush_interval`` seconds
+    have passed since the last flush, whichever comes first (``due``).
+    ``add`` only buffers: ``flush`` blocks on the database, so async
+    owners run it in a thread when the sink is due.
+
+    Rows can be tagged with a unit key; ``on_flush`` is called with the keys
+    whose rows have just been committed, which is what job checkpoints need.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        on_flush: Optional[Callable[[List[str]], None]] = None
+    ):
+        self.db = db
+        self.on_flush = on_flush
+        self.batch_size = batch_size or settings.result_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else settings.result_flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._keys: List[str] = []
+        self._result_sets: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+        self.flushes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        rows: List[Dict[str, Any]],
+        key: Optional[str] = None,
+        result_set: Optional[Dict[str, Any]] = None
+    ):
+        """Buffer rows until the next flush.
+        
+        ``result_set`` is an ``analysis_result_sets`` row committed together
+        with ``rows``.
+        """
+        self._rows.extend(rows)
+        if key is not None:
+            self._keys.append(key)
+        if result_set is not None:
+            self._result_sets.append(result_set)
+
+    @property
+    def due(self) -> bool:
+        """Whether the batch is full or buffered rows have waited ``flush_interval``."""
+        return len(self._rows) >= self.batch_size or self.time_until_flush() == 0
+
+    def time_until_flush(self) -> Optional[float]:
+        """Seconds until buffered rows are due, or None if nothing is buffered."""
+        if not self._rows and not self._keys and not self._result_sets:
+            return None
+        elapsed = time.monotonic() - self._last_flush
+        return max(0.0, self.flush_interval - elapsed)
+
+    def flush(self):
+        """Write all buffered rows in batches of ``batch_size``."""
+        self._last_flush = time.monotonic()
+        if not self._rows and not self._keys and not self._result_sets:
+            return
+
+        rows, self._rows = self._rows, []
+        keys, self._keys = self._keys, []
+        result_sets, self._result_sets = self._result_sets, []
+        if rows or result_sets:
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    self.db.execute(insert(AnalysisResult), rows[start:start + self.batch_size])
+                if result_sets:
+                    self.db.execute(insert(AnalysisResultSet), result_sets)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+            self.rows_written += len(rows)
+            self.flushes += 1
+            logger.info(f"💾 [RESULT SINK] Wrote {len(rows)} results ({self.rows_written} total)")
+
+        if keys and self.on_flush is not None:
+            self.on_flush(keys)
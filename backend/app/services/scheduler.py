@@ -0,0 +1,121 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from app.config import settings
+from app.data.llm_models import LLM_CONFIGS
+from app.services.token_budget import current_budget
+
+# Used for providers whose config does not set "max_concurrency"
+DEFAULT_PROVIDER_CONCURRENCY = 4
+
+
+class _HeldSlot:
+    """The semaphores of one slot, acquired in order.
+
+    ``held`` counts those actually held, so a cancelled (re-)acquire
+    never releases a semaphore it does not hold.
+    """
+
+    def __init__(self, semaphores: List[asyncio.Semaphore]):
+        self.semaphores = semaphores
+        self.held = 0
+
+    async def acquire(self):
+        for semaphore in self.semaphores[self.held:]:
+            await semaphore.acquire()
+            self.held += 1
+
+    def release(self):
+        while self.held:
+            self.held -= 1
+            self.semaphores[self.held].release()
+
+
+# Slot held by the running task, for released()
+_current_slot: ContextVar[Optional[_HeldSlot]] = ContextVar("scheduler_slot", default=None)
+
+
+class AnalysisScheduler:
+    """Bounds in-flight LLM calls globally and per provider.
+
+    A single scheduler is shared by every analysis session in the process,
+    so the global cap (``settings.max_concurrent_analyses``) holds across
+    sessions, not just within one.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        provider_limits: Optional[Dict[str, int]] = None
+    ):
+        self.max_concurrent = max_concurrent or settings.max_concurrent_analyses
+        self.provider_limits = provider_limits or {}
+        for config in LLM_CONFIGS.values():
+            self.provider_limits.setdefault(
+                config["provider"],
+                config.get("max_concurrency", DEFAULT_PROVIDER_CONCURRENCY)
+            )
+        self._global: Optional[asyncio.Semaphore] = None
+        self._providers: Dict[str, asyncio.Semaphore] = {}
+
+    def provider_limit(self, provider: str) -> int:
+        return self.provider_limits.get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+
+    def _provider_semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._providers.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.provider_limit(provider))
+            self._providers[provider] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, model_id: str, estimated_cost: float = 0.0):
+        """Hold one global slot and one slot of the model's provider.
+
+        Once both are held, ``estimated_cost`` is reserved against the
+        current session budget (BudgetExceededError if it cannot fit)
+        until the slot is released; charge the actual usage before then.
+        """
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+        config = LLM_CONFIGS.get(model_id, {})
+        provider = config.get("provider", model_id)
+        # Wait for the provider first so a throttled provider never sits on
+        # global slots that other providers could be using.
+        held = _HeldSlot([self._provider_semaphore(provider), self._global])
+        try:
+            await held.acquire()
+            token = _current_slot.set(held)
+            try:
+                budget = current_budget()
+                if budget is None:
+                    yield
+                    return
+                reservation = await budget.reserve(model_id, estimated_cost)
+                try:
+                    yield
+                finally:
+                    await budget.release(reservation)
+            finally:
+                _current_slot.reset(token)
+        finally:
+            held.release()
+
+    @asynccontextmanager
+    async def released(self):
+        """Give up the running task's slot for the block, e.g. a backoff sleep.
+
+        Other calls can use the slot meanwhile; it is taken back (provider
+        first) when the block ends. The budget reservation is kept. Does
+        nothing outside a slot.
+        """
+        held = _current_slot.get()
+        if held is None:
+            yield
+            return
+        held.release()
+        try:
+            yield
+        finally:
+            await held.acquire()
@@ -0,0 +1,275 @@
+import asyncio
+import math
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.data.llm_models import AVAILABLE_LLM_MODELS, LLM_CONFIGS
+from app.models import LLMUsage
+
+# Characters per token when a model's config does not set "chars_per_token"
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cached_input_tokens")
+
+
+class BudgetExceededError(Exception):
+    """Raised when an LLM call would take a session over its budget."""
+
+
+def count_tokens(model_id: str, text: str) -> int:
+    """Estimate how many tokens a model's tokenizer makes of ``text``."""
+    chars_per_token = LLM_CONFIGS.get(model_id, {}).get("chars_per_token", DEFAULT_CHARS_PER_TOKEN)
+    return int(len(text) / chars_per_token) + 1
+
+
+def cost_per_token(model_id: str) -> float:
+    return next((model.cost_per_token for model in AVAILABLE_LLM_MODELS if model.id == model_id), 0.0)
+
+
+def max_output_tokens(model_id: str) -> int:
+    config = LLM_CONFIGS.get(model_id, {})
+    return config.get(config.get("max_tokens_param", "max_tokens"), config.get("max_tokens", 4000))
+
+
+def projected_output_tokens(model_id: str, input_tokens: int) -> int:
+    """Expected completion size for a prompt, capped by the model's output limit."""
+    return min(max_output_tokens(model_id), math.ceil(input_tokens * settings.estimate_output_ratio))
+
+
+def estimate_cost(
+    model_id: str,
+    input_tokens: int,
+    output_tokens: int,
+    cached_input_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    batch: bool = False
+) -> float:
+    """Cost of a call, with the model's batch and prompt-cache price ratios applied.
+
+    ``cached_input_tokens`` and ``cache_write_tokens`` are part of ``input_tokens``.
+    """
+    config = LLM_CONFIGS.get(model_id, {})
+    input_units = (
+        input_tokens - cached_input_tokens - cache_write_tokens
+        + cached_input_tokens * config.get("cached_input_price_ratio", 1.0)
+        + cache_write_tokens * config.get("cache_write_price_ratio", 1.0)
+    )
+    cost = (input_units + output_tokens) * cost_per_token(model_id)
+    return cost * config.get("batch_price_ratio", 1.0) if batch else cost
+
+
+def estimate_call_cost(model_id: str, prompt: str, batch: bool = False) -> float:
+    """Projected cost of sending ``prompt`` (system prompt included) to a model.
+
+    Prompt-cache hits are only known once the provider reports usage, so
+    the projection charges the whole prompt as uncached input.
+    """
+    input_tokens = count_tokens(model_id, prompt)
+    return estimate_cost(model_id, input_tokens, projected_output_tokens(model_id, input_tokens), batch=batch)
+
+
+def estimate_prompts(model_id: str, prompts: List[str], batch: bool = False) -> Dict[str, Any]:
+    """Projected requests, tokens and cost of sending ``prompts`` to a model."""
+    input_tokens = [count_tokens(model_id, prompt) for prompt in prompts]
+    output_tokens = [projected_output_tokens(model_id, tokens) for tokens in input_tokens]
+    return {
+        "requests": len(prompts),
+        "input_tokens": sum(input_tokens),
+        "output_tokens": sum(output_tokens),
+        "cost_usd": estimate_cost(model_id, sum(input_tokens), sum(output_tokens), batch=batch)
+    }
+
+
+def estimate_duration(per_model: Dict[str, Dict[str, Any]], scheduler) -> float:
+    """Projected wall-clock seconds for interactive requests.
+
+    Each provider is bounded by its scheduler concurrency (request latency
+    grows with the completion size) and by its requests/tokens per minute;
+    providers run side by side, sharing the scheduler's global slots.
+    """
+    providers: Dict[str, Dict[str, float]] = {}
+    for model_id, estimate in per_model.items():
+        config = LLM_CONFIGS.get(model_id, {})
+        totals = providers.setdefault(
+            config.get("provider", model_id),
+            {"requests": 0, "tokens": 0, "busy_seconds": 0.0, "config": config}
+        )
+        totals["requests"] += estimate["requests"]
+        totals["tokens"] += estimate["input_tokens"] + estimate["output_tokens"]
+        totals["busy_seconds"] += (
+            estimate["requests"] * settings.estimate_request_latency
+            + estimate["output_tokens"] / settings.estimate_output_tokens_per_second
+        )
+
+    total_busy = 0.0
+    longest = 0.0
+    for provider, totals in providers.items():
+        config = totals["config"]
+        concurrency = min(scheduler.provider_limit(provider), scheduler.max_concurrent)
+        seconds = totals["busy_seconds"] / concurrency
+        if config.get("requests_per_minute"):
+            seconds = max(seconds, totals["requests"] / config["requests_per_minute"] * 60)
+        if config.get("tokens_per_minute"):
+            seconds = max(seconds, totals["tokens"] / config["tokens_per_minute"] * 60)
+        longest = max(longest, seconds)
+        total_busy += totals["busy_seconds"]
+    return round(max(longest, total_busy / scheduler.max_concurrent), 1)
+
+
+class SessionBudget:
+    """Spend cap and actual token usage of one analysis session.
+
+    Calls reserve their projected cost while in flight and are charged
+    their actual cost once the provider reports usage. A call that only
+    fits once in-flight reservations settle waits for them; one that would
+    go over the cap on actual spend alone is refused.
+    """
+
+    def __init__(self, limit_usd: Optional[float] = None):
+        self.limit_usd = limit_usd
+        self.spent_usd = 0.0
+        self.reserved_usd = 0.0
+        self.refused = 0
+        self.usage: Dict[str, Dict[str, Any]] = {}
+        self._settled: Optional[asyncio.Condition] = None
+
+    async def reserve(self, model_id: str, cost_usd: float) -> float:
+        if self.limit_usd is not None:
+            if self._settled is None:
+                self._settled = asyncio.Condition()
+            async with self._settled:
+                while self.spent_usd + self.reserved_usd + cost_usd > self.limit_usd:
+                    if self.spent_usd + cost_usd > self.limit_usd or not self.reserved_usd:
+                        self.refused += 1
+                        raise BudgetExceededError(
+                            f"{model_id} call (~${cost_usd:.4f}) would exceed the session budget of "
+                            f"${self.limit_usd:.2f} (${self.spent_usd:.4f} spent)"
+                        )
+                    await self._settled.wait()
+        self.reserved_usd += cost_usd
+        return cost_usd
+
+    async def release(self, reservation: float):
+        self.reserved_usd = max(self.reserved_usd - reservation, 0.0)
+        if self._settled is not None:
+            async with self._settled:
+                self._settled.notify_all()
+
+    def record(self, model_id: str, usage: Dict[str, int], batch: bool = False):
+        """Charge the actual usage a provider reported for one response.
+
+        With ``batch`` the response came from the provider's batch API.
+        """
+        totals = self.usage.setdefault(
+            model_id,
+            {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0, "cost_usd": 0.0}
+        )
+        totals["requests"] += 1
+        for field in USAGE_FIELDS:
+            totals[field] += usage.get(field) or 0
+        cost = estimate_cost(
+            model_id,
+            usage.get("input_tokens") or 0,
+            usage.get("output_tokens") or 0,
+            usage.get("cached_input_tokens") or 0,
+            usage.get("cache_write_tokens") or 0,
+            batch
+        )
+        totals["cost_usd"] += cost
+        self.spent_usd += cost
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "limit_usd": self.limit_usd,
+            "spent_usd": round(self.spent_usd, 6),
+            "refused_calls": self.refused,
+            "models": {model_id: dict(totals) for model_id, totals in self.usage.items()}
+        }
+
+
+# Budget of the session whose tasks are running; asyncio tasks inherit it
+_current_budget: ContextVar[Optional[SessionBudget]] = ContextVar("session_budget", default=None)
+
+
+def current_budget() -> Optional[SessionBudget]:
+    return _current_budget.get()
+
+
+def use_budget(budget: Optional[SessionBudget]):
+    """Make ``budget`` current for this task and the tasks it creates; returns a reset token."""
+    return _current_budget.set(budget)
+
+
+def reset_budget(token):
+    _current_budget.reset(token)
+
+
+def user_spend(db: Session, user_id: Any) -> float:
+    """A user's recorded LLM spend within the user budget period."""
+    since = datetime.utcnow() - timedelta(days=settings.user_budget_period_days)
+    total = db.query(func.sum(LLMUsage.cost_usd)).filter(
+        LLMUsage.user_id == user_id,
+        LLMUsage.created_at >= since
+    ).scalar()
+    return total or 0.0
+
+
+def budget_limit(
+    db: Session,
+    user_id: Any,
+    budget_usd: Optional[float] = None,
+    session_id: Any = None
+) -> Optional[float]:
+    """Spend cap for a session attempt: what is left of the session budget and of the user's.
+
+    ``budget_usd`` overrides ``session_budget_usd``; None means no cap.
+    With ``session_id`` the spend of the session's earlier attempts is
+    subtracted, so retries share one session budget.
+    """
+    limits = []
+    session_budget = budget_usd if budget_usd is not None else settings.session_budget_usd
+    if session_budget:
+        spent = session_usage(db, session_id, user_id)["cost_usd"] if session_id is not None else 0.0
+        limits.append(max(session_budget - spent, 0.0))
+    if settings.user_budget_usd and user_id is not None:
+        limits.append(max(settings.user_budget_usd - user_spend(db, user_id), 0.0))
+    return min(limits) if limits else None
+
+
+def record_session_usage(db: Session, session_id: Any, user_id: Any, budget: SessionBudget):
+    """Store a session's actual usage, one row per model."""
+    for model_id, totals in budget.usage.items():
+        db.add(LLMUsage(
+            session_id=str(session_id),
+            user_id=user_id,
+            llm_model=model_id,
+            **totals
+        ))
+    db.commit()
+
+
+def session_usage(db: Session, session_id: Any, user_id: Any = None) -> Dict[str, Any]:
+    """Recorded usage of a session per model, summed over its attempts.
+
+    With ``user_id`` only usage recorded for that user counts (frontend
+    session ids are chosen by the client, so they are not unique).
+    """
+    query = db.query(LLMUsage).filter(LLMUsage.session_id == str(session_id))
+    if user_id is not None:
+        query = query.filter(LLMUsage.user_id == user_id)
+    rows = query.all()
+    models: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        totals = models.setdefault(
+            row.llm_model,
+            {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0, "cost_usd": 0.0}
+        )
+        for field in ("requests",) + USAGE_FIELDS + ("cost_usd",):
+            totals[field] += getattr(row, field) or 0
+    return {
+        "cost_usd": round(sum(totals["cost_usd"] for totals in models.values()), 6),
+        "models": models
+    }
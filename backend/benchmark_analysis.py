@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the analysis pipeline.
+
+Runs a session through AnalysisService against mock_llm_server.py (every
+model's endpoint is pointed at it) or against a recorded cassette, and
+reports wall time, per-call latency percentiles, retries and token usage.
+Start the mock first, e.g. with realistic latency and some 429s:
+
+    python mock_llm_server.py --latency-dist lognormal --latency-mean 1.5 --latency-stddev 0.8 --error-rate 0.02
+    python benchmark_analysis.py --files 200 --models gpt-5,claude-opus-4
+
+Or replay a cassette recorded with LLM_CASSETTE_MODE=record:
+
+    python benchmark_analysis.py --cassette llm_cassette.jsonl --dir ./sample_project
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+MOCK_PATHS = {
+    "openai": "/v1/chat/completions",
+    "anthropic": "/v1/messages"
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mock-url", default="http://127.0.0.1:8089", help="base URL of mock_llm_server.py")
+    parser.add_argument("--cassette", help="replay this cassette instead of calling the mock server")
+    parser.add_argument("--models", default="gpt-5,claude-opus-4,gemini-2.5-pro")
+    parser.add_argument("--files", type=int, default=50, help="number of synthetic files")
+    parser.add_argument("--dir", help="analyze the files of this directory instead")
+    parser.add_argument("--runs", type=int, default=1, help="sessions to run back to back")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+def configure_environment(args, workdir: str):
+    """Settings are read on import, so this runs before the app is imported."""
+    defaults = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        "LLM_CACHE_ENABLED": "false",
+        "PROGRESS_BACKEND": "memory",
+        "LLM_CASSETTE_MODE": "replay" if args.cassette else "",
+        "LLM_CASSETTE_PATH": args.cassette or "",
+        # Keys are never sent anywhere real
+        "OPENAI_API_KEY": "benchmark",
+        "ANTHROPIC_API_KEY": "benchmark",
+        "GOOGLE_API_KEY": "benchmark",
+        "GROQ_API_KEY": "benchmark",
+        "HUGGINGFACE_API_KEY": "benchmark",
+        "DEEPSEEK_API_KEY": "benchmark"
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def point_at_mock(mock_url: str):
+    from app.data.llm_models import LLM_CONFIGS
+    base = urlsplit(mock_url)
+    for config in LLM_CONFIGS.values():
+        endpoint = urlsplit(config["api_endpoint"])
+        path = MOCK_PATHS.get(config.get("api_format", "openai"), endpoint.path)
+        config["api_endpoint"] = urlunsplit((base.scheme, base.netloc, path, endpoint.query, ""))
+
+
+def load_files(args):
+    if args.dir:
+        files = []
+        for root, _, names in os.walk(args.dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    content = f.read().decode("utf-8", errors="ignore")
+                files.append({
+                    "name": os.path.relpath(path, args.dir),
+                    "type": os.path.splitext(name)[1] or "text/plain",
+                    "content": content
+                })
+        return files
+
+    files = []
+    for index in range(args.files):
+        # A mix of small components and larger screens
+        rows = 5 if index % 4 else 120
+        body = "\n".join(
+            f'<div class="row-{row}" style="color: #999">Item {row}</div>' if row % 7 == 0
+            else f'<img src="icon-{row}.png">' if row % 11 == 0
+            else f"<p>Entry {index}.{row}</p>"
+            for row in range(rows)
+        )
+        files.append({"name": f"screen_{index}.html", "type": ".html", "content": f"<main>\n{body}\n</main>"})
+    return files
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run(args, files, models):
+    from app.database import create_tables
+    from app.services.analysis_service import AnalysisService
+
+    create_tables()
+    service = AnalysisService()
+    llm_service = service.llm_service
+    await llm_service.open_clients()
+
+    # Time every provider call (cache hits never get here)
+    latencies = []
+    request = llm_service._request
+
+    async def timed_request(*request_args, **request_kwargs):
+        started = time.perf_counter()
+        try:
+            return await request(*request_args, **request_kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    llm_service._request = timed_request
+
+    sessions = []
+    try:
+        for run_index in range(args.runs):
+            session_id = f"benchmark-{int(time.time())}-{run_index}"
+            started = time.perf_counter()
+            await service.start_analysis_simple(session_id, files, models, user_id=None)
+            elapsed = time.perf_counter() - started
+            progress = service.get_progress(session_id)
+            sessions.append({
+                "session_id": session_id,
+                "status": progress["status"],
+                "seconds": round(elapsed, 2),
+                "issues": len(progress["issues"]),
+                "pairs_per_second": round(len(files) * len(models) / elapsed, 2) if elapsed else None
+            })
+    finally:
+        await llm_service.close_clients()
+
+    return {
+        "files": len(files),
+        "models": models,
+        "sessions": sessions,
+        "calls": {
+            "count": len(latencies),
+            "p50_seconds": round(percentile(latencies, 0.5), 3),
+            "p95_seconds": round(percentile(latencies, 0.95), 3),
+            "max_seconds": round(max(latencies, default=0.0), 3),
+            "mean_seconds": round(statistics.mean(latencies), 3) if latencies else 0.0
+        },
+        "providers": llm_service.provider_stats(),
+        "usage": llm_service.usage_stats()
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="a11y-benchmark-")
+    configure_environment(args, workdir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if not args.cassette:
+        point_at_mock(args.mock_url)
+
+    files = load_files(args)
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    report = asyncio.run(run(args, files, models))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"📊 {report['files']} files x {len(models)} models")
+    for session in report["sessions"]:
+        print(
+            f"   {session['session_id']}: {session['status']} in {session['seconds']}s, "
+            f"{session['issues']} issues, {session['pairs_per_second']} pairs/s"
+        )
+    calls = report["calls"]
+    print(
+        f"📞 {calls['count']} provider calls: p50 {calls['p50_seconds']}s, "
+        f"p95 {calls['p95_seconds']}s, max {calls['max_seconds']}s"
+    )
+    for provider, provider_stats in report["providers"].items():
+        print(f"   {provider}: {provider_stats}")
+    for model_id, usage in report["usage"].items():
+        print(f"🪙 {model_id}: {usage}")
+
+
+if __name__ == "__main__":
+    main()
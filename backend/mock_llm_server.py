@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the LLM provider APIs.
+
+Serves OpenAI-style chat completions, Files and Batch endpoints, the
+Anthropic Messages and Message Batches endpoints and Gemini
+generateContent, streaming included. Every prompt is answered with
+deterministic mock issues, or with the recorded response when a cassette
+(see LLM_CASSETTE_MODE) holds the same request. Latency, error rate and
+streaming speed are configurable, so it can back offline benchmarks
+(benchmark_analysis.py) and batch sessions without API keys:
+
+    python mock_llm_server.py --port 8089 --latency-dist lognormal --latency-mean 1.5 --error-rate 0.02
+    LLM_BATCH_BASE_URL=http://localhost:8089/v1 python run.py
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from app.services.llm_recorder import Cassette, request_key
+
+app = FastAPI(title="Mock LLM Provider API")
+
+
+class MockOptions:
+    """Behaviour of the mock, set from the command line."""
+
+    # Seconds a batch stays in progress before it completes
+    batch_delay = 2.0
+    # Share of the requests of a completed batch that failed
+    batch_error_rate = 0.0
+    # Seconds before a completion starts: "fixed", "uniform", "normal",
+    # "lognormal" or "exponential" around latency_mean
+    latency_dist = "fixed"
+    latency_mean = 0.0
+    latency_stddev = 0.0
+    # Share of completion requests failing with one of error_codes
+    error_rate = 0.0
+    error_codes = [429, 500, 503]
+    retry_after = 1.0
+    # Streaming speed in completion tokens per second (0 = unthrottled)
+    tokens_per_second = 0.0
+    cassette = None
+
+
+options = MockOptions()
+rng = random.Random()
+stats = {"requests": 0, "errors": 0, "replayed": 0, "streamed": 0}
+
+files = {}
+openai_batches = {}
+anthropic_batches = {}
+
+PACKED_FILE = re.compile(r"^=== File: (.+) \(.*\) ===\n(.*?)\n=== End of file: \1 ===$", re.M | re.S)
+
+
+def mock_issues(prompt: str):
+    """Deterministic issues for the file(s) embedded in a prompt."""
+    packed = PACKED_FILE.findall(prompt)
+    if packed:
+        return [
+            {**issue, "file": filename}
+            for filename, content in packed
+            for issue in file_issues(content)
+        ]
+    return file_issues(prompt.split("Content:\n", 1)[-1])
+
+
+def file_issues(content: str):
+    issues = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if "<img" in line and "alt=" not in line:
+            issues.append({
+                "wcag_guideline": "1.1.1 Non-text Content",
+                "pour_principle": "perceivable",
+                "severity": "high",
+                "title": "Image without alternative text",
+                "description": "The image has no alt attribute.",
+                "line_number": line_number,
+                "code_snippet": line.strip(),
+                "suggestion": "Add an alt attribute describing the image.",
+                "confidence_score": 0.9
+            })
+        elif re.search(r"color\s*:", line):
+            issues.append({
+                "wcag_guideline": "1.4.3 Contrast (Minimum)",
+                "pour_principle": "perceivable",
+                "severity": "medium",
+                "title": "Possible insufficient contrast",
+                "description": "Check the contrast of this color against its background.",
+                "line_number": line_number,
+                "code_snippet": line.strip(),
+                "suggestion": "Ensure a contrast ratio of at least 4.5:1.",
+                "confidence_score": 0.5
+            })
+    return issues
+
+
+def sample_latency() -> float:
+    mean, stddev = options.latency_mean, options.latency_stddev
+    if mean <= 0:
+        return 0.0
+    if options.latency_dist == "uniform":
+        return rng.uniform(max(mean - stddev, 0.0), mean + stddev)
+    if options.latency_dist == "normal":
+        return max(rng.gauss(mean, stddev), 0.0)
+    if options.latency_dist == "lognormal":
+        # Parameterised so the samples have the requested mean and stddev
+        sigma2 = math.log(1 + (stddev / mean) ** 2)
+        return rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+    if options.latency_dist == "exponential":
+        return rng.expovariate(1 / mean)
+    return mean
+
+
+def text_chunks(text: str):
+    """Split completion text into token-sized stream deltas."""
+    return re.findall(r"\s*\S{1,8}|\s+", text) or [text]
+
+
+def prompt_of(body) -> str:
+    if "contents" in body:
+        return body["contents"][-1]["parts"][0]["text"]
+    content = body["messages"][-1]["content"]
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content)
+    return content
+
+
+async def completion(request: Request, answer, stream_events):
+    """Shared handling of a completion request: latency, errors, replay, streaming.
+
+    ``answer(body)`` returns the completion text and the non-streaming
+    response; ``stream_events(body, text)`` yields a streamed response as
+    text deltas (used for pacing) and the SSE payloads to send.
+    """
+    stats["requests"] += 1
+    raw = await request.body()
+    body = json.loads(raw)
+    await asyncio.sleep(sample_latency())
+
+    if options.error_rate and rng.random() < options.error_rate:
+        stats["errors"] += 1
+        status_code = rng.choice(options.error_codes)
+        headers = {"retry-after": str(options.retry_after)} if status_code == 429 else {}
+        return JSONResponse({"error": {"message": f"Mock error {status_code}"}}, status_code, headers=headers)
+
+    if options.cassette is not None:
+        entry = options.cassette.find(request_key(request.method, str(request.url), raw))
+        if entry is not None:
+            stats["replayed"] += 1
+            recorded = entry["response"]
+            return Response(
+                recorded["body"],
+                status_code=recorded["status_code"],
+                headers=recorded["headers"]
+            )
+
+    text, response = answer(body)
+    if not body.get("stream") and "streamGenerateContent" not in request.url.path:
+        return response
+
+    stats["streamed"] += 1
+
+    async def events():
+        for event in stream_events(body, text):
+            if isinstance(event, str):
+                if options.tokens_per_second > 0:
+                    await asyncio.sleep(max(len(event) / 4, 1) / options.tokens_per_second)
+                continue
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def chat_completion(body):
+    prompt = prompt_of(body)
+    text = json.dumps(mock_issues(prompt))
+    return text, {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+    }
+
+
+def chat_completion_events(body, text):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    for delta in text_chunks(text):
+        yield delta
+        yield {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+        }
+    yield {"id": completion_id, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "choices": [],
+            "usage": {"prompt_tokens": len(prompt_of(body)) // 4, "completion_tokens": len(text) // 4}
+        }
+
+
+def anthropic_message(body):
+    prompt = prompt_of(body)
+    text = json.dumps(mock_issues(prompt))
+    return text, {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+    }
+
+
+def anthropic_message_events(body, text):
+    yield {
+        "type": "message_start",
+        "message": {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [],
+            "usage": {"input_tokens": len(prompt_of(body)) // 4, "output_tokens": 0}
+        }
+    }
+    yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+    for delta in text_chunks(text):
+        yield delta
+        yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": delta}}
+    yield {"type": "content_block_stop", "index": 0}
+    yield {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(text) // 4}}
+    yield {"type": "message_stop"}
+
+
+def gemini_content(body):
+    prompt = prompt_of(body)
+    text = json.dumps(mock_issues(prompt))
+    return text, {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+    }
+
+
+def gemini_content_events(body, text):
+    prompt_tokens = len(prompt_of(body)) // 4
+    for delta in text_chunks(text):
+        yield delta
+        yield {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": delta}]}}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens}
+        }
+    yield {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": ""}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(text) // 4}
+    }
+
+
+@app.post("/v1/chat/completions")
+async def create_chat_completion(request: Request):
+    return await completion(request, chat_completion, chat_completion_events)
+
+
+@app.post("/v1/messages")
+async def create_message(request: Request):
+    return await completion(request, anthropic_message, anthropic_message_events)
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    if not model_action.endswith((":generateContent", ":streamGenerateContent")):
+        raise HTTPException(status_code=404, detail="Unknown model action")
+    return await completion(request, gemini_content, gemini_content_events)
+
+
+@app.get("/mock/stats")
+async def mock_stats():
+    return stats
+
+
+@app.post("/v1/files")
+async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    file_id = f"file-{uuid.uuid4().hex}"
+    files[file_id] = (await file.read()).decode("utf-8")
+    return {"id": file_id, "object": "file", "purpose": purpose, "filename": file.filename}
+
+
+@app.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str):
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="File not found")
+    return PlainTextResponse(files[file_id])
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    body = await request.json()
+    if body["input_file_id"] not in files:
+        raise HTTPException(status_code=400, detail="Unknown input file")
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    openai_batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": body["endpoint"],
+        "input_file_id": body["input_file_id"],
+        "created_at": time.time(),
+        "output_file_id": None,
+        "error_file_id": None
+    }
+    return {**openai_batches[batch_id], "status": "validating"}
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = openai_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if time.time() - batch["created_at"] < options.batch_delay:
+        return {**batch, "status": "in_progress"}
+
+    if batch["output_file_id"] is None:
+        # Failed requests go to a separate error file, as with the real API
+        lines, errors = [], []
+        for line in files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            if rng.random() < options.batch_error_rate:
+                errors.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": None,
+                    "error": {"code": "server_error", "message": "Mock batch request failure"}
+                }))
+                continue
+            lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": chat_completion(request["body"])[1]},
+                "error": None
+            }))
+        output_file_id = f"file-{uuid.uuid4().hex}"
+        files[output_file_id] = "\n".join(lines)
+        batch["output_file_id"] = output_file_id
+        if errors:
+            batch["error_file_id"] = f"file-{uuid.uuid4().hex}"
+            files[batch["error_file_id"]] = "\n".join(errors)
+    return {**batch, "status": "completed"}
+
+
+@app.post("/v1/messages/batches")
+async def create_message_batch(request: Request):
+    body = await request.json()
+    batch_id = f"msgbatch_{uuid.uuid4().hex}"
+    anthropic_batches[batch_id] = {
+        "id": batch_id,
+        "type": "message_batch",
+        "created_at": time.time(),
+        "requests": body["requests"]
+    }
+    return {"id": batch_id, "type": "message_batch", "processing_status": "in_progress", "results_url": None}
+
+
+@app.get("/v1/messages/batches/{batch_id}")
+async def get_message_batch(batch_id: str, request: Request):
+    batch = anthropic_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if time.time() - batch["created_at"] < options.batch_delay:
+        return {"id": batch_id, "type": "message_batch", "processing_status": "in_progress", "results_url": None}
+    return {
+        "id": batch_id,
+        "type": "message_batch",
+        "processing_status": "ended",
+        "results_url": str(request.url_for("message_batch_results", batch_id=batch_id))
+    }
+
+
+@app.get("/v1/messages/batches/{batch_id}/results", name="message_batch_results")
+async def message_batch_results(batch_id: str):
+    batch = anthropic_batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if "results" not in batch:
+        batch["results"] = [
+            {"type": "errored", "error": {"type": "api_error", "message": "Mock batch request failure"}}
+            if rng.random() < options.batch_error_rate
+            else {"type": "succeeded", "message": anthropic_message(item["params"])[1]}
+            for item in batch["requests"]
+        ]
+    lines = [
+        json.dumps({"custom_id": item["custom_id"], "result": result})
+        for item, result in zip(batch["requests"], batch["results"])
+    ]
+    return PlainTextResponse("\n".join(lines))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--batch-delay", type=float, default=options.batch_delay,
+                        help="seconds before a submitted batch completes")
+    parser.add_argument("--batch-error-rate", type=float, default=options.batch_error_rate,
+                        help="share of batch requests that fail (0-1)")
+    parser.add_argument("--latency-dist", default=options.latency_dist,
+                        choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--latency-mean", type=float, default=options.latency_mean,
+                        help="mean seconds before a completion starts")
+    parser.add_argument("--latency-stddev", type=float, default=options.latency_stddev)
+    parser.add_argument("--error-rate", type=float, default=options.error_rate,
+                        help="share of completion requests that fail (0-1)")
+    parser.add_argument("--error-codes", default=",".join(str(code) for code in options.error_codes))
+    parser.add_argument("--retry-after", type=float, default=options.retry_after,
+                        help="Retry-After seconds sent with 429s")
+    parser.add_argument("--tokens-per-second", type=float, default=options.tokens_per_second,
+                        help="streaming speed (0 = unthrottled)")
+    parser.add_argument("--cassette", help="answer recorded requests from this cassette")
+    parser.add_argument("--seed", type=int, help="seed latency and error sampling")
+    args = parser.parse_args()
+
+    options.batch_delay = args.batch_delay
+    options.batch_error_rate = args.batch_error_rate
+    options.latency_dist = args.latency_dist
+    options.latency_mean = args.latency_mean
+    options.latency_stddev = args.latency_stddev
+    options.error_rate = args.error_rate
+    options.error_codes = [int(code) for code in args.error_codes.split(",") if code.strip()]
+    options.retry_after = args.retry_after
+    options.tokens_per_second = args.tokens_per_second
+    if args.cassette:
+        options.cassette = Cassette(args.cassette)
+    if args.seed is not None:
+        rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
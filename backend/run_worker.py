@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Standalone analysis job worker for the Accessibility Analysis API.
+
+Runs jobs from the shared job queue without serving HTTP. Start as many of
+these as needed; set JOB_WORKERS=0 on the API processes if only dedicated
+workers should run analyses, and PROGRESS_BACKEND=sqlite so the API can
+see their progress.
+"""
+
+import asyncio
+import logging
+import signal
+from app.database import create_tables
+from app.services.analysis_service import AnalysisService
+from app.services.job_queue import JobQueue
+from app.services.job_worker import JobWorker
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main():
+    create_tables()
+    analysis_service = AnalysisService()
+    await analysis_service.llm_service.open_clients()
+    worker = JobWorker(JobQueue(), analysis_service, concurrency=max(settings.job_workers, 1))
+    await worker.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+    
+    try:
+        await stop.wait()
+    finally:
+        logger.info("🛑 [WORKER] Shutting down...")
+        await worker.stop()
+        await analysis_service.llm_service.close_clients()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
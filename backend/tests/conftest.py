@@ -0,0 +1,65 @@
+import os
+import tempfile
+import uuid
+
+# Point every store at a scratch directory before app.config is imported
+_scratch = tempfile.mkdtemp(prefix="a11y-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_scratch}/analysis.db",
+    "JOB_QUEUE_PATH": f"{_scratch}/jobs.db",
+    "PROGRESS_STORE_PATH": f"{_scratch}/progress.db",
+    "LLM_CACHE_ENABLED": "false",
+    "LLM_CACHE_PATH": f"{_scratch}/llm_cache.db",
+    "LLM_CASSETTE_MODE": "",
+    "STATIC_RULES_WORKERS": "0",
+    "SESSION_BUDGET_USD": "0",
+    "USER_BUDGET_USD": "0"
+})
+
+import pytest
+from app.database import SessionLocal, create_tables
+from app.models import User, UploadedFile
+
+create_tables()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    name = uuid.uuid4().hex[:12]
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def upload(db, user, tmp_path):
+    """Store a file on disk and as an UploadedFile of ``user``."""
+    def make(name: str, content, mime_type: str = "text/html") -> UploadedFile:
+        path = tmp_path / name
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+        uploaded = UploadedFile(
+            filename=str(path),
+            original_filename=name,
+            file_path=str(path),
+            file_size=path.stat().st_size,
+            file_type=os.path.splitext(name)[1],
+            mime_type=mime_type,
+            user_id=user.id
+        )
+        db.add(uploaded)
+        db.commit()
+        return uploaded
+    return make
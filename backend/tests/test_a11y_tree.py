@@ -0,0 +1,90 @@
+import re
+from app.services.a11y_tree import build_tree
+from app.services.chunker import remap_issue
+from app.services.llm_service import LLMService
+
+PAGE = "\n".join([
+    '<html lang="en">',
+    "<head><title>Radio</title></head>",
+    "<body>",
+    "  <nav aria-label=\"Main\">",
+    '    <a href="/">Home</a>',
+    "  </nav>",
+    '  <img src="cover.png">',
+    '  <div onclick="play()">Play</div>',
+    '  <label for="volume">Volume</label>',
+    '  <input id="volume" type="range">',
+    "</body>",
+    "</html>"
+])
+
+QML = "\n".join([
+    "ApplicationWindow {",
+    '    title: "Radio"',
+    "    Column {",
+    "        Button {",
+    '            text: qsTr("Play")',
+    "        }",
+    "        Image {",
+    '            source: "cover.png"',
+    "        }",
+    "        Rectangle {",
+    "            width: 16; height: 16",
+    "            MouseArea { onClicked: next() }",
+    "        }",
+    "    }",
+    "}"
+])
+
+
+def labeled(tree, pattern):
+    """The label of the first tree line matching ``pattern``."""
+    line = next(line for line in tree.content.split("\n") if re.search(pattern, line))
+    return line.split()[0]
+
+
+def test_html_tree_labels_round_trip_to_source_lines():
+    tree = build_tree(PAGE, ".html")
+    source = PAGE.split("\n")
+    for pattern, snippet in [
+        (r'link "Home"', '<a href="/">'),
+        (r"img \(no name\)", "cover.png"),
+        (r"div \(no name\)|div.*clickable", "onclick"),
+        (r'slider "Volume"', 'id="volume"')
+    ]:
+        label = labeled(tree, pattern)
+        issue = remap_issue({"title": "x", "line_number": label}, tree)
+        assert snippet in source[issue["line_number"] - 1]
+    # Unnamed and mouse-only nodes get their source quoted
+    assert 'L7: <img src="cover.png">' in tree.content
+    assert "L8: <div onclick=\"play()\">Play</div>" in tree.content
+
+
+def test_qml_tree_labels_round_trip_to_source_lines():
+    tree = build_tree(QML, ".qml")
+    for pattern, line_number in [
+        (r'button "Play"', 4),
+        (r"img \(Image\) \(no name\)", 7),
+        (r"Rectangle.*clickable", 10)
+    ]:
+        label = labeled(tree, pattern)
+        assert remap_issue({"line_number": label}, tree)["line_number"] == line_number
+    assert "L10: Rectangle {" in tree.content
+    assert build_tree("body { color: red; }", ".css") is None
+
+
+def test_labels_survive_chunking(monkeypatch):
+    monkeypatch.setattr("app.config.settings.prompt_mode", "tree")
+    monkeypatch.setattr("app.config.settings.chunk_max_tokens", 256)
+    items = [f'  <button onclick="pick({index})">Station {index} with a fairly long name</button>' for index in range(120)]
+    page = "\n".join(['<html lang="en">', "<body>", *items, "</body>", "</html>"])
+    source = page.split("\n")
+
+    parts = LLMService()._file_parts("gpt-5", page, ".html", "stations.html")
+    assert len(parts) > 1
+    for chunk, _ in parts:
+        label = labeled(chunk, r'button "Station')
+        # The LLM may report the label with or without its "L"
+        for reported in (label, label[1:], int(label[1:])):
+            line_number = remap_issue({"line_number": reported}, chunk)["line_number"]
+            assert source[line_number - 1].lstrip().startswith("<button")
@@ -0,0 +1,107 @@
+import asyncio
+from app.models import AnalysisResult, AnalysisSession
+from app.services.analysis_service import AnalysisService
+from app.services.job_queue import JobCheckpoints, JobQueue
+from app.services.job_worker import JobWorker
+
+ISSUE = {
+    "wcag_guideline": "1.3.1 Info and Relationships",
+    "pour_principle": "perceivable",
+    "severity": "medium",
+    "title": "Layout table",
+    "description": "A table is used for layout.",
+    "line_number": 1,
+    "code_snippet": "<table>",
+    "suggestion": "Use CSS layout.",
+    "confidence_score": 0.8
+}
+
+
+def test_retry_after_failed_attempt_does_not_duplicate_results(db, user, upload, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.settings.pack_small_files", False)
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "off")
+    monkeypatch.setattr("app.config.settings.job_retry_delay", 0)
+    # Every result is committed as soon as it is queued
+    monkeypatch.setattr("app.config.settings.result_flush_interval", 0)
+
+    files = [upload("a.html", "<table><tr><td>a</td></tr></table>"), upload("b.html", "<table></table>")]
+    session = AnalysisSession(name="retry", user_id=user.id)
+    db.add(session)
+    db.commit()
+
+    service = AnalysisService()
+    calls = []
+
+    async def analyze_file(model_id, content, file_type, filename, on_issue=None, **kwargs):
+        calls.append(filename)
+        if on_issue is not None:
+            on_issue(ISSUE)
+        if filename == "b.html" and calls.count("b.html") == 1:
+            # Dies after its streamed issue was written, before it finished
+            raise RuntimeError("connection reset")
+        return [ISSUE]
+
+    monkeypatch.setattr(service.llm_service, "analyze_file", analyze_file)
+
+    pipeline = service._run_analysis_pipeline
+    attempts = []
+
+    async def failing_pipeline(*args, **kwargs):
+        issues = await pipeline(*args, **kwargs)
+        attempts.append(len(issues))
+        if len(attempts) == 1:
+            raise RuntimeError("worker crashed after the results were written")
+        return issues
+
+    monkeypatch.setattr(service, "_run_analysis_pipeline", failing_pipeline)
+
+    queue = JobQueue(path=str(tmp_path / "jobs.db"))
+    queue.enqueue("analysis_session", {
+        "session_id": session.id,
+        "file_ids": [f.id for f in files],
+        "llm_models": ["gpt-5"]
+    })
+    worker = JobWorker(queue, service, concurrency=1, worker_id="test")
+
+    async def run_attempts():
+        for _ in range(2):
+            job = queue.claim("test")
+            assert job is not None
+            await worker._run_job(job, "test")
+
+    asyncio.run(run_attempts())
+
+    db.expire_all()
+    assert db.get(AnalysisSession, session.id).status == "completed"
+    rows = db.query(AnalysisResult).filter(AnalysisResult.analysis_session_id == session.id).all()
+    # a.html finished and was checkpointed in the first attempt; b.html is
+    # analyzed again and its half-written first attempt is discarded
+    assert calls.count("a.html") == 1
+    assert calls.count("b.html") == 2
+    assert sorted(row.file_path for row in rows) == ["a.html", "b.html"]
+
+
+def test_unfinished_pair_does_not_discard_a_checkpointed_file_of_the_same_name(db, user, tmp_path):
+    session = AnalysisSession(name="same-name", user_id=user.id)
+    db.add(session)
+    db.commit()
+    db.add_all([
+        AnalysisResult(analysis_session_id=session.id, llm_model="gpt-5", file_path=path, **ISSUE)
+        for path in ("index.html", "other.html")
+    ])
+    db.commit()
+
+    service = AnalysisService()
+    queue = JobQueue(path=str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("analysis_session", {})
+    checkpoints = JobCheckpoints(queue, job_id)
+    checkpoints.save(service._unit_key(1, "gpt-5"), [])
+    files = [
+        {"file_id": 1, "metadata": {"filename": "index.html"}},
+        {"file_id": 2, "metadata": {"filename": "index.html"}},
+        {"file_id": 3, "metadata": {"filename": "other.html"}}
+    ]
+    service._discard_unfinished_results(db, session.id, files, ["gpt-5"], checkpoints)
+
+    rows = db.query(AnalysisResult).filter(AnalysisResult.analysis_session_id == session.id).all()
+    assert [row.file_path for row in rows] == ["index.html"]
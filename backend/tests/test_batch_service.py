@@ -0,0 +1,118 @@
+import asyncio
+import httpx
+import pytest
+import mock_llm_server
+from app.services.analysis_service import AnalysisService
+from app.services.batch_service import BatchService
+from app.services.llm_cache import LLMResponseCache
+
+MODELS = ["gpt-5", "claude-opus-4"]
+FILES = [
+    {"key": 1, "content": '<p>Radio</p>\n<img src="cover.png">', "file_type": ".html", "filename": "index.html"},
+    {"key": 2, "content": "body {\n  margin: 0;\n  color: #777;\n}", "file_type": ".css", "filename": "site.css"}
+]
+
+
+@pytest.fixture
+def mock_provider(monkeypatch):
+    """Route every provider call to mock_llm_server, in process."""
+    monkeypatch.setattr("app.config.settings.openai_api_key", "test-key")
+    monkeypatch.setattr("app.config.settings.anthropic_api_key", "test-key")
+    monkeypatch.setattr("app.config.settings.llm_batch_base_url", "http://mock.test/v1")
+    monkeypatch.setattr("app.config.settings.llm_batch_poll_interval", 0.01)
+    monkeypatch.setattr("app.config.settings.llm_streaming", False)
+    monkeypatch.setattr(mock_llm_server.options, "batch_delay", 0.02)
+    monkeypatch.setattr(mock_llm_server.options, "batch_error_rate", 0.0)
+
+    def connect(llm_service):
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_llm_server.app))
+        llm_service._get_client = lambda config: client
+        return llm_service
+    return connect
+
+
+def batch_count() -> int:
+    return len(mock_llm_server.openai_batches) + len(mock_llm_server.anthropic_batches)
+
+
+def titles_by_line(issues):
+    return sorted((issue["line_number"], issue["title"]) for issue in issues)
+
+
+@pytest.mark.parametrize("model_id", MODELS)
+def test_batch_results_are_mapped_back_to_files(mock_provider, model_id):
+    service = BatchService(mock_provider(AnalysisService().llm_service))
+    states = []
+
+    async def on_submit(state):
+        states.append(state)
+
+    results, failed = asyncio.run(service.analyze_files(model_id, FILES, on_submit=on_submit))
+    assert failed == []
+    assert titles_by_line(results[1]) == [(2, "Image without alternative text")]
+    assert titles_by_line(results[2]) == [(3, "Possible insufficient contrast")]
+    assert len(states) == 1 and states[0]["batch_id"]
+
+
+@pytest.mark.parametrize("model_id", MODELS)
+def test_resumed_attempt_polls_the_submitted_batch(mock_provider, model_id):
+    service = BatchService(mock_provider(AnalysisService().llm_service))
+    states = []
+
+    async def on_submit(state):
+        states.append(state)
+
+    first, _ = asyncio.run(service.analyze_files(model_id, FILES, on_submit=on_submit))
+    submitted = batch_count()
+    resumed, failed = asyncio.run(service.analyze_files(model_id, FILES, state=states[0], on_submit=on_submit))
+    assert batch_count() == submitted
+    assert len(states) == 1
+    assert failed == [] and resumed == first
+
+
+@pytest.mark.parametrize("model_id", MODELS)
+def test_cached_responses_are_not_batched_again(mock_provider, model_id, tmp_path):
+    llm_service = mock_provider(AnalysisService().llm_service)
+    llm_service.cache = LLMResponseCache(path=str(tmp_path / "cache.db"))
+    service = BatchService(llm_service)
+
+    first, _ = asyncio.run(service.analyze_files(model_id, FILES))
+    submitted = batch_count()
+    second, failed = asyncio.run(service.analyze_files(model_id, FILES))
+    assert batch_count() == submitted
+    assert failed == [] and second == first
+    llm_service.cache.close()
+
+
+@pytest.mark.parametrize("model_id", MODELS)
+def test_failed_batch_requests_fall_back_to_interactive_calls(mock_provider, monkeypatch, model_id):
+    monkeypatch.setattr(mock_llm_server.options, "batch_error_rate", 1.0)
+    service = AnalysisService()
+    mock_provider(service.llm_service)
+
+    _, failed = asyncio.run(service.batch_service.analyze_files(model_id, FILES))
+    assert sorted(failed) == [1, 2]
+
+    files = [
+        {
+            "file_id": file_data["key"],
+            "content": file_data["content"],
+            "metadata": {"filename": file_data["filename"], "file_type": file_data["file_type"], "content_hash": "h"},
+            "prompt_fingerprint": "p"
+        }
+        for file_data in FILES
+    ]
+    requests_before = mock_llm_server.stats["requests"]
+
+    async def run():
+        queue = asyncio.Queue()
+        await service._analyze_model_batch(1, files, model_id, queue)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    queued = asyncio.run(run())
+    # Both files were analyzed one by one and completed their pair
+    assert mock_llm_server.stats["requests"] - requests_before == 2
+    finished = {unit_key for unit_key, *_ in queued if unit_key is not None}
+    assert finished == {f"1:{model_id}", f"2:{model_id}"}
+    streamed = [issue for unit_key, _, _, issues, _ in queued for issue in issues]
+    assert titles_by_line(streamed) == [(2, "Image without alternative text"), (3, "Possible insufficient contrast")]
@@ -0,0 +1,68 @@
+from app.services.chunker import Chunk, LabeledChunk, chunk_content, remap_issue
+
+
+def html_document(sections: int) -> str:
+    lines = ["<html>", "<body>"]
+    for index in range(sections):
+        lines += [f"  <section id=\"s{index}\">", f"    <p>{'text ' * 30}</p>", "  </section>"]
+    lines += ["</body>", "</html>"]
+    return "\n".join(lines)
+
+
+def test_small_content_is_one_chunk():
+    chunks = chunk_content("<p>a</p>\n<p>b</p>", ".html", 1000)
+    assert len(chunks) == 1
+    assert chunks[0].line_numbers == [1, 2]
+
+
+def test_chunks_cover_every_line_once_and_cut_at_elements():
+    content = html_document(20)
+    lines = content.split("\n")
+    chunks = chunk_content(content, ".html", 200)
+
+    assert len(chunks) > 1
+    assert [n for chunk in chunks for n in chunk.line_numbers] == list(range(1, len(lines) + 1))
+    for chunk in chunks:
+        assert chunk.content.split("\n") == [lines[n - 1] for n in chunk.line_numbers]
+    for chunk in chunks[1:]:
+        assert chunk.content.lstrip().startswith("<")
+        assert not chunk.content.lstrip().startswith("</")
+
+
+def test_issue_lines_map_back_to_the_file():
+    content = html_document(20)
+    lines = content.split("\n")
+    chunks = chunk_content(content, ".html", 200)
+    chunk = chunks[1]
+    local = 2
+
+    issue = remap_issue({"title": "x", "line_number": local}, chunk)
+    assert issue["line_number"] == chunk.start_line + 1
+    assert lines[issue["line_number"] - 1] == chunk.content.split("\n")[local - 1]
+    # Strings, out-of-range and missing line numbers
+    assert remap_issue({"line_number": str(local)}, chunk)["line_number"] == issue["line_number"]
+    assert remap_issue({"line_number": 10_000}, chunk)["line_number"] == chunk.end_line
+    assert remap_issue({"line_number": 0}, chunk)["line_number"] == chunk.start_line
+    assert remap_issue({"line_number": "n/a"}, chunk)["line_number"] == "n/a"
+    assert remap_issue({"title": "x"}, chunk) == {"title": "x"}
+
+
+def test_minified_lines_are_split_but_keep_their_line_number():
+    content = "<div>" + "<span>x</span>" * 400 + "</div>"
+    chunks = chunk_content(content, ".html", 100)
+    assert len(chunks) > 1
+    assert all(chunk.line_numbers == [1] for chunk in chunks)
+    assert "".join(chunk.content for chunk in chunks) == content
+
+
+def test_window_composes_line_numbers():
+    outer = Chunk("a\nb\nc\nd", [10, 11, 12, 13])
+    inner = outer.window(Chunk("b\nc", [2, 3]))
+    assert inner.line_numbers == [11, 12]
+    assert inner.original_line(2) == 12
+
+
+def test_labeled_chunk_reports_labels_directly():
+    chunk = LabeledChunk("L5 button\nL9 img", [5, 9])
+    assert chunk.original_line("L9") == 9
+    assert chunk.original_line(7) == 7
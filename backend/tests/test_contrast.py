@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.analyzers import contrast
+from app.analyzers.contrast import contrast_ratios, parse_color
+
+
+def ratio(foreground: str, background: str) -> float:
+    return float(contrast_ratios(np.array([parse_color(foreground)]), np.array([parse_color(background)]))[0])
+
+
+def test_parse_color_syntaxes():
+    assert parse_color("white") == (255.0, 255.0, 255.0, 1.0)
+    assert parse_color("#f00") == (255.0, 0.0, 0.0, 1.0)
+    assert parse_color("#ff000080")[3] == pytest.approx(128 / 255)
+    # QML puts the alpha first
+    assert parse_color("#80ff0000", qml=True)[:3] == (255.0, 0.0, 0.0)
+    assert parse_color("rgb(0 128 255 / 50%)") == (0.0, 128.0, 255.0, 0.5)
+    assert parse_color("rgba(0, 0, 0, .25) !important") == (0.0, 0.0, 0.0, 0.25)
+    assert parse_color("hsl(120deg, 100%, 25%)") == pytest.approx((0.0, 127.5, 0.0, 1.0))
+    assert parse_color("Qt.rgba(1, 0, 0, 1)") == (255.0, 0.0, 0.0, 1.0)
+    assert parse_color("transparent")[3] == 0.0
+    assert parse_color("var(--accent)") is None
+    assert parse_color("rgb(1, 2)") is None
+
+
+def test_contrast_ratios_match_wcag_reference_values():
+    assert ratio("black", "white") == pytest.approx(21.0)
+    assert ratio("white", "white") == pytest.approx(1.0)
+    assert ratio("#777", "#fff") == pytest.approx(4.48, abs=0.01)
+    # Order does not matter; a translucent background is composited over white
+    assert ratio("#fff", "#777") == pytest.approx(ratio("#777", "#fff"))
+    assert ratio("black", "rgba(0, 0, 0, 0)") == pytest.approx(21.0)
+
+
+def test_css_failures_are_grouped_with_a_passing_suggestion():
+    css = "\n".join([
+        "body { color: #333; background: #fff; }",
+        ".muted { color: #999; }",
+        ".hint { color: #999; }",
+        "h1 { color: #999; font-size: 24px; }",
+        ".ok { color: #595959; }",
+        "button { border: 1px solid #ddd; }"
+    ])
+    issues = contrast.check_file(css, ".css")
+    by_line = {issue["line_number"]: issue for issue in issues}
+
+    assert sorted(by_line) == [2, 4, 6]
+    assert by_line[2]["wcag_guideline"].startswith("1.4.3")
+    assert "1 more lines (3)" in by_line[2]["description"]
+    # Large text only needs 3:1, which #999 on white (2.85:1) still misses
+    assert "3:1" in by_line[4]["description"]
+    assert by_line[6]["wcag_guideline"].startswith("1.4.11")
+
+    suggested = by_line[2]["suggestion"].split(" ", 2)[1]
+    assert ratio(suggested, "#fff") >= 4.5
+
+
+def test_aaa_level_reports_enhanced_contrast(monkeypatch):
+    css = "body { background: #fff; }\np { color: #767676; }"
+    assert contrast.check_file(css, ".css") == []
+    monkeypatch.setattr("app.config.settings.contrast_level", "AAA")
+    issues = contrast.check_file(css, ".css")
+    assert [issue["wcag_guideline"].split(" ", 1)[0] for issue in issues] == ["1.4.6"]
+    assert issues[0]["severity"] == "low"
+
+
+def test_qml_text_is_checked_against_its_background():
+    qml = "\n".join([
+        "Rectangle {",
+        '    color: "#ffffff"',
+        "    Text {",
+        '        color: "#aaaaaa"',
+        '        text: "Now playing"',
+        "    }",
+        "}"
+    ])
+    issues = contrast.check_file(qml, ".qml")
+    assert len(issues) == 1
+    assert issues[0]["line_number"] in (3, 4)
+    assert contrast.check_file("<p>hi</p>", ".html") is None
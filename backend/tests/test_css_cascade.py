@@ -0,0 +1,78 @@
+from app.analyzers import css_cascade
+from app.analyzers.css_cascade import resolve_styles, specificity
+
+
+def style_of(styles, tag):
+    return next(style for style in styles if style.element.name == tag)
+
+
+def test_specificity():
+    assert specificity("p") == (0, 0, 0, 1)
+    assert specificity("ul li.active") == (0, 0, 1, 2)
+    assert specificity("#nav > a[href]:hover") == (0, 1, 2, 1)
+    assert specificity("a::before") == (0, 0, 0, 2)
+    # :where() counts nothing, :not()/:is() count their argument
+    assert specificity(":where(#main) p") == (0, 0, 0, 1)
+    assert specificity("p:not(.intro)") == (0, 0, 1, 1)
+    assert specificity(":is(#a, .b) span") == (0, 1, 1, 1)
+
+
+def test_specificity_beats_source_order_and_important_beats_inline():
+    css = "\n".join([
+        "#lead { color: #111111; }",
+        "p.note { color: #222222; }",
+        "p { color: #333333; }",
+        "em { color: #444444 !important; }"
+    ])
+    html = '<p id="lead" class="note">Text <em style="color: #555555">emphasis</em></p>'
+    styles = resolve_styles(html, [("site.css", css)])
+    assert style_of(styles, "p").color_text == "#111111"
+    assert style_of(styles, "em").color_text == "#444444"
+
+
+def test_later_rule_of_equal_specificity_wins_and_inherits():
+    css = ".a { color: #111111; }\n.b { color: #222222; }"
+    html = '<div class="b a"><span>child</span></div>'
+    styles = resolve_styles(html, [("site.css", css)])
+    assert style_of(styles, "div").color_text == "#222222"
+    assert style_of(styles, "span").color_text == "#222222"
+
+
+def test_own_style_block_cascades_after_linked_stylesheets():
+    html = "\n".join([
+        '<link rel="stylesheet" href="/css/site.css?v=2">',
+        "<style>p { color: #999999; }</style>",
+        "<p>Low contrast</p>"
+    ])
+    stylesheets = [("css/site.css", "p { color: #000000; }"), ("other.css", "p { color: #ff0000; }")]
+    styles = resolve_styles(html, stylesheets)
+    assert style_of(styles, "p").color_text == "#999999"
+
+
+def test_issues_for_contrast_focus_and_target_size():
+    css = "\n".join([
+        ":root { --muted: #aaaaaa; }",
+        "body { background: #ffffff; }",
+        ".muted { color: var(--muted); }",
+        "a:focus { outline: none; }",
+        ".icon { display: inline-block; width: 16px; height: 16px; }",
+        "@media print { .muted { color: #000000; } }"
+    ])
+    html = "\n".join([
+        "<html><body>",
+        '<p class="muted">Faint text</p>',
+        '<a href="/a">Link</a>',
+        '<button class="icon">x</button>',
+        "</body></html>"
+    ])
+    issues, summary = css_cascade.check_file(html, ".html", [("site.css", css)])
+    found = {issue["wcag_guideline"].split(" ", 1)[0]: issue["line_number"] for issue in issues}
+    assert found == {"1.4.3": 2, "2.4.7": 3, "2.5.8": 4}
+    assert any("#aaaaaa on #ffffff" in text for _, text in summary)
+
+
+def test_focus_outline_replaced_by_another_indicator_is_accepted():
+    css = "a:focus { outline: 0; box-shadow: 0 0 0 3px #005fcc; }"
+    issues, _ = css_cascade.check_file('<a href="/a">Link</a>', ".html", [("site.css", css)])
+    assert issues == []
+    assert css_cascade.check_file("<View/>", ".xml") is None
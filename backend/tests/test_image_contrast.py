@@ -0,0 +1,94 @@
+import asyncio
+import base64
+import io
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from app.analyzers import image_contrast
+from app.analyzers.engine import replaces_llm
+from app.services.analysis_service import AnalysisService
+
+
+def screenshot(foreground, background=(255, 255, 255), image_format="PNG") -> bytes:
+    image = Image.new("RGB", (480, 200), background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=28)
+    for row in range(4):
+        draw.text((20, 20 + 40 * row), "Tune the radio station", fill=foreground, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def data_url(image: bytes, mime_type: str = "image/png") -> str:
+    return f"data:{mime_type};base64,{base64.b64encode(image).decode('ascii')}"
+
+
+def test_supports_extensions_and_mime_types():
+    assert image_contrast.supports(".png")
+    assert image_contrast.supports("image/jpeg")
+    assert not image_contrast.supports("image/svg+xml")
+    assert not image_contrast.supports(".html")
+
+
+def test_data_url_bytes():
+    assert image_contrast.data_url_bytes(data_url(b"\x89PNG")) == b"\x89PNG"
+    assert image_contrast.data_url_bytes("data:text/plain,hello") is None
+    assert image_contrast.data_url_bytes("data:image/png;base64,not base64!") is None
+    assert image_contrast.data_url_bytes("<html></html>") is None
+
+
+@pytest.mark.parametrize("foreground, ratio", [((0x99,) * 3, "2.85"), ((0x77,) * 3, "4.48")])
+def test_low_contrast_text_is_reported_with_its_ratio(foreground, ratio):
+    issues = image_contrast.check_file(screenshot(foreground), "image/png")
+    assert len(issues) == 1
+    issue = issues[0]
+    assert issue["wcag_guideline"].startswith("1.4.3")
+    assert issue["title"] == f"Possible insufficient contrast ({ratio}:1)"
+    assert issue["line_number"] is None
+    assert issue["confidence_score"] == 0.6
+    assert issue["code_snippet"].endswith(f"#{foreground[0]:02x}{foreground[1]:02x}{foreground[2]:02x} on #ffffff")
+
+
+def test_sufficient_contrast_and_flat_images_pass():
+    assert image_contrast.check_file(screenshot((0x33,) * 3), "image/png") == []
+    assert image_contrast.check_file(screenshot((255, 255, 255)), "image/png") == []
+
+
+def test_images_are_read_from_a_path(tmp_path):
+    path = tmp_path / "screen.jpg"
+    path.write_bytes(screenshot((0x99,) * 3, image_format="JPEG"))
+    issues = image_contrast.check_file(str(path), ".jpg")
+    # JPEG ringing may add candidates; the text itself must be among them
+    assert any(issue["wcag_guideline"].startswith("1.4.3") for issue in issues)
+
+
+def test_images_skip_the_llm_only_when_checked(monkeypatch):
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "narrow")
+    assert replaces_llm([], "image/png")
+    # The check did not run (or failed), so the LLM still sees the file
+    assert not replaces_llm(None, "image/png")
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "off")
+    assert not replaces_llm([], "image/png")
+
+
+def test_simple_path_checks_uploaded_images_instead_of_calling_the_llm(user, monkeypatch):
+    service = AnalysisService()
+    calls = []
+
+    async def analyze_file(model_id, content, file_type, filename, on_issue=None, **kwargs):
+        calls.append(filename)
+        return []
+
+    monkeypatch.setattr(service.llm_service, "analyze_file", analyze_file)
+    files = [
+        {"name": "screen.png", "content": data_url(screenshot((0x99,) * 3)), "type": "image/png"},
+        {"name": "broken.png", "content": "data:image/png;base64,AAAA", "type": "image/png"}
+    ]
+    asyncio.run(service.start_analysis_simple("image-session", files, ["gpt-5"], user.id))
+
+    progress = service.progress_store.get("image-session")
+    assert progress["status"] == "completed"
+    # The unreadable image falls back to the LLM
+    assert calls == ["broken.png"]
+    titles = [issue["title"] for issue in progress["issues"]]
+    assert titles == ["Possible insufficient contrast (2.85:1)"]
@@ -0,0 +1,131 @@
+import asyncio
+import time
+import pytest
+from app.models import AnalysisSession
+from app.services.analysis_service import AnalysisService
+from app.services.job_queue import LEASE_EXPIRED_ERROR, JobCheckpoints, JobQueue, QueueFullError
+from app.services.job_worker import JobWorker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(path=str(tmp_path / "jobs.db"), lease_seconds=60, max_attempts=2, max_pending=3)
+
+
+def expire_lease(queue: JobQueue, job_id: int):
+    queue._conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_claim_leases_oldest_job_once(queue):
+    first = queue.enqueue("analysis", {"n": 1})
+    queue.enqueue("analysis", {"n": 2})
+
+    job = queue.claim("worker-a")
+    assert job["id"] == first
+    assert job["payload"] == {"n": 1}
+    assert job["attempts"] == 1
+    # The leased job is not handed out again
+    assert queue.claim("worker-b")["payload"] == {"n": 2}
+    assert queue.claim("worker-c") is None
+
+
+def test_expired_lease_is_claimable_by_another_worker(queue):
+    job_id = queue.enqueue("analysis", {})
+    queue.claim("worker-a")
+    expire_lease(queue, job_id)
+
+    job = queue.claim("worker-b")
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    # The old owner lost its lease
+    assert not queue.heartbeat(job_id, "worker-a")
+    assert queue.heartbeat(job_id, "worker-b")
+
+
+def test_expired_lease_on_final_attempt_fails_the_job(queue):
+    job_id = queue.enqueue("analysis", {"session_id": 7})
+    for worker in ("worker-a", "worker-b"):
+        queue.claim(worker)
+        expire_lease(queue, job_id)
+
+    assert queue.claim("worker-c") is None
+    expired = queue.fail_expired()
+    assert [(job["id"], job["payload"]) for job in expired] == [(job_id, {"session_id": 7})]
+    assert queue.stats()["failed"] == 1
+    assert queue.fail_expired() == []
+
+
+def test_worker_fails_the_sessions_of_abandoned_jobs(queue, db, user):
+    session = AnalysisSession(name="abandoned", user_id=user.id, status="running")
+    db.add(session)
+    db.commit()
+    service = AnalysisService()
+    service.progress_store.start("frontend-session")
+    worker = JobWorker(queue, service, concurrency=1, worker_id="worker-c")
+
+    for kind, payload in (
+        ("analysis_session", {"session_id": session.id}),
+        ("analysis_simple", {"session_id": "frontend-session"})
+    ):
+        job_id = queue.enqueue(kind, payload)
+        for worker_id in ("worker-a", "worker-b"):
+            queue.claim(worker_id)
+            expire_lease(queue, job_id)
+
+    async def poll_once():
+        loop = asyncio.create_task(worker._loop("worker-c"))
+        await asyncio.sleep(0.1)
+        loop.cancel()
+        await asyncio.gather(loop, return_exceptions=True)
+
+    asyncio.run(poll_once())
+    db.expire_all()
+    assert db.get(AnalysisSession, session.id).status == "failed"
+    progress = service.progress_store.get("frontend-session")
+    assert (progress["status"], progress["error"]) == ("failed", LEASE_EXPIRED_ERROR)
+
+
+def test_fail_requeues_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr("app.services.job_queue.settings.job_retry_delay", 0)
+    job_id = queue.enqueue("analysis", {})
+
+    queue.claim("worker-a")
+    queue.fail(job_id, "worker-a", "boom")
+    assert queue.stats()["queued"] == 1
+
+    assert queue.claim("worker-a")["attempts"] == 2
+    queue.fail(job_id, "worker-a", "boom again")
+    assert queue.stats()["failed"] == 1
+    assert queue.claim("worker-a") is None
+
+
+def test_release_does_not_count_the_attempt(queue):
+    job_id = queue.enqueue("analysis", {})
+    queue.claim("worker-a")
+    queue.release(job_id, "worker-a")
+    assert queue.claim("worker-b")["attempts"] == 1
+
+
+def test_checkpoints_survive_retries_and_are_dropped_on_completion(queue):
+    job_id = queue.enqueue("analysis", {})
+    job = queue.claim("worker-a")
+    checkpoints = JobCheckpoints(queue, job_id, job["attempts"])
+    assert not checkpoints.retried
+    checkpoints.save("1:gpt-5", {"written": True})
+    expire_lease(queue, job_id)
+
+    job = queue.claim("worker-b")
+    resumed = JobCheckpoints(queue, job_id, job["attempts"])
+    assert resumed.retried
+    assert "1:gpt-5" in resumed
+    assert resumed.get("1:gpt-5") == {"written": True}
+
+    queue.complete(job_id, "worker-b")
+    assert len(JobCheckpoints(queue, job_id)) == 0
+
+
+def test_enqueue_refuses_work_beyond_max_pending(queue):
+    for n in range(3):
+        queue.enqueue("analysis", {"n": n})
+    with pytest.raises(QueueFullError):
+        queue.enqueue("analysis", {"n": 3})
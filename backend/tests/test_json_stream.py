@@ -0,0 +1,45 @@
+import json
+from app.services.json_stream import IncrementalJSONArrayParser
+
+ITEMS = [
+    {"title": "Brace } inside a string", "line_number": 1},
+    {"title": "Escaped \"quote\" and \\ backslash [", "line_number": 2},
+    {"title": "Nested", "meta": {"tags": ["a", {"b": 1}]}, "line_number": 3}
+]
+
+
+def feed_all(parser, chunks):
+    objects = []
+    for chunk in chunks:
+        objects.extend(parser.feed(chunk))
+    return objects
+
+
+def test_objects_are_yielded_regardless_of_split_points():
+    text = "```json\n" + json.dumps(ITEMS) + "\n```"
+    for size in (1, 2, 3, 7, len(text)):
+        parser = IncrementalJSONArrayParser()
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert feed_all(parser, chunks) == ITEMS
+        assert parser.done
+
+
+def test_each_object_arrives_with_its_closing_brace():
+    parser = IncrementalJSONArrayParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2') == []
+    assert parser.feed('}') == [{"b": 2}]
+    assert not parser.done
+    assert parser.feed(']') == []
+    assert parser.done
+
+
+def test_text_after_the_array_is_ignored():
+    parser = IncrementalJSONArrayParser()
+    assert parser.feed('[{"a": 1}] trailing [{"b": 2}]') == [{"a": 1}]
+    assert parser.feed('{"c": 3}') == []
+
+
+def test_malformed_and_non_object_elements_are_skipped():
+    parser = IncrementalJSONArrayParser()
+    assert parser.feed('[1, "x", [2], {"a": }, {"b": 2}]') == [{"b": 2}]
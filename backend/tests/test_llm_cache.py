@@ -0,0 +1,59 @@
+from app.services.llm_cache import LLMResponseCache, make_cache_key
+
+
+def test_cache_key_separates_model_and_prompt():
+    key = make_cache_key("gpt-5", "GPT-5", "prompt")
+    assert make_cache_key("gpt-5", "GPT-5", "prompt") == key
+    assert make_cache_key("claude", "GPT-5", "prompt") != key
+    assert make_cache_key("gpt-5", "GPT-5", "prompt ") != key
+    # Field boundaries are part of the key
+    assert make_cache_key("ab", "c", "") != make_cache_key("a", "bc", "")
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.db"), ttl_seconds=0,
+                             memory_entries=2, max_disk_entries=10)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.set("c", {"n": 3})
+
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.counters["memory_evictions"] == 1
+    # The evicted entry is still served from disk and promoted back
+    assert cache.get("b") == {"n": 2}
+    assert cache.counters["disk_hits"] == 1
+    assert "b" in cache._memory
+    cache.close()
+
+
+def test_disk_tier_survives_restart_and_trims_to_limit(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = LLMResponseCache(path=path, ttl_seconds=0, memory_entries=10, max_disk_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.set("c", {"n": 3})
+    assert cache.stats()["disk_entries"] == 2
+    cache.close()
+
+    reopened = LLMResponseCache(path=path, ttl_seconds=0, memory_entries=10, max_disk_entries=2)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == {"n": 3}
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    reopened.close()
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.db"), ttl_seconds=60,
+                             memory_entries=10, max_disk_entries=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.llm_cache.time.time", lambda: now[0])
+    cache.set("a", {"n": 1})
+    assert cache.get("a") == {"n": 1}
+
+    now[0] += 61
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+    cache.close()
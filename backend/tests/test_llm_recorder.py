@@ -0,0 +1,45 @@
+import asyncio
+import json
+import httpx
+from app.services.llm_recorder import Cassette, RecordingTransport, ReplayTransport, redact_url, request_key
+
+URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini:generateContent?key=secret&alt=json"
+
+
+def test_request_key_ignores_host_secrets_and_json_formatting():
+    key = request_key("post", URL, b'{"a": 1, "b": [1, 2]}')
+    local = "http://localhost:8089/v1beta/models/gemini:generateContent?alt=json&key=other"
+    assert request_key("POST", local, b'{"b":[1,2],"a":1}') == key
+    assert request_key("POST", URL, b'{"a": 2, "b": [1, 2]}') != key
+    assert request_key("POST", URL.replace("alt=json", "alt=sse"), b'{"a": 1, "b": [1, 2]}') != key
+    assert "secret" not in redact_url(URL)
+
+
+def test_recorded_exchanges_replay_in_order(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    replies = iter(["first", "second"])
+
+    def provider(request):
+        return httpx.Response(200, json={"text": next(replies)}, headers={"x-request-id": "abc"})
+
+    async def send(transport, body):
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post(URL, json=body)
+            return response.status_code, response.json(), response.headers
+
+    recorder = RecordingTransport(Cassette(path), httpx.MockTransport(provider))
+    assert asyncio.run(send(recorder, {"prompt": "hi"}))[1] == {"text": "first"}
+    assert asyncio.run(send(recorder, {"prompt": "hi"}))[1] == {"text": "second"}
+
+    with open(path, encoding="utf-8") as f:
+        stored = f.read()
+    assert "secret" not in stored and "x-request-id" not in stored
+
+    # A fresh cassette from the file, as a later replay run would load it
+    replay = ReplayTransport(Cassette(path))
+    bodies = [asyncio.run(send(replay, {"prompt": "hi"}))[1]["text"] for _ in range(3)]
+    assert bodies == ["first", "second", "first"]
+
+    status, body, _ = asyncio.run(send(replay, {"prompt": "other"}))
+    assert status == 404
+    assert replay.misses == 1
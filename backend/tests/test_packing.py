@@ -0,0 +1,84 @@
+import asyncio
+import json
+from app.services.llm_service import LLMService
+from app.services.packing import PackDemultiplexer, create_packed_prompt, pack_files
+
+PAGE = "<!--\n  generated\n  banner\n-->\n<html>\n<img src=\"a.png\">\n</html>"
+SCRIPT = "const a = 1;\nbutton.onclick = go;"
+
+
+def packed_files():
+    return [
+        {"key": 1, "content": PAGE, "file_type": ".html", "filename": "site/index.html"},
+        {"key": 2, "content": SCRIPT, "file_type": ".js", "filename": "app.js"}
+    ]
+
+
+def test_pack_files_respects_limits_and_unique_names(monkeypatch):
+    monkeypatch.setattr("app.config.settings.pack_max_files", 2)
+    files = [{"content": "x" * 40, "filename": name} for name in ("a", "b", "c", "a")]
+    groups = pack_files("gpt-5", files)
+    assert sorted(len(group) for group in groups) == [2, 2]
+    for group in groups:
+        assert len({file_data["filename"] for file_data in group}) == len(group)
+
+
+
+def test_names_that_route_alike_never_share_a_pack():
+    files = [
+        {"content": "x" * 40, "file_type": ".js", "filename": name}
+        for name in ("src\\App.js", "src/app.js", "lib/app.js")
+    ]
+    groups = pack_files("gpt-5", files)
+    assert sorted(len(group) for group in groups) == [1, 2]
+    prompt = create_packed_prompt(max(groups, key=len))
+    # Labels are the names the demultiplexer matches on
+    assert "=== File: src/app.js (.js) ===" in prompt
+    assert "=== File: lib/app.js (.js) ===" in prompt
+
+def test_prompt_marks_every_file():
+    page, script = packed_files()
+    prompt = create_packed_prompt([page, {**script, "note": "Known: x"}])
+    assert "=== File: site/index.html (.html) ===" in prompt
+    assert "=== End of file: app.js ===\nKnown: x" in prompt
+
+
+def test_demultiplexer_routes_by_name_and_unique_basename():
+    demux = PackDemultiplexer(packed_files() + [{"key": 3, "filename": "other/app.js"}])
+    assert demux.file_key({"file": "`SITE\\index.html`"}) == 1
+    assert demux.file_key({"file": "index.html"}) == 1
+    # Ambiguous basename, unknown name, missing field
+    assert demux.file_key({"file": "lib/app.js"}) is None
+    assert demux.file_key({"file": "missing.html"}) is None
+    assert demux.file_key({"title": "x"}) is None
+    assert demux.strip({"file": "app.js", "title": "x"}) == {"title": "x"}
+
+
+def test_packed_issues_are_remapped_to_original_lines(monkeypatch):
+    monkeypatch.setattr("app.config.settings.preprocess_content", True)
+    monkeypatch.setattr("app.config.settings.prompt_mode", "source")
+    service = LLMService()
+    prompt, line_maps = service.prepare_packed_prompt(packed_files())
+
+    # The comment is stripped, so the <img> is on a different line in the prompt
+    reduced = line_maps[1]
+    assert reduced is not None
+    local = reduced.content.split("\n").index('<img src="a.png">') + 1
+    assert local < 6
+    assert reduced.content in prompt
+
+    issues = [
+        {"file": "index.html", "title": "Missing alt", "line_number": local},
+        {"file": "app.js", "title": "Click handler", "line_number": 2},
+        {"file": "unknown.js", "title": "Dropped", "line_number": 1}
+    ]
+
+    async def complete(model_id, prompt, label, on_text=None):
+        return {"choices": [{"message": {"content": json.dumps(issues)}}]}
+
+    monkeypatch.setattr(service, "_complete", complete)
+    by_file = asyncio.run(service.analyze_packed("gpt-5", packed_files()))
+
+    assert [(issue["title"], issue["line_number"]) for issue in by_file[1]] == [("Missing alt", 6)]
+    assert [(issue["title"], issue["line_number"]) for issue in by_file[2]] == [("Click handler", 2)]
+    assert all("file" not in issue for issues in by_file.values() for issue in issues)
@@ -0,0 +1,98 @@
+from app.services.chunker import remap_issue
+from app.services.preprocessor import preprocess, strip_c_comments
+
+
+def test_script_comments_are_removed_and_strings_kept():
+    script = "\n".join([
+        "// header",
+        "const url = 'http://example.com'; // trailing",
+        'const s = "/* not a comment */";',
+        "/* block",
+        "   comment */ go();"
+    ])
+    assert strip_c_comments(script).split("\n") == [
+        "",
+        "const url = 'http://example.com'; ",
+        'const s = "/* not a comment */";',
+        "",
+        " go();"
+    ]
+
+
+def test_regex_literals_and_division():
+    assert strip_c_comments("const re = /[/*]+\\//g; // x") == "const re = /[/*]+\\//g; "
+    assert strip_c_comments("return /a\\/b/.test(s)") == "return /a\\/b/.test(s)"
+    # After a value the slash divides, so what follows can still be a comment
+    assert strip_c_comments("half = (a + b) / 2 /* avg */ / n") == "half = (a + b) / 2   / n"
+    assert strip_c_comments("x = a / b // rest") == "x = a / b "
+
+
+def test_template_strings_are_kept_whole():
+    script = "const t = `line /* one */\n// two ${value}`; // gone"
+    assert strip_c_comments(script) == "const t = `line /* one */\n// two ${value}`; "
+
+
+def test_css_keeps_protocol_relative_urls():
+    css = "body { background: url(//cdn.example.com/a.png); } /* note */"
+    assert strip_c_comments(css, script=False) == "body { background: url(//cdn.example.com/a.png); }  "
+
+
+def test_jsx_text_is_not_code():
+    jsx = "\n".join([
+        "const Help = () => (",
+        '  <p title="a//b">Use /* wildcards */ or http://example.com {/* note */}{n / 2 /* half */}</p>',
+        ");",
+        "if (a < b) { render(<Icon />) } // end"
+    ])
+    assert strip_c_comments(jsx).split("\n") == [
+        "const Help = () => (",
+        '  <p title="a//b">Use /* wildcards */ or http://example.com { }{n / 2  }</p>',
+        ");",
+        "if (a < b) { render(<Icon />) } "
+    ]
+
+
+def test_markup_comments_and_embedded_blocks():
+    html = "\n".join([
+        "<!-- banner",
+        "     comment -->",
+        "<style>/* theme */ p { color: red; }</style>",
+        "<script>",
+        "// setup",
+        "start();",
+        "</script>",
+        '<img src="a.png">'
+    ])
+    reduced = preprocess(html, ".html")
+    assert reduced.content.split("\n") == [
+        "<style>  p { color: red; }</style>",
+        "<script>",
+        "start();",
+        "</script>",
+        '<img src="a.png">'
+    ]
+    assert reduced.line_numbers == [3, 4, 6, 7, 8]
+
+
+def test_line_numbers_map_back_to_the_original_file():
+    script = "\n".join([
+        "/**",
+        " * Player controls",
+        " */",
+        "",
+        "",
+        "",
+        "button.onclick = play;  ",
+        "//# sourceMappingURL=app.js.map"
+    ])
+    reduced = preprocess(script, ".js")
+    assert reduced.content == "button.onclick = play;"
+    issue = remap_issue({"title": "Click handler", "line_number": 1}, reduced)
+    assert issue["line_number"] == 7
+    assert script.split("\n")[issue["line_number"] - 1].startswith("button.onclick")
+
+
+def test_unchanged_or_disabled_preprocessing_returns_none(monkeypatch):
+    assert preprocess("<p>Hello</p>\n<p>World</p>", ".html") is None
+    monkeypatch.setattr("app.config.settings.preprocess_content", False)
+    assert preprocess("// comment\ncode()", ".js") is None
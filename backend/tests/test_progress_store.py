@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from app.services.progress_store import InMemoryProgressStore, ProgressWriter, SQLiteProgressStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteProgressStore(path=str(tmp_path / "progress.db"))
+    return InMemoryProgressStore()
+
+
+def test_get_since_returns_issues_after_the_cursor(store):
+    store.start("s1")
+    store.append_issues("s1", [{"id": 0}, {"id": 1}])
+    first = store.get_since("s1")
+    assert [issue["id"] for issue in first["issues"]] == [0, 1]
+    assert first["cursor"] == 2
+
+    store.append_issues("s1", [{"id": 2}])
+    store.update("s1", status="completed", progress=100)
+    later = store.get_since("s1", first["cursor"])
+    assert [issue["id"] for issue in later["issues"]] == [2]
+    assert later["cursor"] == 3
+    assert (later["status"], later["progress"]) == ("completed", 100)
+    assert store.get_since("s1", 3)["issues"] == []
+    assert store.get_since("unknown") is None
+
+
+def test_finished_sessions_expire(store):
+    store.ttl_seconds = -1
+    store.start("s1")
+    store.update("s1", status="failed", error="boom")
+    assert store.get("s1") is None
+
+
+def test_writer_applies_queued_writes_in_order(store):
+    store.start("s1")
+    calls = []
+    append_issues = store.append_issues
+
+    def counting_append(session_id, issues):
+        calls.append(len(issues))
+        append_issues(session_id, issues)
+
+    store.append_issues = counting_append
+
+    async def write():
+        progress = ProgressWriter(store, "s1")
+        for n in range(5):
+            progress.append_issues([{"id": n}])
+        progress.update(progress=50)
+        progress.append_issues([{"id": 5}])
+        progress.update(status="completed", progress=100)
+        await progress.close()
+
+    asyncio.run(write())
+    data = store.get("s1")
+    assert [issue["id"] for issue in data["issues"]] == list(range(6))
+    assert (data["status"], data["progress"]) == ("completed", 100)
+    # Appends queued back to back are written together
+    assert calls == [5, 1]
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import CircuitBreaker, CircuitOpenError, TokenBucket, parse_retry_after
+from app.services.scheduler import AnalysisScheduler
+
+CONFIG = {"provider": "test-provider"}
+URL = "https://llm.test/v1/chat"
+
+
+def test_token_bucket_serves_a_burst_then_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        burst = time.monotonic() - started
+        await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.02
+    # The third token takes 1/rate seconds to refill
+    assert 0.04 <= total < 0.2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_circuit_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    open_breaker(breaker)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # A failed probe re-opens the circuit at once
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def service_with(handler, scheduler=None) -> LLMService:
+    service = LLMService(scheduler)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service._get_client = lambda config: client
+    return service
+
+
+def test_unexpected_error_during_probe_does_not_wedge_the_circuit(monkeypatch):
+    monkeypatch.setattr("app.config.settings.llm_max_retries", 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise ValueError("not a transport error")
+        return httpx.Response(200, json={"ok": True})
+
+    service = service_with(handler)
+    breaker = service._get_limiter(CONFIG).breaker
+    breaker.reset_seconds = 0.01
+    open_breaker(breaker)
+    time.sleep(0.02)
+
+    async def run():
+        with pytest.raises(ValueError):
+            await service._send(CONFIG, URL, {}, {})
+        # The next call is let through as a new probe
+        response = await service._send(CONFIG, URL, {}, {})
+        return response.json()
+
+    assert asyncio.run(run()) == {"ok": True}
+    assert breaker.state == "closed"
+
+
+def test_retry_wait_gives_up_the_scheduler_slot(monkeypatch):
+    monkeypatch.setattr("app.config.settings.llm_max_retries", 1)
+    scheduler = AnalysisScheduler(max_concurrent=1, provider_limits={"test-provider": 1})
+    finished = []
+    throttled = []
+
+    def handler(request):
+        name = request.url.params["name"]
+        if name == "slow" and not throttled:
+            throttled.append(name)
+            return httpx.Response(503, headers={"retry-after": "0.2"})
+        return httpx.Response(200, json={"name": name})
+
+    service = service_with(handler, scheduler)
+
+    async def call(name):
+        async with scheduler.slot("test-provider"):
+            response = await service._send(CONFIG, f"{URL}?name={name}", {}, {})
+        finished.append(response.json()["name"])
+
+    async def run():
+        slow = asyncio.create_task(call("slow"))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(call("fast"), timeout=0.15)
+        await slow
+
+    asyncio.run(run())
+    # The second call ran in the slot while the first waited out Retry-After
+    assert finished == ["fast", "slow"]
+
+
+def test_open_circuit_pauses_calls_instead_of_failing_them():
+    in_flight = []
+    overlapping = []
+
+    async def handler(request):
+        in_flight.append(request)
+        overlapping.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(request)
+        return httpx.Response(200, json={"ok": True})
+
+    service = service_with(handler)
+    breaker = service._get_limiter(CONFIG).breaker
+    breaker.reset_seconds = 0.05
+    open_breaker(breaker)
+
+    async def run():
+        started = time.monotonic()
+        responses = await asyncio.gather(*(service._send(CONFIG, URL, {}, {}) for _ in range(4)))
+        return [response.json() for response in responses], time.monotonic() - started
+
+    results, elapsed = asyncio.run(run())
+    assert results == [{"ok": True}] * 4
+    # The cooldown was waited out, and the first call went alone as the probe
+    assert elapsed >= 0.04
+    assert overlapping[0] == 1
+    assert breaker.state == "closed"
@@ -0,0 +1,67 @@
+import asyncio
+from app.services.analysis_service import AnalysisService
+from app.services.result_sets import (
+    content_hash,
+    load_prior_result_sets,
+    prompt_fingerprint,
+    record_result_sets,
+    result_set_row
+)
+
+ISSUES = [{"title": "Missing alt text", "line_number": 3}]
+
+
+def test_fingerprint_follows_prompt_inputs(monkeypatch):
+    base = prompt_fingerprint(".html", [], [(1, "color: #777 on #fff")])
+    assert prompt_fingerprint(".html", [], [(1, "color: #777 on #fff")]) == base
+    # Different computed styles or static findings give a different prompt
+    assert prompt_fingerprint(".html", [], [(1, "color: #000 on #fff")]) != base
+    assert prompt_fingerprint(".html", ISSUES, [(1, "color: #777 on #fff")]) != base
+
+    monkeypatch.setattr("app.config.settings.prompt_mode", "tree")
+    assert prompt_fingerprint(".html", [], [(1, "color: #777 on #fff")]) != base
+    monkeypatch.setattr("app.config.settings.prompt_mode", "source")
+    monkeypatch.setattr("app.config.settings.preprocess_content", False)
+    assert prompt_fingerprint(".html", [], [(1, "color: #777 on #fff")]) != base
+
+
+def test_prior_result_sets_are_keyed_on_content_fingerprint_and_model(db):
+    file_hash = content_hash("<img src=a.png>")
+    old = prompt_fingerprint(".html", None, None)
+    new = prompt_fingerprint(".html", [], [])
+    record_result_sets(db, [
+        result_set_row(file_hash, old, "gpt-5", 1, "a.html", [{"title": "stale"}]),
+        result_set_row(file_hash, new, "gpt-5", 2, "a.html", [{"title": "older"}]),
+        result_set_row(file_hash, new, "gpt-5", 3, "a.html", ISSUES)
+    ])
+
+    prior = load_prior_result_sets(db, [file_hash], ["gpt-5", "claude"])
+    assert prior[(file_hash, new, "gpt-5")] == ISSUES
+    assert prior[(file_hash, old, "gpt-5")] == [{"title": "stale"}]
+    assert (file_hash, new, "claude") not in prior
+
+
+def test_incremental_runs_reuse_results_only_for_the_same_prompt(user, monkeypatch):
+    monkeypatch.setattr("app.config.settings.pack_small_files", False)
+    service = AnalysisService()
+    calls = []
+
+    async def analyze_file(model_id, content, file_type, filename, on_issue=None, **kwargs):
+        calls.append(filename)
+        return ISSUES
+
+    monkeypatch.setattr(service.llm_service, "analyze_file", analyze_file)
+    files = [{"name": "a.html", "content": '<html lang="en"><title>A</title><img src="a.png"></html>', "type": ".html"}]
+
+    def run(session_id):
+        asyncio.run(service.start_analysis_simple(session_id, files, ["gpt-5"], user.id, incremental=True))
+        return service.progress_store.get(session_id)
+
+    assert run("incremental-1")["status"] == "completed"
+    assert run("incremental-2")["status"] == "completed"
+    assert calls == ["a.html"]
+
+    # A different prompt mode sends a different prompt, so the LLM is asked again
+    monkeypatch.setattr("app.config.settings.prompt_mode", "tree")
+    run("incremental-3")
+    assert calls == ["a.html", "a.html"]
@@ -0,0 +1,51 @@
+from app.models import AnalysisResult, AnalysisResultSet
+from app.services.result_sink import ResultSink, issue_to_row
+
+
+SESSION_ID = 9001
+
+
+def rows(count):
+    return [issue_to_row(SESSION_ID, "gpt-5", "a.html", {"title": f"Issue {n}"}) for n in range(count)]
+
+
+def written(db):
+    return db.query(AnalysisResult).filter(AnalysisResult.analysis_session_id == SESSION_ID).count()
+
+
+def test_add_buffers_until_flush(db):
+    flushed = []
+    sink = ResultSink(db, batch_size=3, flush_interval=60, on_flush=flushed.extend)
+
+    sink.add(rows(2), key="1:gpt-5")
+    assert not sink.due
+    assert written(db) == 0
+
+    sink.add(rows(2), key="2:gpt-5", result_set={
+        "content_hash": "abc", "llm_model": "gpt-5", "prompt_version": "fp", "issues": []
+    })
+    assert sink.due
+    # add never writes; the owner flushes
+    assert written(db) == 0
+
+    sink.flush()
+    assert written(db) == 4
+    assert db.query(AnalysisResultSet).filter(AnalysisResultSet.content_hash == "abc").count() == 1
+    assert flushed == ["1:gpt-5", "2:gpt-5"]
+    assert sink.pending == 0
+    assert sink.time_until_flush() is None
+
+
+def test_interval_makes_buffered_rows_due(db):
+    sink = ResultSink(db, batch_size=100, flush_interval=0)
+    assert not sink.due
+    sink.add(rows(1))
+    assert sink.due
+
+
+def test_keys_without_rows_are_still_reported(db):
+    flushed = []
+    sink = ResultSink(db, batch_size=100, flush_interval=60, on_flush=flushed.extend)
+    sink.add([], key="3:gpt-5")
+    sink.flush()
+    assert flushed == ["3:gpt-5"]
@@ -0,0 +1,96 @@
+from app.analyzers import static_rules
+from app.analyzers.engine import prompt_note, replaces_llm
+
+
+def criteria(issues):
+    return sorted(issue["wcag_guideline"].split(" ", 1)[0] for issue in issues)
+
+
+def test_markup_rules_report_missing_names_and_page_metadata():
+    content = "\n".join([
+        "<html>",
+        "<head></head>",
+        "<body>",
+        '<img src="logo.png">',
+        '<input type="text" placeholder="Search">',
+        '<button><svg></svg></button>',
+        "</body>",
+        "</html>"
+    ])
+    issues = static_rules.check_file(content, ".html")
+    assert criteria(issues) == ["1.1.1", "1.3.1", "2.4.2", "3.1.1", "4.1.2"]
+    by_criterion = {issue["wcag_guideline"].split(" ", 1)[0]: issue for issue in issues}
+    assert by_criterion["1.1.1"]["line_number"] == 4
+    assert "placeholder is not a label" in by_criterion["1.3.1"]["description"]
+    assert by_criterion["4.1.2"]["line_number"] == 6
+
+
+def test_markup_rules_accept_named_and_decorative_elements():
+    content = "\n".join([
+        '<html lang="en">',
+        "<head><title>Radio</title></head>",
+        "<body>",
+        '<img src="divider.png" alt="">',
+        '<label for="station">Station</label><input id="station">',
+        '<label>Volume <input type="range"></label>',
+        '<button aria-label="Mute"><svg></svg></button>',
+        '<a href="/settings">Settings</a>',
+        "</body>",
+        "</html>"
+    ])
+    assert static_rules.check_file(content, ".html") == []
+
+
+def test_components_skip_page_level_checks():
+    # No <html>: a component, so no title or language is expected
+    assert static_rules.check_file('<div><img src="a.png" :alt="label"></div>', ".vue") == []
+
+
+def test_qml_rules():
+    content = "\n".join([
+        "Item {",
+        "    Image { source: \"icon.png\" }",
+        "    Button { icon.source: \"play.png\" }",
+        "    Button { text: \"Play\" }",
+        "    Rectangle {",
+        "        MouseArea { anchors.fill: parent }",
+        "    }",
+        "}"
+    ])
+    issues = static_rules.check_file(content, ".qml")
+    assert [(issue["line_number"], issue["wcag_guideline"].split(" ", 1)[0]) for issue in issues] == [
+        (2, "1.1.1"), (3, "4.1.2"), (6, "4.1.2")
+    ]
+
+
+def test_unsupported_types_are_left_to_the_llm(monkeypatch):
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "only")
+    assert static_rules.check_file("body { color: red; }", ".py") is None
+    assert not replaces_llm(None, ".py")
+    assert replaces_llm([], ".html")
+
+
+def test_narrow_prompt_note_lists_covered_criteria_and_found_issues(monkeypatch):
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "narrow")
+    content = '<html lang="en"><head><title>x</title></head><img src="a.png"></html>'
+    issues = static_rules.check_file(content, ".html")
+    note = prompt_note(".html", issues, content=content)
+    assert "WCAG 3.1.1 have already been checked" in note
+    assert "- line 1: 1.1.1 <img> has no text alternative" in note
+
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "augment")
+    assert prompt_note(".html", issues, content=content) == ""
+
+
+def test_page_criteria_are_only_covered_where_the_page_checks_ran(monkeypatch):
+    monkeypatch.setattr("app.config.settings.static_rules_mode", "narrow")
+    # Fragments, components and Android layouts get no page-level checks
+    for content, file_type in [
+        ('<img src="a.png">', ".html"),
+        ('<template><button>Play</button></template>', ".vue"),
+        ('<LinearLayout><ImageView android:src="@drawable/a"/></LinearLayout>', ".xml")
+    ]:
+        issues = static_rules.check_file(content, file_type)
+        assert "already been checked" not in prompt_note(file_type, issues, content=content)
+    assert static_rules.covered_criteria('<html lang="en"></html>', ".html") == ("3.1.1",)
+    assert static_rules.covered_criteria('<html lang="en"></html>', ".qml") == ()
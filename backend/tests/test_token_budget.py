@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.auth import get_current_active_user_dev
+from app.main import app
+from app.models import User
+from app.services.token_budget import (
+    SessionBudget,
+    budget_limit,
+    estimate_call_cost,
+    record_session_usage,
+    session_usage
+)
+
+
+def spend(db, session_id, user_id, cost, model_id="gpt-5"):
+    budget = SessionBudget()
+    budget.usage[model_id] = {"requests": 1, "input_tokens": 100, "output_tokens": 50, "cached_input_tokens": 0, "cost_usd": cost}
+    record_session_usage(db, session_id, user_id, budget)
+
+
+
+def test_batch_and_cached_tokens_are_charged_at_discounted_prices():
+    budget = SessionBudget()
+    budget.record("gpt-5", {"input_tokens": 1000, "output_tokens": 100, "cached_input_tokens": 0})
+    assert budget.spent_usd == pytest.approx(1100 * 0.00003)
+    # 800 of 1000 prompt tokens read from the cache at a tenth of the price
+    budget.record("gpt-5", {"input_tokens": 1000, "output_tokens": 100, "cached_input_tokens": 800})
+    assert budget.usage["gpt-5"]["cost_usd"] == pytest.approx((1100 + 380) * 0.00003)
+    # Batch requests cost half; Anthropic cache writes cost a quarter more
+    budget.record("claude-opus-4", {
+        "input_tokens": 1000, "output_tokens": 100, "cached_input_tokens": 0, "cache_write_tokens": 800
+    }, batch=True)
+    assert budget.usage["claude-opus-4"]["cost_usd"] == pytest.approx((200 + 1000 + 100) * 0.000015 / 2)
+    # Models without price ratios are charged in full
+    budget.record("grok-4", {"input_tokens": 1000, "output_tokens": 100, "cached_input_tokens": 800}, batch=True)
+    assert budget.usage["grok-4"]["cost_usd"] == pytest.approx(1100 * 0.00001)
+    assert estimate_call_cost("gpt-5", "x" * 4000, batch=True) == pytest.approx(estimate_call_cost("gpt-5", "x" * 4000) / 2)
+
+def test_retries_share_the_session_budget(db, user, monkeypatch):
+    monkeypatch.setattr("app.config.settings.session_budget_usd", 1.0)
+    assert budget_limit(db, user.id, session_id="retried") == 1.0
+
+    # The first attempt spent some of the budget before failing
+    spend(db, "retried", user.id, 0.4)
+    assert budget_limit(db, user.id, session_id="retried") == pytest.approx(0.6)
+    assert budget_limit(db, user.id, budget_usd=2.0, session_id="retried") == pytest.approx(1.6)
+    spend(db, "retried", user.id, 0.9)
+    assert budget_limit(db, user.id, session_id="retried") == 0.0
+    # A new session (or an estimate) starts from the full budget
+    assert budget_limit(db, user.id) == 1.0
+
+
+def test_user_budget_caps_the_session_budget(db, user, monkeypatch):
+    monkeypatch.setattr("app.config.settings.session_budget_usd", 1.0)
+    monkeypatch.setattr("app.config.settings.user_budget_usd", 1.5)
+    spend(db, "earlier", user.id, 1.2)
+    assert budget_limit(db, user.id, session_id="next") == pytest.approx(0.3)
+
+
+def test_session_usage_is_scoped_to_the_user(db, user):
+    other = User(email="other@example.com", username="other", hashed_password="x")
+    db.add(other)
+    db.commit()
+    spend(db, "shared-id", user.id, 0.25)
+    spend(db, "shared-id", user.id, 0.5, model_id="claude-opus-4")
+    spend(db, "shared-id", other.id, 3.0)
+
+    usage = session_usage(db, "shared-id", user.id)
+    assert usage["cost_usd"] == 0.75
+    assert set(usage["models"]) == {"gpt-5", "claude-opus-4"}
+    assert session_usage(db, "shared-id", other.id)["cost_usd"] == 3.0
+
+
+def test_usage_endpoint_only_reports_the_callers_usage(db, user):
+    spend(db, "private", user.id, 0.5)
+    intruder = User(email="intruder@example.com", username="intruder", hashed_password="x")
+    db.add(intruder)
+    db.commit()
+
+    client = TestClient(app)
+    try:
+        app.dependency_overrides[get_current_active_user_dev] = lambda: user
+        assert client.get("/api/analysis/usage/private").json()["cost_usd"] == 0.5
+        app.dependency_overrides[get_current_active_user_dev] = lambda: intruder
+        assert client.get("/api/analysis/usage/private").json() == {"cost_usd": 0, "models": {}}
+    finally:
+        app.dependency_overrides.clear()